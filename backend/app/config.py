@@ -1,3 +1,4 @@
+import tempfile
 from functools import lru_cache
 from pathlib import Path
 
@@ -14,6 +15,58 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int
     JWT_SECRET: str
 
+    # per process and per engine: size the total (pool + overflow) x processes against
+    # Postgres max_connections, see README "Connection pool"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds; -1 keeps connections forever
+    DB_POOL_PRE_PING: bool = False
+    # uvicorn's --workers default; only used for the max_connections check at startup
+    WEB_CONCURRENCY: int = 1
+
+    # async routes on AsyncSession/asyncpg for the high-frequency endpoints (see app.routers.async_api)
+    DB_ASYNC: bool = False
+
+    # stream uploads through the ETL in bounded chunks instead of one in-memory DataFrame
+    ETL_STREAMING: bool = True
+    ETL_MEMORY_BUDGET_MB: int = 256
+
+    # raw uploads wait here for a worker; must be shared storage when workers run on other hosts
+    UPLOAD_DIR: str = str(Path(tempfile.gettempdir()) / "task-uploads")
+    ETL_WORKERS: int = 2
+    ETL_POLL_SECONDS: float = 1.0
+    ETL_JOB_LEASE_SECONDS: int = 60
+    ETL_MAX_ATTEMPTS: int = 3
+
+    # dataset detail/aggregates response cache: "memory" (per process), "redis" (shared) or "none"
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: int = 300
+    CACHE_MAX_MB: int = 64
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # verified tokens and user rows kept per process so auth skips the DB; 0 disables
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_SIZE: int = 10_000
+
+    # bcrypt runs in its own process pool; 0 hashes inline on the request thread.
+    # Keep the queue well below the request threadpool size (40).
+    HASH_WORKERS: int = 2
+    HASH_QUEUE_SIZE: int = 8
+
+    # how often the ETL publishes progress and event streams check for it; streams end
+    # after PROGRESS_STREAM_SECONDS and the browser reconnects
+    PROGRESS_INTERVAL_SECONDS: float = 0.5
+    PROGRESS_STREAM_SECONDS: float = 300
+
+    # Server-Timing header and a JSON log line per request; slower ones are logged at WARNING
+    REQUEST_TIMING: bool = False
+    REQUEST_SLOW_MS: float = 1000
+
+    # GET /metrics (cache counters, DB pool stats) is unauthenticated: only turn it on where
+    # the API port is reachable from inside the deployment alone
+    METRICS_ENABLED: bool = False
+
     @property
     def database_url(self) -> str:
         return (
@@ -21,6 +74,10 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def async_database_url(self) -> str:
+        return self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
     model_config = {"env_file": str(ENV_FILE), "env_file_encoding": "utf-8"}
 
 
@@ -1,9 +1,88 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+import bisect
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.config import get_settings
 
-engine = create_engine(get_settings().database_url)
+logger = logging.getLogger(__name__)
+
+# upper bounds of the checkout wait histogram, in ms
+WAIT_BUCKETS_MS = (1, 5, 25, 100, 500, 1000, 5000, 30000)
+
+
+class _MeteredPool:
+    """Times every checkout, including waiting for a free slot and opening/pinging a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_total = 0.0
+        self._timeouts = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, waited)] += 1
+                self._wait_total += waited
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counts = list(self._wait_counts)
+            total, timeouts = self._wait_total, self._timeouts
+        cumulative, le = 0, {}
+        for bound, count in zip([*map(str, WAIT_BUCKETS_MS), "inf"], counts):
+            cumulative += count
+            le[bound] = cumulative
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "idle": self.checkedin(),
+            "checkouts": cumulative,
+            "timeouts": timeouts,
+            "wait_ms_total": round(total, 1),
+            "wait_ms_le": le,
+        }
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncPool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options() -> dict:
+    settings = get_settings()
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(get_settings().database_url, poolclass=MeteredQueuePool, **_pool_options())
 SessionLocal = sessionmaker(bind=engine)
 
 
@@ -12,8 +91,68 @@ class Base(DeclarativeBase):
 
 
 def get_db():
-    db = SessionLocal()
+    # Session only checks a connection out on its first statement, so routes
+    # answered from the auth and response caches never take one. Loaded objects
+    # stay readable after release_session() ends the transaction.
+    db = SessionLocal(expire_on_commit=False)
     try:
         yield db
     finally:
         db.close()
+
+
+def release_session(db: Session) -> None:
+    """Hand the session's connection back to the pool; the next statement checks out a fresh one.
+
+    Routes commit their own writes, so whatever is left open here is a read.
+    """
+    if db.in_transaction():
+        db.commit()
+
+
+# built on first use, so the default sync deployment never loads asyncpg
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        get_settings().async_database_url, poolclass=MeteredAsyncPool, **_pool_options()
+    )
+
+
+@lru_cache
+def _async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
+
+async def get_async_db():
+    async with _async_sessionmaker()() as db:
+        yield db
+
+
+def pool_stats() -> dict:
+    stats = {"pid": os.getpid(), "sync": engine.pool.stats()}
+    if get_async_engine.cache_info().currsize:
+        stats["async"] = get_async_engine().pool.stats()
+    return stats
+
+
+def check_connection_budget() -> None:
+    """Warn when every API process filling its pools could exceed the server's max_connections."""
+    settings = get_settings()
+    engines = 2 if settings.DB_ASYNC else 1
+    per_process = (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW) * engines
+    needed = per_process * settings.WEB_CONCURRENCY
+    try:
+        with engine.connect() as conn:
+            available = conn.execute(text(
+                "SELECT current_setting('max_connections')::int"
+                " - current_setting('superuser_reserved_connections')::int"
+            )).scalar_one()
+    except exc.DBAPIError:
+        logger.warning("Could not read max_connections", exc_info=True)
+        return
+    if needed > available:
+        logger.warning(
+            "%d API processes x %d pooled connections = %d, above the %d Postgres allows"
+            " (ETL workers and other clients need theirs too); lower DB_POOL_SIZE/DB_MAX_OVERFLOW",
+            settings.WEB_CONCURRENCY, per_process, needed, available,
+        )
@@ -1,15 +1,23 @@
+import functools
+import inspect
+from collections.abc import Callable
+
 from fastapi import Depends, HTTPException, Request, status
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import User
-from app.services.auth import decode_token
+from app.database import get_async_db, get_db, release_session
+from app.services.auth import (
+    CurrentUser,
+    decode_token,
+    load_current_user,
+    load_current_user_async,
+)
+from app.services.timing import endpoint_returned, phase
 
 
-def get_current_user(
-    request: Request,
-    db: Session = Depends(get_db),
-) -> User:
+def _token_user_id(request: Request) -> int:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Not authenticated")
@@ -17,9 +25,59 @@ def get_current_user(
     user_id = decode_token(token)
     if user_id is None:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
+    return user_id
+
+
+def get_current_user(
+    request: Request,
+    db: Session = Depends(get_db),
+) -> CurrentUser:
+    # with the token and user cached, this never touches the session
+    with phase("auth"):
+        user = load_current_user(db, _token_user_id(request))
+        release_session(db)
+    if user is None:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    return user
+
+
+async def get_current_user_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    with phase("auth"):
+        user = await load_current_user_async(db, _token_user_id(request))
     if user is None:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
 
     return user
+
+
+class ReleaseSessionRoute(APIRoute):
+    """Returns the request's connection to the pool as soon as a sync endpoint returns.
+
+    FastAPI validates a sync endpoint's response on another threadpool
+    thread and closes yield dependencies only after the response is sent.
+    A connection held across that hand-off can wedge the worker under a
+    burst: every thread waiting for a connection, every connection waiting
+    for a thread.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _releasing_sessions(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _releasing_sessions(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        result = endpoint(*args, **kwargs)
+        for value in kwargs.values():
+            if isinstance(value, Session):
+                release_session(value)
+        endpoint_returned()
+        return result
+
+    return wrapper
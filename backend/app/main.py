@@ -1,12 +1,23 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import Base, engine
-from app.routers import auth, datasets
+from app.config import get_settings
+from app.database import check_connection_budget, pool_stats
+from app.routers import async_api, auth, datasets
+from app.services.cache import get_cache
+from app.services.compression import DecompressRequestMiddleware
+from app.services.timing import RequestTimingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_connection_budget()
+    yield
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Task API")
+app = FastAPI(title="Task API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,7 +27,13 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["Content-Disposition"],
 )
+app.add_middleware(DecompressRequestMiddleware)
+# outermost, so its total covers the other middleware too; a no-op unless REQUEST_TIMING is on
+app.add_middleware(RequestTimingMiddleware)
 
+if get_settings().DB_ASYNC:
+    # registered first, so these take the requests for paths the sync routers also define
+    app.include_router(async_api.router)
 app.include_router(auth.router)
 app.include_router(datasets.router)
 
@@ -24,3 +41,11 @@ app.include_router(datasets.router)
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    if not get_settings().METRICS_ENABLED:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not Found")
+    # per process: with several workers, each answers for its own pools
+    return {"cache": get_cache().stats(), "db_pool": pool_stats()}
@@ -1,7 +1,10 @@
 from datetime import UTC, datetime
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    JSON, DateTime, Float, ForeignKey, Index, Integer, SmallInteger, String, Text, UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from app.database import Base
 
@@ -31,42 +34,145 @@ class Dataset(Base):
     date_max: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     total_sales: Mapped[float] = mapped_column(Float, default=0.0)
     status: Mapped[str] = mapped_column(String(20), default="processing")
+    # per-group sums and counts written once by the ETL; see AggregateAccumulator
+    aggregates: Mapped[dict | None] = mapped_column(
+        JSON().with_variant(JSONB(), "postgresql"), nullable=True, deferred=True
+    )
+    # stage and row counts of the running ETL; see services.progress
+    progress: Mapped[dict | None] = mapped_column(
+        JSON().with_variant(JSONB(), "postgresql"), nullable=True, deferred=True
+    )
+    # per-stage wall/CPU time, peak RSS and rows/sec of the last ETL run; see services.telemetry
+    etl_stats: Mapped[dict | None] = mapped_column(
+        JSON().with_variant(JSONB(), "postgresql"), nullable=True, deferred=True
+    )
+    # bumped by every ORM update, so anything cached under an older version is stale
+    version: Mapped[int] = mapped_column(Integer, server_default="1")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
     )
 
     user: Mapped["User"] = relationship(back_populates="datasets")
+    # passive_deletes: records are never loaded to delete them, ON DELETE CASCADE
+    # (or dropping the partition, see services.datasets) removes them
     records: Mapped[list["SalesRecord"]] = relationship(
-        back_populates="dataset", cascade="all, delete-orphan"
+        back_populates="dataset", cascade="all, delete-orphan", passive_deletes=True
     )
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 class SalesRecord(Base):
     __tablename__ = "sales_records"
     __table_args__ = (
         UniqueConstraint(
-            "dataset_id", "order_number", "product_code",
+            "dataset_id", "order_number", "product_code_id",
             name="uq_dataset_order_product",
         ),
+        # one per detail-view sort column so a page, or a keyset cursor, is an index
+        # range scan; order_number is already covered by uq_dataset_order_product.
+        # Dimension codes sort like their values (see services.dimensions).
+        *(
+            Index(f"ix_sales_records_dataset_{col}", "dataset_id", col, "id")
+            for col in (
+                "order_date", "sales", "total_sales",
+                "customer_name_id", "product_line_id", "status_id", "deal_size_id",
+            )
+        ),
+        Index("ix_sales_records_dataset_status_date", "dataset_id", "status_id", "order_date"),
+        Index("ix_sales_records_dataset_product_line_date", "dataset_id", "product_line_id", "order_date"),
+        Index("ix_sales_records_order_date_brin", "order_date", postgresql_using="brin"),
+        # one partition per dataset, see services.partitions
+        {"postgresql_partition_by": "LIST (dataset_id)"},
     )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    dataset_id: Mapped[int] = mapped_column(ForeignKey("datasets.id"), index=True)
+    # a partitioned table's primary key has to include the partition key
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    dataset_id: Mapped[int] = mapped_column(ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True)
 
     order_number: Mapped[int] = mapped_column(Integer)
     quantity_ordered: Mapped[int] = mapped_column(Integer)
     price_each: Mapped[float] = mapped_column(Float)
     sales: Mapped[float] = mapped_column(Float)
     order_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    status: Mapped[str] = mapped_column(String(50))
     month_id: Mapped[int] = mapped_column(Integer)
     year_id: Mapped[int] = mapped_column(Integer)
-    product_line: Mapped[str] = mapped_column(String(100))
-    product_code: Mapped[str] = mapped_column(String(50))
-    customer_name: Mapped[str] = mapped_column(String(255))
-    country: Mapped[str] = mapped_column(String(100))
-    deal_size: Mapped[str] = mapped_column(String(20))
     total_sales: Mapped[float] = mapped_column(Float)
     order_quarter: Mapped[str] = mapped_column(String(2), default="Q1")
 
+    # codes into the dataset's dimension tables below
+    status_id: Mapped[int] = mapped_column(SmallInteger)
+    product_line_id: Mapped[int] = mapped_column(SmallInteger)
+    product_code_id: Mapped[int] = mapped_column(Integer)
+    customer_name_id: Mapped[int] = mapped_column(Integer)
+    country_id: Mapped[int] = mapped_column(SmallInteger)
+    deal_size_id: Mapped[int] = mapped_column(SmallInteger)
+
     dataset: Mapped["Dataset"] = relationship(back_populates="records")
+
+
+class _DimensionValue:
+    """One distinct value of a sales_records text column within a dataset."""
+
+    dataset_id: Mapped[int] = mapped_column(
+        ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True
+    )
+    code: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[str] = mapped_column(String(255))
+
+    @declared_attr.directive
+    def __table_args__(cls) -> tuple:
+        return (UniqueConstraint("dataset_id", "value", name=f"uq_{cls.__tablename__}_value"),)
+
+
+class StatusValue(_DimensionValue, Base):
+    __tablename__ = "dim_status"
+
+
+class ProductLineValue(_DimensionValue, Base):
+    __tablename__ = "dim_product_line"
+
+
+class ProductCodeValue(_DimensionValue, Base):
+    __tablename__ = "dim_product_code"
+
+
+class CustomerNameValue(_DimensionValue, Base):
+    __tablename__ = "dim_customer_name"
+
+
+class CountryValue(_DimensionValue, Base):
+    __tablename__ = "dim_country"
+
+
+class DealSizeValue(_DimensionValue, Base):
+    __tablename__ = "dim_deal_size"
+
+
+# SalesRecordOut field -> its dimension table; sales_records holds `{field}_id`
+DIMENSIONS: dict[str, type[_DimensionValue]] = {
+    "status": StatusValue,
+    "product_line": ProductLineValue,
+    "product_code": ProductCodeValue,
+    "customer_name": CustomerNameValue,
+    "country": CountryValue,
+    "deal_size": DealSizeValue,
+}
+
+
+class EtlJob(Base):
+    __tablename__ = "etl_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    dataset_id: Mapped[int] = mapped_column(ForeignKey("datasets.id"), index=True)
+    path: Mapped[str] = mapped_column(String(1024))
+    # "load" for a new dataset, "append" to add the file to a ready one
+    kind: Mapped[str] = mapped_column(String(20), default="load")
+    status: Mapped[str] = mapped_column(String(20), default="queued", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # refreshed by the worker's heartbeat; a stale lease means the worker died
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC)
+    )
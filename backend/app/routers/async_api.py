@@ -0,0 +1,123 @@
+"""Async versions of the high-frequency endpoints, mounted ahead of the sync ones when DB_ASYNC is set.
+
+Status polls, listing, /me and sign-in hold no thread while they wait on
+Postgres or the hashing pool, so in-flight requests per worker are bounded
+by the DB pool rather than by the request threadpool. Upload, export and
+the detail/records queries stay sync in both modes.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.database import get_async_db
+from app.dependencies import get_current_user_async
+from app.models import Dataset, User
+from app.schemas import (
+    DatasetListResponse,
+    DatasetStatus,
+    DatasetSummary,
+    MeResponse,
+    MessageResponse,
+    UserLogin,
+    UserRegister,
+)
+from app.services.auth import (
+    CurrentUser,
+    hash_password_async,
+    set_auth_cookies,
+    verify_password_async,
+)
+
+router = APIRouter(prefix="/api")
+
+
+@router.post(
+    "/register",
+    response_model=MessageResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Register a new user",
+    tags=["auth"],
+)
+async def register_async(
+    body: UserRegister, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    if await db.scalar(select(User.id).where(User.email == body.email)):
+        raise HTTPException(status.HTTP_409_CONFLICT, "Email already registered")
+
+    user = User(email=body.email, hashed_password=await hash_password_async(body.password))
+    db.add(user)
+    await db.commit()
+
+    set_auth_cookies(response, user.id)
+    return MessageResponse(message="ok")
+
+
+@router.post(
+    "/login",
+    response_model=MessageResponse,
+    summary="Log in with email and password",
+    tags=["auth"],
+)
+async def login_async(
+    body: UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    user = (
+        await db.execute(select(User.id, User.hashed_password).where(User.email == body.email))
+    ).first()
+    if not user or not await verify_password_async(body.password, user.hashed_password):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid email or password")
+
+    set_auth_cookies(response, user.id)
+    return MessageResponse(message="ok")
+
+
+@router.get(
+    "/me",
+    response_model=MeResponse,
+    summary="Get current user info",
+    tags=["auth"],
+)
+async def me_async(user: CurrentUser = Depends(get_current_user_async)):
+    return MeResponse(email=user.email)
+
+
+@router.get(
+    "/datasets",
+    response_model=DatasetListResponse,
+    summary="List all datasets for the current user",
+    tags=["datasets"],
+)
+async def list_datasets_async(
+    user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    datasets = await db.scalars(
+        select(Dataset)
+        .where(Dataset.user_id == user.id)
+        .order_by(Dataset.created_at.desc())
+    )
+    return DatasetListResponse(
+        datasets=[DatasetSummary.model_validate(d) for d in datasets]
+    )
+
+
+@router.get(
+    "/datasets/{dataset_id}/status",
+    response_model=DatasetStatus,
+    summary="Poll dataset processing status",
+    tags=["datasets"],
+)
+async def get_dataset_status_async(
+    dataset_id: int,
+    user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    dataset = await db.scalar(
+        select(Dataset)
+        .options(undefer(Dataset.progress), undefer(Dataset.etl_stats))
+        .where(Dataset.id == dataset_id, Dataset.user_id == user.id)
+    )
+    if not dataset:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dataset not found")
+    return DatasetStatus.model_validate(dataset)
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.dependencies import get_current_user
+from app.dependencies import ReleaseSessionRoute, get_current_user
 from app.models import User
 from app.schemas import UserRegister, UserLogin, MessageResponse, MeResponse
 from app.services.auth import (
+    CurrentUser,
     hash_password,
     verify_password,
     set_auth_cookies,
     clear_auth_cookies,
+    forget_token,
 )
 
-router = APIRouter(prefix="/api", tags=["auth"])
+router = APIRouter(prefix="/api", tags=["auth"], route_class=ReleaseSessionRoute)
 
 
 @router.post(
@@ -53,7 +55,10 @@ def login(body: UserLogin, response: Response, db: Session = Depends(get_db)):
     response_model=MessageResponse,
     summary="Log out and clear cookies",
 )
-def logout(response: Response):
+def logout(request: Request, response: Response):
+    token = request.cookies.get("access_token")
+    if token:
+        forget_token(token)
     clear_auth_cookies(response)
     return MessageResponse(message="ok")
 
@@ -63,5 +68,5 @@ def logout(response: Response):
     response_model=MeResponse,
     summary="Get current user info",
 )
-def me(user: User = Depends(get_current_user)):
+def me(user: CurrentUser = Depends(get_current_user)):
     return MeResponse(email=user.email)
@@ -1,43 +1,84 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile, status
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, undefer
 
 from app.database import get_db
-from app.dependencies import get_current_user
-from app.models import Dataset, SalesRecord, User
+from app.dependencies import ReleaseSessionRoute, get_current_user
+from app.models import Dataset, SalesRecord
 from app.schemas import (
+    DatasetAggregates,
     DatasetDetailResponse,
     DatasetListResponse,
+    DatasetRecordsResponse,
+    DatasetStatus,
     DatasetSummary,
     SalesRecordOut,
     UploadStats,
 )
-from app.services.aggregates import build_aggregates
-from app.services.export import export_csv
-from app.services.etl import parse_csv, process_dataset
+from app.services.aggregates import cached_aggregates
+from app.services.auth import CurrentUser
+from app.services.cache import cache_key, get_cache
+from app.services.compression import compress_stream, negotiate_encoding
+from app.services.datasets import append_to_dataset, delete_dataset
+from app.services.dimensions import DimensionCodes
+from app.services.export import export_arrow, export_csv, export_parquet
+from app.services.etl import spool_upload, upload_suffix
+from app.services.jobs import enqueue_etl
+from app.services.pagination import Cursor, decode_cursor, encode_cursor, keyset_page
+from app.services.progress import progress_events
+from app.services.records import DEFAULT_SORT, SORT_COLUMNS, filter_records, record_values, stored_column
+from app.services.timing import phase
+
+router = APIRouter(prefix="/api", tags=["datasets"], route_class=ReleaseSessionRoute)
+
+INCLUDE_PARTS = ("records", "aggregates", "counts")
 
-router = APIRouter(prefix="/api", tags=["datasets"])
+# export format -> (exporter, media type, file suffix, worth compressing in transit);
+# Parquet pages are compressed already
+EXPORT_FORMATS = {
+    "csv": (export_csv, "text/csv", ".csv", True),
+    "parquet": (export_parquet, "application/vnd.apache.parquet", ".parquet", False),
+    "arrow": (export_arrow, "application/vnd.apache.arrow.file", ".arrow", True),
+}
 
-# TODO: add DELETE
 # TODO: add size/rate limiting
 
 
+def _spool(file: UploadFile) -> Path:
+    if upload_suffix(file.filename) is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Only CSV (optionally .gz or .zst), Parquet and Arrow files are accepted"
+        )
+    # the request only stores the raw file; an ETL worker picks the job up
+    return spool_upload(file)
+
+
+def _owned_dataset(db: Session, dataset_id: int, user: CurrentUser, *options) -> Dataset:
+    dataset = db.query(Dataset).options(*options).filter(
+        Dataset.id == dataset_id, Dataset.user_id == user.id
+    ).first()
+    if not dataset:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dataset not found")
+    return dataset
+
+
 @router.post(
     "/upload",
     response_model=UploadStats,
     status_code=status.HTTP_201_CREATED,
-    summary="Upload a CSV file for ETL processing",
+    summary="Upload a CSV, Parquet or Arrow file for ETL processing",
 )
 def upload_csv(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    if not file.filename or not file.filename.endswith(".csv"):
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Only CSV files are accepted")
-
-    df = parse_csv(file)
+    path = _spool(file)
 
     dataset = Dataset(
         user_id=user.id,
@@ -48,10 +89,9 @@ def upload_csv(
         status="processing",
     )
     db.add(dataset)
+    db.flush()
+    enqueue_etl(db, dataset, path)
     db.commit()
-    db.refresh(dataset)
-
-    background_tasks.add_task(process_dataset, dataset.id, df)
 
     return UploadStats(
         dataset_id=dataset.id,
@@ -64,13 +104,38 @@ def upload_csv(
     )
 
 
+@router.post(
+    "/datasets/{dataset_id}/append",
+    response_model=UploadStats,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Append a CSV, Parquet or Arrow file to a dataset",
+)
+def append_upload(
+    dataset_id: int,
+    file: UploadFile = File(...),
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    dataset = _owned_dataset(db, dataset_id, user)
+    append_to_dataset(db, dataset, _spool(file))
+    return UploadStats(
+        dataset_id=dataset.id,
+        status=dataset.status,
+        row_count=dataset.row_count,
+        rows_dropped=dataset.rows_dropped,
+        date_min=dataset.date_min,
+        date_max=dataset.date_max,
+        total_sales=dataset.total_sales,
+    )
+
+
 @router.get(
     "/datasets",
     response_model=DatasetListResponse,
     summary="List all datasets for the current user",
 )
 def list_datasets(
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     datasets = (
@@ -84,22 +149,135 @@ def list_datasets(
     )
 
 
+# declared ahead of /datasets/{dataset_id}, which would otherwise take "events" as an id
+@router.get(
+    "/datasets/events",
+    summary="Stream progress of the user's in-flight datasets (Server-Sent Events)",
+    response_class=StreamingResponse,
+)
+async def dataset_events(
+    ids: list[int] = Query([], description="Datasets whose current state is sent even if no longer processing"),
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return StreamingResponse(
+        progress_events(db, user.id, ids),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx would otherwise hold events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/datasets/{dataset_id}/status",
-    response_model=DatasetSummary,
+    response_model=DatasetStatus,
     summary="Poll dataset processing status",
 )
 def get_dataset_status(
     dataset_id: int,
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, Dataset.user_id == user.id
-    ).first()
-    if not dataset:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dataset not found")
-    return DatasetSummary.model_validate(dataset)
+    dataset = _owned_dataset(db, dataset_id, user, undefer(Dataset.progress), undefer(Dataset.etl_stats))
+    return DatasetStatus.model_validate(dataset)
+
+
+@router.delete(
+    "/datasets/{dataset_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Delete a dataset and its records",
+)
+def remove_dataset(
+    dataset_id: int,
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    delete_dataset(db, _owned_dataset(db, dataset_id, user))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@dataclass
+class RecordQuery:
+    """Paging, sorting and filter parameters shared by the detail and records endpoints."""
+
+    page: int = Query(1, ge=1)
+    page_size: int = Query(20, ge=1, le=100)
+    sort_by: str = Query("order_number")
+    sort_dir: str = Query("asc", pattern="^(asc|desc)$")
+    status_filter: str | None = Query(None)
+    product_line: str | None = Query(None)
+    date_from: str | None = Query(None)
+    date_to: str | None = Query(None)
+    cursor: str | None = Query(None, description="next_cursor/prev_cursor from a previous page; replaces page")
+    include_total: bool = Query(True, description="Count matching records; skip for cheaper deep paging")
+
+    @property
+    def sort_column(self) -> str:
+        return self.sort_by if self.sort_by in SORT_COLUMNS else DEFAULT_SORT
+
+    def cache_params(self) -> dict:
+        return {**asdict(self), "sort_by": self.sort_column}
+
+
+def _cached_response(key: str, build: Callable[[], BaseModel]) -> Response:
+    # callers check ownership before building the key, so a hit is never another user's data
+    cache = get_cache()
+    body = cache.get(key)
+    if body is None:
+        model = build()
+        with phase("serialize"):
+            body = model.model_dump_json().encode()
+        cache.set(key, body)
+    return Response(body, media_type="application/json")
+
+
+def _parse_include(include: str) -> set[str]:
+    parts = {part.strip() for part in include.split(",") if part.strip()}
+    unknown = parts - set(INCLUDE_PARTS)
+    if unknown:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"Unknown include: {', '.join(sorted(unknown))}"
+        )
+    return parts
+
+
+def _records_page(
+    db: Session, dataset_id: int, query: RecordQuery, with_records: bool, with_total: bool
+) -> DatasetRecordsResponse:
+    col_name = query.sort_column
+    q = filter_records(
+        db, dataset_id, query.status_filter, query.product_line, query.date_from, query.date_to
+    )
+    with phase("count"):
+        total_records = q.count() if with_total else None
+    page = DatasetRecordsResponse(
+        records=None, page=query.page, page_size=query.page_size, total_records=total_records
+    )
+    if not with_records:
+        return page
+
+    position = decode_cursor(query.cursor, col_name, query.sort_dir) if query.cursor else None
+    offset = 0 if position else (query.page - 1) * query.page_size
+    sort_col = stored_column(col_name)
+    with phase("records"):
+        records, has_more = keyset_page(
+            q, sort_col, SalesRecord.id,
+            query.sort_dir == "desc", position, query.page_size, offset,
+        )
+
+    def cursor_at(record: SalesRecord, backward: bool) -> str:
+        return encode_cursor(Cursor(col_name, query.sort_dir, getattr(record, sort_col.key), record.id, backward))
+
+    backward = position is not None and position.backward
+    has_next = backward or has_more
+    has_prev = has_more if backward else (position is not None or query.page > 1)
+
+    with phase("records"):
+        codes = DimensionCodes.load(db, dataset_id) if records else None
+        page.records = [SalesRecordOut.model_validate(record_values(r, codes)) for r in records]
+    page.next_cursor = cursor_at(records[-1], False) if records and has_next else None
+    page.prev_cursor = cursor_at(records[0], True) if records and has_prev else None
+    return page
 
 
 @router.get(
@@ -109,79 +287,90 @@ def get_dataset_status(
 )
 def get_dataset(
     dataset_id: int,
-    user: User = Depends(get_current_user),
+    query: RecordQuery = Depends(),
+    include: str = Query(
+        ",".join(INCLUDE_PARTS),
+        description="Comma-separated parts to compute: records, aggregates, counts. Omitted parts are null.",
+    ),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    sort_by: str = Query("order_number"),
-    sort_dir: str = Query("asc", pattern="^(asc|desc)$"),
-    status_filter: str | None = Query(None),
-    product_line: str | None = Query(None),
-    date_from: str | None = Query(None),
-    date_to: str | None = Query(None),
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, Dataset.user_id == user.id
-    ).first()
-    if not dataset:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dataset not found")
+    parts = _parse_include(include)
+    dataset = _owned_dataset(db, dataset_id, user)
 
-    q = db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset_id)
-    if status_filter:
-        q = q.filter(SalesRecord.status == status_filter)
-    if product_line:
-        q = q.filter(SalesRecord.product_line == product_line)
-    if date_from:
-        q = q.filter(SalesRecord.order_date >= date_from)
-    if date_to:
-        q = q.filter(SalesRecord.order_date <= date_to)
-
-    allowed_sort = {
-        "order_number", "order_date", "sales", "total_sales",
-        "customer_name", "product_line", "status", "deal_size",
-    }
-    col_name = sort_by if sort_by in allowed_sort else "order_number"
-    col = getattr(SalesRecord, col_name)
-    q = q.order_by(col.desc() if sort_dir == "desc" else col.asc())
-
-    total_records = q.count()
-    records = q.offset((page - 1) * page_size).limit(page_size).all()
-
-    return DatasetDetailResponse(
-        id=dataset.id,
-        filename=dataset.filename,
-        row_count=dataset.row_count,
-        date_min=dataset.date_min,
-        date_max=dataset.date_max,
-        created_at=dataset.created_at,
-        status=dataset.status,
-        aggregates=build_aggregates(db, dataset_id),
-        records=[SalesRecordOut.model_validate(r) for r in records],
-        page=page,
-        page_size=page_size,
-        total_records=total_records,
+    def build() -> DatasetDetailResponse:
+        page = _records_page(
+            db, dataset_id, query, "records" in parts, "counts" in parts and query.include_total
+        )
+        return DatasetDetailResponse(
+            id=dataset.id,
+            filename=dataset.filename,
+            row_count=dataset.row_count,
+            date_min=dataset.date_min,
+            date_max=dataset.date_max,
+            created_at=dataset.created_at,
+            status=dataset.status,
+            aggregates=cached_aggregates(db, dataset) if "aggregates" in parts else None,
+            **dict(page),
+        )
+
+    key = cache_key(
+        "detail", dataset.id, dataset.version, {**query.cache_params(), "include": sorted(parts)}
     )
+    return _cached_response(key, build)
+
+
+@router.get(
+    "/datasets/{dataset_id}/records",
+    response_model=DatasetRecordsResponse,
+    summary="Get one page of dataset records",
+)
+def get_dataset_records(
+    dataset_id: int,
+    query: RecordQuery = Depends(),
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    dataset = _owned_dataset(db, dataset_id, user)
+    key = cache_key("records", dataset.id, dataset.version, query.cache_params())
+    return _cached_response(key, lambda: _records_page(db, dataset_id, query, True, query.include_total))
+
+
+@router.get(
+    "/datasets/{dataset_id}/aggregates",
+    response_model=DatasetAggregates,
+    summary="Get dataset aggregates",
+)
+def get_dataset_aggregates(
+    dataset_id: int,
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return cached_aggregates(db, _owned_dataset(db, dataset_id, user))
 
 
 @router.get(
     "/datasets/{dataset_id}/export",
-    summary="Export dataset records as CSV",
+    summary="Export dataset records as CSV, Parquet or Arrow",
 )
 def export_dataset(
     dataset_id: int,
-    user: User = Depends(get_current_user),
+    format: str = Query("csv", pattern="^(csv|parquet|arrow)$"),
+    accept_encoding: str | None = Header(None),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    dataset = db.query(Dataset).filter(
-        Dataset.id == dataset_id, Dataset.user_id == user.id
-    ).first()
-    if not dataset:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dataset not found")
+    dataset = _owned_dataset(db, dataset_id, user)
 
-    stem = dataset.filename.rsplit(".", 1)[0] if "." in dataset.filename else dataset.filename
+    # all of a compressed upload's suffix: sales.csv.gz exports as sales.csv, not sales.csv.csv
+    uploaded = upload_suffix(dataset.filename)
+    stem = dataset.filename[:-len(uploaded)] if uploaded else dataset.filename.rsplit(".", 1)[0]
+    exporter, media_type, suffix, compressible = EXPORT_FORMATS[format]
+    body = exporter(db, dataset_id)
+    headers = {"Content-Disposition": f'attachment; filename="{stem}{suffix}"', "Vary": "Accept-Encoding"}
+    coding = negotiate_encoding(accept_encoding) if compressible else None
+    if coding:
+        body = compress_stream(body, coding)
+        headers["Content-Encoding"] = coding
 
-    return StreamingResponse(
-        export_csv(db, dataset_id),
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{stem}.csv"'},
-    )
+    return StreamingResponse(body, media_type=media_type, headers=headers)
@@ -48,6 +48,42 @@ class DatasetSummary(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class EtlStageTiming(BaseModel):
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_mb: float | None
+    rows: int
+    rows_per_second: int | None
+
+
+class EtlStage(EtlStageTiming):
+    name: str
+
+
+class EtlStats(BaseModel):
+    # in the order the stages first ran; chunked stages are summed over all chunks
+    stages: list[EtlStage]
+    total: EtlStageTiming
+
+
+class EtlProgress(BaseModel):
+    stage: str
+    # input rows, duplicates included; None until the file has been read
+    rows_total: int | None
+    rows_parsed: int
+    rows_loaded: int
+
+
+class DatasetProgress(DatasetSummary):
+    # None until the ETL has started
+    progress: EtlProgress | None
+
+
+class DatasetStatus(DatasetProgress):
+    # None until an ETL run has finished, or for datasets loaded before it was recorded
+    etl_stats: EtlStats | None
+
+
 class DatasetListResponse(BaseModel):
     datasets: list[DatasetSummary]
 
@@ -109,8 +145,21 @@ class DatasetDetailResponse(BaseModel):
     date_max: datetime | None
     created_at: datetime
     status: str
-    aggregates: DatasetAggregates
-    records: list[SalesRecordOut]
+    # None when left out of include=
+    aggregates: DatasetAggregates | None
+    records: list[SalesRecordOut] | None
+    page: int
+    page_size: int
+    # None when counts is left out of include= or the request passed include_total=false
+    total_records: int | None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+class DatasetRecordsResponse(BaseModel):
+    records: list[SalesRecordOut] | None
     page: int
     page_size: int
-    total_records: int
+    total_records: int | None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
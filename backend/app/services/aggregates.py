@@ -1,82 +1,281 @@
-from sqlalchemy import func
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, or_, select, tuple_
 from sqlalchemy.orm import Session
 
-from app.models import SalesRecord
+from app.models import Dataset, SalesRecord
 from app.schemas import (
     CountrySales,
     CustomerSales,
     DatasetAggregates,
     QuarterlySales,
 )
+from app.services.cache import cache_key, get_cache
+from app.services.dimensions import DimensionCodes
+from app.services.timing import phase
 
 
-def build_aggregates(db: Session, dataset_id: int) -> DatasetAggregates:
-    total_sales = db.query(func.sum(SalesRecord.total_sales)).filter(
-        SalesRecord.dataset_id == dataset_id
-    ).scalar() or 0.0
+TOP_N = 10
 
-    total_orders = db.query(func.count(func.distinct(SalesRecord.order_number))).filter(
-        SalesRecord.dataset_id == dataset_id
-    ).scalar() or 0
+# GROUPING(year_id, order_quarter, country, customer_name) bitmasks: a set bit
+# marks a rolled-up column, first argument is the high bit
+GROUP_TOTAL = 0b1111
+GROUP_QUARTER = 0b0011
+GROUP_COUNTRY = 0b1101
+GROUP_CUSTOMER = 0b1110
 
-    avg_order = total_sales / total_orders if total_orders > 0 else 0.0
+# every finite double is a whole multiple of 2**-1074 and frexp() leaves a
+# 53-bit mantissa, so scaled by 2**EXACT_SHIFT every value is an integer
+EXACT_SHIFT = 1074 + 53
+# mantissas are summed as two halves so int64 sums cannot overflow
+HALF_BITS = 26
 
-    sales_by_quarter = (
-        db.query(
-            SalesRecord.year_id,
-            SalesRecord.order_quarter,
-            func.sum(SalesRecord.total_sales).label("total_sales"),
-            func.count().label("order_count"),
+
+def _exact_parts(values: np.ndarray) -> pd.DataFrame:
+    """Each value as high and low mantissa halves and the shift that scales them."""
+    if not np.isfinite(values).all():
+        raise ValueError("Sales totals must be finite to be summed")
+    mantissa, exponent = np.frexp(values)
+    whole = (mantissa * 2.0**53).astype(np.int64)
+    return pd.DataFrame({
+        "high": whole >> HALF_BITS,
+        "low": whole & ((1 << HALF_BITS) - 1),
+        "shift": exponent.astype(np.int64) + 1074,
+    })
+
+
+def _scaled(high, low, shift) -> int:
+    return ((int(high) << HALF_BITS) + int(low)) << int(shift)
+
+
+def scaled_float(value: float) -> int:
+    numerator, denominator = float(value).as_integer_ratio()
+    return numerator * ((1 << EXACT_SHIFT) // denominator)
+
+
+def unscaled(total: int) -> float:
+    # int / int is correctly rounded
+    return total / (1 << EXACT_SHIFT)
+
+
+def scaled_sum(values: Iterable[float]) -> int:
+    """The exact sum of `values` as an integer scaled by 2**EXACT_SHIFT.
+
+    Unlike a float sum, adding these up gives the same result however the
+    values were split into chunks, so streamed and in-memory loads agree.
+    """
+    parts = _exact_parts(np.asarray(values, dtype=np.float64))
+    sums = parts.groupby("shift", sort=False)[["high", "low"]].sum()
+    return sum(_scaled(high, low, shift) for shift, high, low in zip(sums.index, sums["high"], sums["low"]))
+
+
+def exact_sum(values: Iterable[float], start: float = 0.0) -> float:
+    """start + sum(values), rounded once."""
+    return unscaled(scaled_float(start) + scaled_sum(values))
+
+
+class AggregateAccumulator:
+    """Mergeable aggregate state built from record frames during ETL.
+
+    Keeps the sum and row count of every quarter, country and customer
+    rather than just the top ten, so the state persisted on Dataset can
+    be turned into DatasetAggregates without touching sales_records.
+    """
+
+    def __init__(self, state: dict | None = None, stored_orders: Iterable[int] = ()):
+        state = state or {}
+        # sums are kept exact (see scaled_sum) and rounded to float on the way out
+        self._total: int = scaled_float(state.get("total_sales", 0.0))
+        self._base_orders: int = state.get("total_orders", 0)
+        self._orders: set[int] = set()
+        # orders that update() may see again but `state` already counts, when appending
+        self._stored_orders: set[int] = set(stored_orders)
+        self.quarters: dict[tuple[int, str], list] = {
+            (year, quarter): [scaled_float(total), count]
+            for year, quarter, total, count in state.get("quarters", [])
+        }
+        self.countries: dict[str, list] = {
+            k: [scaled_float(t), c] for k, (t, c) in state.get("countries", {}).items()
+        }
+        self.customers: dict[str, list] = {
+            k: [scaled_float(t), c] for k, (t, c) in state.get("customers", {}).items()
+        }
+
+    @property
+    def total_sales(self) -> float:
+        return unscaled(self._total)
+
+    @property
+    def total_orders(self) -> int:
+        return self._base_orders + len(self._orders - self._stored_orders)
+
+    @staticmethod
+    def _merge(groups: dict, frame: pd.DataFrame, by: str | list[str]) -> None:
+        keys = [by] if isinstance(by, str) else by
+        parts = _exact_parts(frame["total_sales"].to_numpy(dtype=np.float64))
+        for key in keys:
+            parts[key] = frame[key].to_numpy()
+        sums = parts.groupby([*keys, "shift"], sort=False)[["high", "low"]].sum()
+        for (*key, shift), high, low in zip(sums.index, sums["high"], sums["low"]):
+            entry = groups.setdefault(key[0] if isinstance(by, str) else tuple(key), [0, 0])
+            entry[0] += _scaled(high, low, shift)
+        for key, count in frame.groupby(by, sort=False).size().items():
+            groups[key][1] += int(count)
+
+    def update(self, frame: pd.DataFrame) -> None:
+        """Fold in a frame laid out like sales_records (see etl.to_record_frame)."""
+        if frame.empty:
+            return
+        self._total += scaled_sum(frame["total_sales"])
+        self._orders.update(frame["order_number"].unique().tolist())
+        self._merge(self.quarters, frame, ["year_id", "order_quarter"])
+        self._merge(self.countries, frame, "country")
+        self._merge(self.customers, frame, "customer_name")
+
+    def to_state(self) -> dict:
+        return {
+            "total_sales": self.total_sales,
+            "total_orders": self.total_orders,
+            "quarters": [[int(y), q, unscaled(t), c] for (y, q), (t, c) in self.quarters.items()],
+            "countries": {k: [unscaled(t), c] for k, (t, c) in self.countries.items()},
+            "customers": {k: [unscaled(t), c] for k, (t, c) in self.customers.items()},
+        }
+
+    def result(self) -> DatasetAggregates:
+        def top(groups: dict) -> list[tuple[str, float, int]]:
+            ranked = sorted(groups.items(), key=lambda kv: (-kv[1][0], kv[0]))
+            return [(k, unscaled(t), c) for k, (t, c) in ranked[:TOP_N]]
+
+        total_orders = self.total_orders
+        avg_order = self.total_sales / total_orders if total_orders > 0 else 0.0
+        return DatasetAggregates(
+            total_sales=self.total_sales,
+            total_orders=total_orders,
+            avg_order_value=round(avg_order, 2),
+            sales_by_quarter=[
+                QuarterlySales(year=y, quarter=q, total_sales=unscaled(t), order_count=c)
+                for (y, q), (t, c) in sorted(self.quarters.items())
+            ],
+            sales_by_country=[
+                CountrySales(country=k, total_sales=t, order_count=c)
+                for k, t, c in top(self.countries)
+            ],
+            sales_by_customer=[
+                CustomerSales(customer_name=k, total_sales=t, order_count=c)
+                for k, t, c in top(self.customers)
+            ],
         )
-        .filter(SalesRecord.dataset_id == dataset_id)
-        .group_by(SalesRecord.year_id, SalesRecord.order_quarter)
-        .order_by(SalesRecord.year_id, SalesRecord.order_quarter)
-        .all()
-    )
 
-    sales_by_country = (
-        db.query(
-            SalesRecord.country,
-            func.sum(SalesRecord.total_sales).label("total_sales"),
+
+def build_aggregates(db: Session, dataset_id: int) -> DatasetAggregates:
+    """Aggregates stored by the ETL; datasets loaded before that fall back to a live query."""
+    state = db.query(Dataset.aggregates).filter(Dataset.id == dataset_id).scalar()
+    if state is not None:
+        return AggregateAccumulator(state).result()
+    return compute_aggregates(db, dataset_id)
+
+
+@phase("aggregates")
+def cached_aggregates(db: Session, dataset: Dataset) -> DatasetAggregates:
+    cache = get_cache()
+    key = cache_key("aggregates", dataset.id, dataset.version)
+    if (body := cache.get(key)) is not None:
+        return DatasetAggregates.model_validate_json(body)
+    aggregates = build_aggregates(db, dataset.id)
+    cache.set(key, aggregates.model_dump_json().encode())
+    return aggregates
+
+
+def compute_aggregates(db: Session, dataset_id: int, *filters) -> DatasetAggregates:
+    """Live aggregates over a dataset, optionally narrowed by extra SalesRecord filters.
+
+    One statement, one round trip. The rows are hash-aggregated once at
+    (year, quarter, country, customer) grain; GROUPING SETS over that small
+    result yields the total, quarterly, country and customer groups, and a
+    row_number() window trims the last two to the top N. Distinct orders
+    come from an uncorrelated subquery, since a DISTINCT aggregate inside
+    the grouping sets would force a sort of every row. Countries and
+    customers are grouped by their dimension codes and decoded afterwards.
+    """
+    r = SalesRecord
+    where = (r.dataset_id == dataset_id, *filters)
+    base = (
+        select(
+            r.year_id,
+            r.order_quarter,
+            r.country_id.label("country"),
+            r.customer_name_id.label("customer_name"),
+            func.sum(r.total_sales).label("total_sales"),
             func.count().label("order_count"),
         )
-        .filter(SalesRecord.dataset_id == dataset_id)
-        .group_by(SalesRecord.country)
-        .order_by(func.sum(SalesRecord.total_sales).desc())
-        .limit(10)
-        .all()
+        .where(*where)
+        .group_by(r.year_id, r.order_quarter, r.country_id, r.customer_name_id)
+        .cte("base")
     )
-
-    sales_by_customer = (
-        db.query(
-            SalesRecord.customer_name,
-            func.sum(SalesRecord.total_sales).label("total_sales"),
-            func.count().label("order_count"),
+    distinct_orders = (
+        select(func.count())
+        .select_from(select(r.order_number).where(*where).distinct().subquery())
+        .scalar_subquery()
+    )
+    grouped = (
+        select(
+            base.c.year_id,
+            base.c.order_quarter,
+            base.c.country,
+            base.c.customer_name,
+            func.grouping(base.c.year_id, base.c.order_quarter, base.c.country, base.c.customer_name).label("grp"),
+            func.sum(base.c.total_sales).label("total_sales"),
+            func.sum(base.c.order_count).label("order_count"),
+            distinct_orders.label("distinct_orders"),
         )
-        .filter(SalesRecord.dataset_id == dataset_id)
-        .group_by(SalesRecord.customer_name)
-        .order_by(func.sum(SalesRecord.total_sales).desc())
-        .limit(10)
-        .all()
+        .group_by(func.grouping_sets(
+            tuple_(),
+            tuple_(base.c.year_id, base.c.order_quarter),
+            base.c.country,
+            base.c.customer_name,
+        ))
+        .subquery()
+    )
+    rank = func.row_number().over(
+        partition_by=grouped.c.grp,
+        order_by=(grouped.c.total_sales.desc(), grouped.c.country, grouped.c.customer_name),
     )
+    ranked = select(grouped, rank.label("rank")).subquery()
+    rows = db.execute(
+        select(ranked).where(or_(
+            ranked.c.grp.in_([GROUP_TOTAL, GROUP_QUARTER]),
+            ranked.c.rank <= TOP_N,
+        ))
+    ).all()
+    codes = DimensionCodes.load(db, dataset_id)
+
+    total_sales, total_orders = 0.0, 0
+    quarters, countries, customers = [], [], []
+    for row in rows:
+        if row.grp == GROUP_TOTAL:
+            total_sales = row.total_sales or 0.0
+            total_orders = row.distinct_orders or 0
+        elif row.grp == GROUP_QUARTER:
+            quarters.append(QuarterlySales(year=row.year_id, quarter=row.order_quarter,
+                                           total_sales=row.total_sales, order_count=int(row.order_count)))
+        elif row.grp == GROUP_COUNTRY:
+            countries.append((row.rank, CountrySales(country=codes.decode("country", row.country),
+                                                     total_sales=row.total_sales,
+                                                     order_count=int(row.order_count))))
+        elif row.grp == GROUP_CUSTOMER:
+            customers.append((row.rank, CustomerSales(customer_name=codes.decode("customer_name", row.customer_name),
+                                                      total_sales=row.total_sales,
+                                                      order_count=int(row.order_count))))
+
+    avg_order = total_sales / total_orders if total_orders > 0 else 0.0
 
     return DatasetAggregates(
         total_sales=total_sales,
         total_orders=total_orders,
         avg_order_value=round(avg_order, 2),
-        sales_by_quarter=[
-            QuarterlySales(year=r.year_id, quarter=r.order_quarter,
-                           total_sales=r.total_sales, order_count=r.order_count)
-            for r in sales_by_quarter
-        ],
-        sales_by_country=[
-            CountrySales(country=r.country, total_sales=r.total_sales,
-                         order_count=r.order_count)
-            for r in sales_by_country
-        ],
-        sales_by_customer=[
-            CustomerSales(customer_name=r.customer_name, total_sales=r.total_sales,
-                          order_count=r.order_count)
-            for r in sales_by_customer
-        ],
+        sales_by_quarter=sorted(quarters, key=lambda q: (q.year, q.quarter)),
+        sales_by_country=[c for _, c in sorted(countries, key=lambda c: c[0])],
+        sales_by_customer=[c for _, c in sorted(customers, key=lambda c: c[0])],
     )
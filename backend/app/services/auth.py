@@ -1,22 +1,116 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from functools import lru_cache
 
 import bcrypt
-from fastapi import Response
+from fastapi import HTTPException, Response, status
 from jose import JWTError, jwt
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
+from app.models import User
+from app.services.cache import TTLCache
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE = timedelta(hours=1)
 # TODO: add refresh token
 
 
+@lru_cache
+def _hash_pool() -> tuple[ProcessPoolExecutor, threading.BoundedSemaphore] | None:
+    settings = get_settings()
+    if settings.HASH_WORKERS <= 0:
+        return None
+    # spawn: forking a process that already runs threads is unsafe
+    pool = ProcessPoolExecutor(settings.HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return pool, threading.BoundedSemaphore(settings.HASH_QUEUE_SIZE)
+
+
+_hash_pool_lock = threading.Lock()
+
+
+def _discard_hash_pool(pool: ProcessPoolExecutor) -> HTTPException:
+    """Drop a pool one of whose workers died (the OOM killer, say), so the next call builds a new one.
+
+    A broken pool fails every later submit; the call that found it gets a 503.
+    """
+    with _hash_pool_lock:
+        current = _hash_pool()
+        if current is not None and current[0] is pool:
+            _hash_pool.cache_clear()
+    pool.shutdown(wait=False, cancel_futures=True)
+    return _hash_pool_busy()
+
+
+def _run_bcrypt(fn: Callable, *args):
+    """Run a bcrypt call in the hashing pool, or fail fast with 503 once HASH_QUEUE_SIZE calls are pending.
+
+    Each ~250 ms hash would otherwise burn a CPU inside the request
+    threadpool; the pool caps hashing at HASH_WORKERS cores, and the queue
+    cap bounds how many request threads can be parked waiting on it.
+    """
+    hash_pool = _hash_pool()
+    if hash_pool is None:
+        return fn(*args)
+    pool, slots = hash_pool
+    if not slots.acquire(blocking=False):
+        raise _hash_pool_busy()
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        raise _discard_hash_pool(pool)
+    finally:
+        slots.release()
+
+
+async def _run_bcrypt_async(fn: Callable, *args):
+    """_run_bcrypt for async routes: the event loop awaits the pool instead of parking a thread."""
+    hash_pool = _hash_pool()
+    if hash_pool is None:
+        return await run_in_threadpool(fn, *args)
+    pool, slots = hash_pool
+    if not slots.acquire(blocking=False):
+        raise _hash_pool_busy()
+    try:
+        return await asyncio.wrap_future(pool.submit(fn, *args))
+    except BrokenProcessPool:
+        raise _discard_hash_pool(pool)
+    finally:
+        slots.release()
+
+
+def _hash_pool_busy() -> HTTPException:
+    return HTTPException(
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        "Too many sign-in requests, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return _run_bcrypt(bcrypt.hashpw, password.encode(), bcrypt.gensalt()).decode()
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode(), hashed.encode())
+    return _run_bcrypt(bcrypt.checkpw, plain.encode(), hashed.encode())
+
+
+async def hash_password_async(password: str) -> str:
+    return (await _run_bcrypt_async(bcrypt.hashpw, password.encode(), bcrypt.gensalt())).decode()
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_bcrypt_async(bcrypt.checkpw, plain.encode(), hashed.encode())
 
 
 def create_access_token(user_id: int) -> str:
@@ -45,12 +139,80 @@ def clear_auth_cookies(response: Response) -> None:
     response.delete_cookie(key="access_token", path="/api")
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated user's columns routes need; safe to share between requests and sessions."""
+
+    id: int
+    email: str
+
+
+@lru_cache
+def _token_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+@lru_cache
+def _user_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def clear_auth_caches() -> None:
+    _token_cache().clear()
+    _user_cache().clear()
+
+
+def forget_token(token: str) -> None:
+    _token_cache().pop(token)
+
+
 def decode_token(token: str) -> int | None:
+    # a verified token is remembered until it expires, capped at AUTH_CACHE_TTL_SECONDS
+    cache = _token_cache()
+    user_id = cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(
             token, get_settings().JWT_SECRET, algorithms=[ALGORITHM]
         )
         sub = payload.get("sub")
-        return int(sub) if sub else None
+        user_id = int(sub) if sub else None
     except (JWTError, ValueError):
         return None
+    if user_id is not None:
+        exp = payload.get("exp")
+        cache.set(token, user_id, ttl=exp - time.time() if exp else None)
+    return user_id
+
+
+def _remember_user(row) -> CurrentUser | None:
+    if row is None:
+        return None
+    user = CurrentUser(id=row.id, email=row.email)
+    _user_cache().set(user.id, user)
+    return user
+
+
+def load_current_user(db: Session, user_id: int) -> CurrentUser | None:
+    user = _user_cache().get(user_id)
+    if user is not None:
+        return user
+    return _remember_user(db.query(User.id, User.email).filter(User.id == user_id).first())
+
+
+async def load_current_user_async(db: AsyncSession, user_id: int) -> CurrentUser | None:
+    user = _user_cache().get(user_id)
+    if user is not None:
+        return user
+    result = await db.execute(select(User.id, User.email).where(User.id == user_id))
+    return _remember_user(result.first())
+
+
+# other processes keep their copy until AUTH_CACHE_TTL_SECONDS runs out
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _forget_user(mapper, connection, target: User) -> None:
+    _user_cache().pop(target.id)
@@ -0,0 +1,266 @@
+"""Caches: serialised responses for dataset reads, and TTLCache for live objects.
+
+Response keys carry the dataset version (bumped on every ORM update of the
+row), so an entry is never invalidated explicitly: once the dataset
+changes, its new version simply misses, and the old entries age out
+through TTL/LRU.
+"""
+import hashlib
+import json
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(namespace: str, dataset_id: int, version: int, params: dict | None = None) -> str:
+    digest = hashlib.sha256(json.dumps(params or {}, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{namespace}:{dataset_id}:{version}:{digest[:32]}"
+
+
+class ResponseCache:
+    """Counts hits and misses; backend errors are logged and treated as misses."""
+
+    name = "none"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            value = self._get(key)
+        except Exception:
+            logger.warning("Cache get failed", exc_info=True)
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self._set(key, value)
+        except Exception:
+            logger.warning("Cache set failed", exc_info=True)
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+    def _get(self, key: str) -> bytes | None:
+        return None
+
+    def _set(self, key: str, value: bytes) -> None:
+        pass
+
+
+class MemoryCache(ResponseCache):
+    """Per-process LRU with a TTL and a byte budget on the stored values."""
+
+    name = "memory"
+
+    def __init__(self, ttl: int, max_bytes: int):
+        super().__init__(ttl)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        # sync routes run on a thread pool
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self.size -= len(value)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class TTLCache:
+    """Bounded in-process map of live objects; entries expire, the least recently used goes first when full.
+
+    A ttl of 0 disables it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+
+    def command(self, *args: str | bytes | int):
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(out))
+        return self._reply()
+
+    def _reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis closed the connection")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            if body == b"-1":
+                return None
+            data = self.reader.read(int(body) + 2)
+            return data[:-2]
+        if kind == b"*":
+            return None if body == b"-1" else [self._reply() for _ in range(int(body))]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+
+class RedisCache(ResponseCache):
+    """Shared cache over the Redis protocol (GET/SET PX), so every API process sees the same entries.
+
+    Eviction under memory pressure is the server's job: run it with
+    maxmemory and maxmemory-policy allkeys-lru.
+    """
+
+    name = "redis"
+
+    def __init__(self, ttl: int, url: str, prefix: str = "task:", timeout: float = 0.5):
+        super().__init__(ttl)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._idle: list[_RespConnection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _RespConnection:
+        conn = _RespConnection(self.host, self.port, self.timeout)
+        if self.password:
+            conn.command("AUTH", self.password)
+        if self.db:
+            conn.command("SELECT", self.db)
+        return conn
+
+    def _command(self, *args):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        conn = conn or self._connect()
+        try:
+            reply = conn.command(*args)
+        except Exception:
+            # a half-read reply would poison the next command on this socket
+            conn.close()
+            raise
+        with self._lock:
+            self._idle.append(conn)
+        return reply
+
+    def _get(self, key: str) -> bytes | None:
+        return self._command("GET", self.prefix + key)
+
+    def _set(self, key: str, value: bytes) -> None:
+        self._command("SET", self.prefix + key, value, "PX", self.ttl * 1000)
+
+
+@lru_cache
+def get_cache() -> ResponseCache:
+    settings = get_settings()
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(settings.CACHE_TTL_SECONDS, settings.CACHE_MAX_MB * 2**20)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(settings.CACHE_TTL_SECONDS, settings.REDIS_URL)
+    return ResponseCache(settings.CACHE_TTL_SECONDS)
@@ -0,0 +1,261 @@
+"""gzip and zstd for upload and export streams, always a chunk at a time.
+
+zstandard is only imported once a zstd stream turns up.
+"""
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# HTTP content coding, in order of preference when a client accepts several
+CONTENT_CODINGS = ("zstd", "gzip")
+# file suffix -> the compression pandas reads it with
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# 16 + MAX_WBITS: a gzip header and trailer around the deflate stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# the most a request body chunk inflates to at once; also the largest block of a zstd frame
+INFLATE_CHUNK_BYTES = 128 * 1024
+
+# zstd frame layout, RFC 8878 section 3.1.1
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_DICTIONARY_ID_BYTES = (0, 1, 2, 4)
+ZSTD_CONTENT_SIZE_BYTES = (0, 2, 4, 8)
+ZSTD_RLE_BLOCK, ZSTD_RESERVED_BLOCK = 1, 3
+ZSTD_CHECKSUM_BYTES = 4
+
+
+def file_compression(filename: str | None) -> str | None:
+    return COMPRESSED_SUFFIXES.get(Path(filename or "").suffix.lower())
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """The CONTENT_CODINGS entry the client weighs highest in Accept-Encoding, if any."""
+    weights: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    accepted = [coding for coding in CONTENT_CODINGS if weights.get(coding, 0) > 0]
+    # max() keeps the first of equal weights, i.e. our preference
+    return max(accepted, key=weights.__getitem__, default=None)
+
+
+def compress_stream(chunks: Iterator[bytes], coding: str) -> Iterator[bytes]:
+    """Compress a byte stream as it is produced.
+
+    Each chunk is flushed to a block boundary, so the client receives data
+    as soon as it is generated instead of when the compressor's window fills.
+    """
+    if coding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+        sync, finish = zlib.Z_SYNC_FLUSH, zlib.Z_FINISH
+    else:
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        sync, finish = zstandard.COMPRESSOBJ_FLUSH_BLOCK, zstandard.COMPRESSOBJ_FLUSH_FINISH
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(sync)
+        if data:
+            yield data
+    yield compressor.flush(finish)
+
+
+def _bad_body(detail: str) -> HTTPException:
+    return HTTPException(400, detail)
+
+
+class _GzipInflater:
+    """A gzip body, inflated at most INFLATE_CHUNK_BYTES per piece."""
+
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        while True:
+            try:
+                out = self.decompressor.decompress(data, INFLATE_CHUNK_BYTES)
+            except zlib.error:
+                raise _bad_body("Request body is not valid gzip")
+            data = self.decompressor.unconsumed_tail
+            if self.decompressor.unused_data:
+                raise _bad_body("Request body has data after the gzip stream")
+            if out:
+                yield out
+            # a full piece may leave output behind inside zlib even once the input is used up
+            if not data and len(out) < INFLATE_CHUNK_BYTES:
+                return
+
+    def finish(self) -> None:
+        if not self.decompressor.eof:
+            raise _bad_body("Request body ends inside the gzip stream")
+
+
+class _ZstdInflater:
+    """A single zstd frame, inflated at most one block (INFLATE_CHUNK_BYTES) per piece.
+
+    zstandard's decompressobj has no output limit, and a few bytes of RLE
+    block inflate to 128 KiB, so a small body can inflate to gigabytes in
+    one call. The frame's headers are walked here instead, and the
+    decompressor is fed up to one block boundary at a time.
+    """
+
+    def __init__(self):
+        import zstandard
+
+        self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+        # "frame" and "block" headers are gathered whole; "content" and "checksum" pass through
+        self.state = "frame"
+        self.head = bytearray()
+        self.head_size = len(ZSTD_MAGIC) + 1
+        self.left = 0
+        self.last_block = False
+        self.checksum = False
+
+    def _decompress(self, data: bytes) -> bytes:
+        import zstandard
+
+        try:
+            return self.decompressor.decompress(data)
+        except zstandard.ZstdError:
+            raise _bad_body("Request body is not valid zstd")
+
+    def _frame_header(self) -> None:
+        if self.head[:4] != ZSTD_MAGIC:
+            raise _bad_body("Request body is not a zstd frame")
+        descriptor = self.head[4]
+        single_segment = descriptor >> 5 & 1
+        content_size = ZSTD_CONTENT_SIZE_BYTES[descriptor >> 6] or single_segment
+        self.checksum = bool(descriptor >> 2 & 1)
+        size = len(ZSTD_MAGIC) + 1 + (not single_segment) + ZSTD_DICTIONARY_ID_BYTES[descriptor & 3] + content_size
+        if len(self.head) < size:
+            self.head_size = size
+            return
+        self.state, self.head_size = "block", 3
+
+    def _block_header(self) -> None:
+        header = int.from_bytes(self.head, "little")
+        self.last_block = bool(header & 1)
+        block_type, size = header >> 1 & 3, header >> 3
+        if block_type == ZSTD_RESERVED_BLOCK or size > INFLATE_CHUNK_BYTES:
+            raise _bad_body("Request body is not valid zstd")
+        self.state, self.left = "content", 1 if block_type == ZSTD_RLE_BLOCK else size
+
+    def _after_content(self) -> None:
+        if not self.last_block:
+            self.state, self.head_size = "block", 3
+        elif self.checksum and self.state == "content":
+            self.state, self.left = "checksum", ZSTD_CHECKSUM_BYTES
+        else:
+            self.state = "done"
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        view = memoryview(data)
+        while view:
+            if self.state == "done":
+                raise _bad_body("Request body has data after the zstd frame")
+            if self.state in ("content", "checksum"):
+                piece, view = view[:self.left], view[self.left:]
+                self.left -= len(piece)
+                out = self._decompress(bytes(piece))
+                if out:
+                    yield out
+            else:
+                take = self.head_size - len(self.head)
+                self.head += view[:take]
+                view = view[take:]
+                if len(self.head) < self.head_size:
+                    return
+                state = self.state
+                if state == "frame":
+                    self._frame_header()
+                else:
+                    self._block_header()
+                if self.state == state:
+                    # the frame header's full size is known now; gather the rest
+                    continue
+                out = self._decompress(bytes(self.head))
+                self.head.clear()
+                if out:
+                    yield out
+            if self.state in ("content", "checksum") and not self.left:
+                self._after_content()
+
+    def finish(self) -> None:
+        if self.state != "done":
+            raise _bad_body("Request body ends inside the zstd frame")
+
+
+def _inflater(coding: str) -> _GzipInflater | _ZstdInflater:
+    return _GzipInflater() if coding == "gzip" else _ZstdInflater()
+
+
+def _inflated(inflater: _GzipInflater | _ZstdInflater, body: bytes, last: bool) -> Iterator[bytes]:
+    yield from inflater.feed(body)
+    if last:
+        inflater.finish()
+
+
+class DecompressRequestMiddleware:
+    """Inflate request bodies sent with Content-Encoding gzip or zstd as they arrive.
+
+    A received chunk is passed on in pieces of at most INFLATE_CHUNK_BYTES,
+    each inflated only when the route asks for more, so the body is never
+    held whole in either form, however far it inflates. A body that is
+    corrupt, ends early or carries data after its end is a 400. Routes see
+    a plain body without the Content-Encoding and Content-Length headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = dict(scope["headers"]).get(b"content-encoding", b"identity").decode().strip().lower()
+        if coding == "identity":
+            await self.app(scope, receive, send)
+            return
+        if coding not in CONTENT_CODINGS:
+            response = PlainTextResponse(f"Unsupported Content-Encoding: {coding}", status_code=415)
+            await response(scope, receive, send)
+            return
+
+        inflater = _inflater(coding)
+        headers = [(k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")]
+        pieces: Iterator[bytes] = iter(())
+        more_body = True
+        ended = False
+
+        async def inflate() -> Message:
+            nonlocal pieces, more_body, ended
+            if ended:
+                # the body is over; what is left is waiting for a disconnect
+                return await receive()
+            while True:
+                piece = next(pieces, None)
+                if piece is not None:
+                    return {"type": "http.request", "body": piece, "more_body": True}
+                if not more_body:
+                    ended = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                message = await receive()
+                if message["type"] != "http.request":
+                    return message
+                more_body = message.get("more_body", False)
+                pieces = _inflated(inflater, message.get("body", b""), last=not more_body)
+
+        await self.app({**scope, "headers": headers}, inflate, send)
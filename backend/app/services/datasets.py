@@ -0,0 +1,89 @@
+from pathlib import Path
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, exc
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import exc as orm_exc
+
+from app.models import Dataset, EtlJob
+from app.services.jobs import enqueue_etl
+from app.services.partitions import drop_partition, lock_not_available
+
+# how long a delete waits for queries running on sales_records before giving up
+DELETE_LOCK_TIMEOUT_MS = 2_000
+
+
+def _lock_dataset(db: Session, dataset: Dataset) -> Dataset:
+    """Re-read the dataset under a row lock, so its status cannot change before the caller commits.
+
+    A concurrent append or delete waits for the lock and then sees the
+    status this transaction leaves behind, instead of acting on a copy
+    read before it.
+    """
+    locked = (
+        db.query(Dataset)
+        .filter(Dataset.id == dataset.id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if locked is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dataset not found")
+    return locked
+
+
+def append_to_dataset(db: Session, dataset: Dataset, path: Path) -> None:
+    """Queue an append of the spooled upload at `path` to a ready dataset.
+
+    The dataset is marked processing until a worker has loaded the new rows,
+    so it cannot be appended to again, or deleted, in the meantime. Its
+    records stay readable throughout. The upload is removed if the append
+    is refused or fails.
+    """
+    try:
+        dataset = _lock_dataset(db, dataset)
+        if dataset.status != "ready":
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Dataset is {dataset.status}, only ready datasets can be appended to"
+            )
+        dataset.status = "processing"
+        enqueue_etl(db, dataset, path, kind="append")
+        db.commit()
+    except orm_exc.StaleDataError:
+        db.rollback()
+        path.unlink(missing_ok=True)
+        raise HTTPException(status.HTTP_409_CONFLICT, "Dataset changed while appending, try again")
+    except BaseException:
+        db.rollback()
+        path.unlink(missing_ok=True)
+        raise
+
+
+def delete_dataset(db: Session, dataset: Dataset) -> None:
+    """Remove a dataset, its records, dimension values and ETL jobs in one transaction.
+
+    Nothing is loaded into the session: the records go with their partition
+    and the dimension tables follow the dataset row by ON DELETE CASCADE, so
+    the cost does not depend on the dataset's size and leaves no dead rows
+    for vacuum. A dataset still being processed cannot be deleted, since its
+    worker holds the partition until the load commits.
+    """
+    dataset_id = dataset.id
+    # held until the commit, so an append cannot queue a job for a dataset being dropped
+    if _lock_dataset(db, dataset).status == "processing":
+        db.rollback()
+        raise HTTPException(status.HTTP_409_CONFLICT, "Dataset is still processing")
+    try:
+        drop_partition(db, dataset_id, lock_timeout_ms=DELETE_LOCK_TIMEOUT_MS)
+        db.execute(delete(EtlJob).where(EtlJob.dataset_id == dataset_id))
+        db.execute(delete(Dataset).where(Dataset.id == dataset_id))
+        db.commit()
+    except exc.OperationalError as e:
+        db.rollback()
+        if not lock_not_available(e):
+            raise
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Dataset records are in use, try again shortly",
+            headers={"Retry-After": "1"},
+        )
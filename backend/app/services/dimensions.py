@@ -0,0 +1,208 @@
+"""Per-dataset dictionaries for the repeated text columns of sales_records.
+
+A dataset gives the distinct values of each dimension column integer codes
+that follow the database's sort order of the values. sales_records stores
+the code, so rows and their indexes carry a 2-4 byte integer instead of the
+text, GROUP BY and equality filters compare integers, and ordering by the
+code is ordering by the value.
+
+Codes are spread over the column's range with gaps between them. A value
+added later takes a code inside the gap between its neighbours, so the rows
+already stored keep theirs. Only when a gap is used up is the whole
+dimension respaced, rewriting the rows whose codes move.
+"""
+from bisect import bisect_left
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import SmallInteger, String, case, column, delete, insert, literal, select, union_all, update, values
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from app.models import DIMENSIONS, SalesRecord
+
+
+# dimensions whose code is part of uq_dataset_order_product
+UNIQUE_KEY_FIELDS = {"product_code"}
+
+
+def code_column(field: str):
+    return getattr(SalesRecord, f"{field}_id")
+
+
+def max_code(field: str) -> int:
+    """The largest code the field's column holds; negative codes are for parking rows."""
+    return 2**15 - 1 if isinstance(code_column(field).type, SmallInteger) else 2**31 - 1
+
+
+def dimension_equals(dataset_id: int, field: str, value: str) -> ColumnElement[bool]:
+    """Filter on a dimension value; the code lookup runs once, as an InitPlan."""
+    model = DIMENSIONS[field]
+    code = select(model.code).where(model.dataset_id == dataset_id, model.value == value)
+    return code_column(field) == code.scalar_subquery()
+
+
+def _values_table(new: Iterable[str]):
+    """The values as an inline VALUES list, to be ordered by the database alongside stored ones."""
+    return values(column("value", String), name="new_values").data([(value,) for value in new])
+
+
+def place_codes(field: str, ordered: list[str], known: dict[str, int]) -> list[int] | None:
+    """Codes for `ordered`, the field's values in sort order, keeping the `known` ones.
+
+    Each run of new values is spread over the gap between its stored
+    neighbours. Runs before the first or after the last stored value are
+    spaced as if the field were numbered afresh, so values that keep
+    sorting last do not halve the remaining room every time. None when a
+    gap is too narrow for its run.
+    """
+    top = max_code(field)
+    spacing = max(1, top // (len(ordered) + 1))
+    codes: list[int] = []
+    i = 0
+    while i < len(ordered):
+        if ordered[i] in known:
+            codes.append(known[ordered[i]])
+            i += 1
+            continue
+        end = i
+        while end < len(ordered) and ordered[end] not in known:
+            end += 1
+        run = end - i
+        lo = codes[-1] if codes else -1
+        hi = known[ordered[end]] if end < len(ordered) else top + 1
+        width = (hi - lo) // (run + 1)
+        if width < 1:
+            return None
+        if not codes and end < len(ordered):
+            # before the first stored value: packed below it
+            step = min(width, spacing)
+            codes.extend(hi - (run - n) * step for n in range(run))
+        elif codes and end == len(ordered):
+            # after the last stored value: packed above it
+            step = min(width, spacing)
+            codes.extend(lo + (n + 1) * step for n in range(run))
+        else:
+            codes.extend(lo + (n + 1) * width for n in range(run))
+        i = end
+    return codes
+
+
+class DimensionCodes:
+    """A dataset's code <-> value mapping for every dimension column.
+
+    labels[field] holds the values in sort order and codes[field] their
+    codes, which ascend with them.
+    """
+
+    def __init__(
+        self,
+        dataset_id: int,
+        labels: dict[str, list[str]] | None = None,
+        codes: dict[str, list[int]] | None = None,
+    ):
+        self.dataset_id = dataset_id
+        self.labels = labels or {field: [] for field in DIMENSIONS}
+        self.codes = codes or {field: [] for field in DIMENSIONS}
+        self._index = {field: pd.Index(values) for field, values in self.labels.items()}
+
+    @classmethod
+    def load(cls, db: Session, dataset_id: int) -> "DimensionCodes":
+        # every dimension in one round trip
+        rows = db.execute(union_all(*(
+            select(literal(field).label("field"), model.code, model.value).where(model.dataset_id == dataset_id)
+            for field, model in DIMENSIONS.items()
+        )).order_by("field", "code"))
+        labels = {field: [] for field in DIMENSIONS}
+        codes = {field: [] for field in DIMENSIONS}
+        for field, code, value in rows:
+            labels[field].append(value)
+            codes[field].append(code)
+        return cls(dataset_id, labels, codes)
+
+    def add(self, db: Session, field: str, values: Iterable[str]) -> None:
+        """Give values not seen before codes between those of their neighbours in sort order.
+
+        The database orders the new values among the stored ones, so the
+        codes follow its collation. Stored rows are only rewritten when a
+        gap has run out and the field is respaced.
+        """
+        values = values.unique() if isinstance(values, pd.Series) else list(values)
+        new = pd.Index(values, dtype=object).difference(self._index[field])
+        if new.empty:
+            return
+        model = DIMENSIONS[field]
+        added = _values_table(new)
+        merged = union_all(
+            select(model.value).where(model.dataset_id == self.dataset_id),
+            select(added.c.value),
+        ).subquery()
+        ordered = list(db.scalars(select(merged.c.value).order_by(merged.c.value)))
+
+        known = dict(zip(self.labels[field], self.codes[field]))
+        codes = place_codes(field, ordered, known)
+        if codes is None:
+            codes = place_codes(field, ordered, {})
+            if codes is None:
+                raise ValueError(f"{field} has more distinct values than its code column holds")
+            self._recode(db, field, {known[v]: c for v, c in zip(ordered, codes) if v in known and known[v] != c})
+            db.execute(delete(model).where(model.dataset_id == self.dataset_id))
+            rows = zip(ordered, codes)
+        else:
+            is_new = set(new)
+            rows = ((v, c) for v, c in zip(ordered, codes) if v in is_new)
+        db.execute(insert(model), [
+            {"dataset_id": self.dataset_id, "code": code, "value": value} for value, code in rows
+        ])
+        self.labels[field] = ordered
+        self.codes[field] = codes
+        self._index[field] = pd.Index(ordered)
+
+    def _recode(self, db: Session, field: str, moved: dict[int, int]) -> None:
+        """Rewrite the loaded rows holding a code that moved."""
+        if not moved:
+            return
+        table = SalesRecord.__table__
+        column = table.c[f"{field}_id"]
+        if field in UNIQUE_KEY_FIELDS:
+            # the unique constraint is checked row by row, so a code moving onto one
+            # that has yet to move would collide: park the moved rows on -1 - new code first
+            db.execute(
+                update(table)
+                .where(table.c.dataset_id == self.dataset_id, column.in_(moved))
+                .values({column: case({old: -1 - new for old, new in moved.items()}, value=column)})
+            )
+            db.execute(
+                update(table)
+                .where(table.c.dataset_id == self.dataset_id, column < 0)
+                .values({column: -1 - column})
+            )
+        else:
+            db.execute(
+                update(table)
+                .where(table.c.dataset_id == self.dataset_id, column.in_(moved))
+                .values({column: case(moved, value=column)})
+            )
+
+    def extend(self, db: Session, frame: pd.DataFrame) -> None:
+        """Add the dimension values of a record frame."""
+        for field in DIMENSIONS:
+            self.add(db, field, frame[field])
+
+    def encode(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """The record frame with each dimension column swapped for its code column."""
+        encoded = frame.drop(columns=list(DIMENSIONS))
+        for field in DIMENSIONS:
+            positions = pd.Categorical(frame[field], categories=self._index[field]).codes
+            if (positions < 0).any():
+                raise ValueError(f"{field} has values without a code; extend() with the frame first")
+            encoded[f"{field}_id"] = np.asarray(self.codes[field], dtype=np.int64)[positions]
+        return encoded
+
+    def lookup(self, field: str) -> dict[int, str]:
+        """code -> value for the field, for decoding many rows."""
+        return dict(zip(self.codes[field], self.labels[field]))
+
+    def decode(self, field: str, code: int) -> str:
+        return self.labels[field][bisect_left(self.codes[field], code)]
@@ -1,11 +1,28 @@
 import io
+import json
 import logging
+import shutil
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.database import SessionLocal
-from app.models import Dataset, SalesRecord
+from app.models import DIMENSIONS, Dataset, SalesRecord
+from app.services.aggregates import AggregateAccumulator, exact_sum
+from app.services.compression import file_compression
+from app.services.dimensions import DimensionCodes
+from app.services.partitions import create_partition, lock_not_available, partition_name
+from app.services.progress import ProgressReporter
+from app.services.telemetry import EtlTelemetry, collecting, stage, staged_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -22,22 +39,154 @@ NUMERIC_COLUMNS = [
     "SALES", "MONTH_ID", "YEAR_ID",
 ]
 
+DEDUP_COLUMNS = ["ORDERNUMBER", "PRODUCTCODE"]
 
-def parse_csv(file: UploadFile) -> pd.DataFrame:
-    content = file.file.read()
-    try:
-        # latin-1 handles special characters in customer/city names from the Kaggle dataset
-        df = pd.read_csv(io.BytesIO(content), encoding="latin-1")
-    except Exception:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Could not parse CSV file")
+# record frame column -> transformed frame column; dimension columns are
+# stored as codes (see services.dimensions)
+RECORD_COLUMNS = {
+    "order_number": "ORDERNUMBER",
+    "quantity_ordered": "QUANTITYORDERED",
+    "price_each": "PRICEEACH",
+    "sales": "SALES",
+    "order_date": "ORDERDATE",
+    "status": "STATUS",
+    "month_id": "MONTH_ID",
+    "year_id": "YEAR_ID",
+    "product_line": "PRODUCTLINE",
+    "product_code": "PRODUCTCODE",
+    "customer_name": "CUSTOMERNAME",
+    "country": "COUNTRY",
+    "deal_size": "DEALSIZE",
+    "total_sales": "TOTAL_SALES",
+    "order_quarter": "ORDER_QUARTER",
+}
+
+INTEGER_FIELDS = {"order_number", "quantity_ordered", "month_id", "year_id"}
+FLOAT_FIELDS = {"price_each", "sales", "total_sales"}
+TEXT_FIELDS = {
+    "status", "product_line", "product_code",
+    "customer_name", "country", "deal_size", "order_quarter",
+}
+
+# explicit ORDERDATE layouts parsed vectorised; the Kaggle file is all the first one
+DATE_FORMATS = ("%m/%d/%Y %H:%M", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+DATE_SAMPLE_ROWS = 1_000
+QUARTER_LABELS = np.array(["Q1", "Q2", "Q3", "Q4"], dtype=object)
 
-    missing = REQUIRED_COLUMNS - set(df.columns)
+COPY_BATCH_ROWS = 50_000
+APPEND_STAGING_TABLE = "sales_records_append"
+INSERT_BATCH_ROWS = 5_000
+
+# latin-1 handles special characters in customer/city names from the Kaggle dataset
+CSV_ENCODING = "latin-1"
+# upload suffix -> file format; the spooled file keeps the suffix so workers know how to read it.
+# pyarrow is only imported once a Parquet or Arrow file turns up. Compressed CSVs stay
+# compressed on disk and pandas inflates them, from the suffix, as each pass reads them.
+UPLOAD_FORMATS = {
+    ".csv": "CSV", ".csv.gz": "CSV", ".csv.zst": "CSV",
+    ".parquet": "Parquet", ".arrow": "Arrow", ".feather": "Arrow",
+}
+SPOOL_COPY_BYTES = 1024 * 1024
+# a chunk is held several times over while it is transformed and loaded
+CHUNK_MEMORY_FACTOR = 4
+MIN_CHUNK_ROWS = 1_000
+# the database restarting, dropping the connection or timing out, not anything in
+# the file: the ETL raises these instead of failing the dataset, and the job is retried
+RETRYABLE_ERRORS = (OperationalError, InterfaceError)
+# attaching a dataset's partition gives up its lock wait after this long and tries again
+PARTITION_LOCK_TIMEOUT_MS = 1_000
+PARTITION_LOCK_ATTEMPTS = 5
+
+
+def _check_required_columns(columns) -> None:
+    missing = REQUIRED_COLUMNS - set(columns)
     if missing:
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST,
             f"Missing required columns: {', '.join(sorted(missing))}",
         )
 
+
+def parse_csv(file: UploadFile) -> pd.DataFrame:
+    # read from the upload's file as parsing goes, compressed or not
+    try:
+        df = pd.read_csv(file.file, encoding=CSV_ENCODING, compression=file_compression(file.filename))
+    except Exception:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Could not parse CSV file")
+
+    _check_required_columns(df.columns)
+    return df
+
+
+def upload_suffix(filename: str | None) -> str | None:
+    """The UPLOAD_FORMATS suffix of an upload's filename, None when it is not one we read."""
+    name = (filename or "").lower()
+    return next((suffix for suffix in UPLOAD_FORMATS if name.endswith(suffix)), None)
+
+
+def spool_upload(file: UploadFile) -> Path:
+    """Copy the upload into UPLOAD_DIR in bounded chunks and validate its header only."""
+    suffix = upload_suffix(file.filename) or ".csv"
+    upload_dir = Path(get_settings().UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=upload_dir, suffix=suffix, delete=False) as out:
+        shutil.copyfileobj(file.file, out, SPOOL_COPY_BYTES)
+    path = Path(out.name)
+
+    try:
+        try:
+            columns = _read_columns(path)
+        except Exception:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Could not parse {UPLOAD_FORMATS[suffix]} file")
+        _check_required_columns(columns)
+    except HTTPException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def _open_arrow(path: Path):
+    import pyarrow as pa
+
+    # memory-mapped, so batches are read from the page cache instead of copied up front;
+    # the schema comes from the footer, and a batch is only decompressed when it is read
+    return pa.ipc.open_file(pa.memory_map(str(path)))
+
+
+def _arrow_chunks(path: Path, chunk_rows: int, columns: list[str] | None) -> Iterator[pd.DataFrame]:
+    reader = _open_arrow(path)
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        if columns is not None:
+            batch = batch.select(columns)
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows).to_pandas()
+
+
+def _read_columns(path: Path) -> list[str]:
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    if UPLOAD_FORMATS.get(suffix) == "Arrow":
+        return _open_arrow(path).schema.names
+    return list(pd.read_csv(path, nrows=0, encoding=CSV_ENCODING).columns)
+
+
+def read_upload(path: Path) -> pd.DataFrame:
+    """The whole spooled file as one DataFrame."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if UPLOAD_FORMATS.get(suffix) == "Arrow":
+        return _open_arrow(path).read_all().to_pandas()
+    return pd.read_csv(path, encoding=CSV_ENCODING)
+
+
+def fill_numeric_nulls(df: pd.DataFrame, medians: dict[str, float]) -> pd.DataFrame:
+    for col, median_val in medians.items():
+        df[col] = df[col].fillna(median_val)
     return df
 
 
@@ -45,75 +194,486 @@ def transform(df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
     original_count = len(df)
 
     # same order+product = same line item, keep first
-    df = df.drop_duplicates(subset=["ORDERNUMBER", "PRODUCTCODE"], keep="first")
+    with stage("dedup", rows=original_count):
+        df = df.drop_duplicates(subset=DEDUP_COLUMNS, keep="first")
     rows_dropped = original_count - len(df)
 
     # median over mean because SALES has big outliers that skew the average
-    for col in NUMERIC_COLUMNS:
-        if col in df.columns:
-            median_val = df[col].median()
-            df[col] = df[col].fillna(median_val)
+    with stage("fill_nulls", rows=len(df)):
+        medians = {col: df[col].median() for col in NUMERIC_COLUMNS if col in df.columns}
+        df = fill_numeric_nulls(df, medians)
+
+    return derive_columns(df), rows_dropped
 
+
+def _parse_mixed(col: pd.Series) -> pd.Series:
     # format="mixed" because the Kaggle CSV has inconsistent date formats
-    df["ORDERDATE"] = pd.to_datetime(df["ORDERDATE"], format="mixed", dayfirst=False)
+    return pd.to_datetime(col, format="mixed", dayfirst=False)
+
+
+def parse_order_dates(col: pd.Series) -> pd.Series:
+    """Same result as the mixed-format parse, without parsing every value on its own.
+
+    The DATE_FORMATS that match part of a sample are applied to the whole
+    column, most common first, each as one vectorised parse. Only values no
+    format matched, malformed ones included, go through the per-element
+    mixed parser, so those still raise as before.
+    """
+    if not pd.api.types.is_string_dtype(col):
+        return _parse_mixed(col)
+    sample = col.dropna().head(DATE_SAMPLE_ROWS)
+    hits = {fmt: pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum() for fmt in DATE_FORMATS}
+    formats = [fmt for fmt in sorted(DATE_FORMATS, key=hits.get, reverse=True) if hits[fmt]]
+    if not formats:
+        return _parse_mixed(col)
+
+    parsed = pd.to_datetime(col, format=formats[0], errors="coerce")
+    for fmt in formats[1:]:
+        todo = parsed.isna() & col.notna()
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(col[todo], format=fmt, errors="coerce")
+
+    todo = parsed.isna() & col.notna()
+    if todo.any():
+        rest = _parse_mixed(col[todo])
+        if rest.dtype != parsed.dtype:
+            # e.g. offsets in the leftovers: let the mixed parser decide for the whole column
+            return _parse_mixed(col)
+        parsed[todo] = rest
+    return parsed
+
+
+def derive_columns(df: pd.DataFrame) -> pd.DataFrame:
+    with stage("parse_dates", rows=len(df)):
+        df["ORDERDATE"] = parse_order_dates(df["ORDERDATE"])
+
+    with stage("derive", rows=len(df)):
+        # TOTAL_SALES gives the actual revenue per line (SALES in the CSV is sometimes rounded)
+        df["TOTAL_SALES"] = df["QUANTITYORDERED"] * df["PRICEEACH"]
+
+        # a lookup by position instead of a dict map; NaT stays missing
+        quarter = df["ORDERDATE"].dt.quarter
+        labels = QUARTER_LABELS[quarter.fillna(1).to_numpy(dtype="int64") - 1]
+        df["ORDER_QUARTER"] = pd.Series(labels, index=df.index).where(quarter.notna())
+
+    return df
+
+
+def _chunk_rows(path: Path) -> int:
+    """Rows per chunk so a chunk in flight stays within ETL_MEMORY_BUDGET_MB."""
+    sample = next(iter(_read_chunks(path, MIN_CHUNK_ROWS)), None)
+    if sample is None or sample.empty:
+        return MIN_CHUNK_ROWS
+    row_bytes = sample.memory_usage(deep=True).sum() / len(sample)
+    budget = get_settings().ETL_MEMORY_BUDGET_MB * 1024 * 1024
+    return max(MIN_CHUNK_ROWS, int(budget / (row_bytes * CHUNK_MEMORY_FACTOR)))
+
+
+def _read_chunks(
+    path: Path, chunk_rows: int, columns: list[str] | None = None, dtype: dict | None = None
+) -> Iterator[pd.DataFrame]:
+    """The spooled file in frames of at most chunk_rows; `dtype` only matters for CSV,
+    the other formats carry their column types."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)
+        return (batch.to_pandas() for batch in batches)
+    if UPLOAD_FORMATS.get(suffix) == "Arrow":
+        return _arrow_chunks(path, chunk_rows, columns)
+    return pd.read_csv(path, chunksize=chunk_rows, encoding=CSV_ENCODING, usecols=columns, dtype=dtype)
+
+
+def _scan_file(path: Path, chunk_rows: int) -> tuple[np.ndarray, dict[str, float], dict[str, set]]:
+    """First pass over the file: the global keep-first mask, the post-dedup medians
+    and the values of every dimension column.
+
+    The text columns are skipped. CSV keys are compared as text so a chunk's
+    dtype inference cannot change which rows count as duplicates.
+    """
+    seen: set[tuple] = set()
+    masks: list[np.ndarray] = []
+    null_columns: set[str] = set()
+    dimension_values: dict[str, set] = {field: set() for field in DIMENSIONS}
+    usecols = DEDUP_COLUMNS + NUMERIC_COLUMNS + [
+        RECORD_COLUMNS[field] for field in DIMENSIONS if RECORD_COLUMNS[field] not in DEDUP_COLUMNS
+    ]
+    dtype = dict.fromkeys(DEDUP_COLUMNS, str)
+
+    for chunk in _read_chunks(path, chunk_rows, columns=usecols, dtype=dtype):
+        keys = [chunk[c].astype(object).where(chunk[c].notna(), None) for c in DEDUP_COLUMNS]
+        mask = np.fromiter(
+            (key not in seen and not seen.add(key) for key in zip(*keys)),
+            dtype=bool,
+            count=len(chunk),
+        )
+        masks.append(mask)
+        kept = chunk[mask]
+        null_columns.update(c for c in NUMERIC_COLUMNS if kept[c].isna().any())
+        for field, values in dimension_values.items():
+            values.update(_as_text(kept[RECORD_COLUMNS[field]]).unique())
+    del seen
+
+    keep = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+
+    # medians are only needed where something gets filled; that column alone is re-read
+    medians: dict[str, float] = {}
+    if null_columns:
+        columns = sorted(null_columns)
+        values: dict[str, list[pd.Series]] = {c: [] for c in columns}
+        offset = 0
+        for chunk in _read_chunks(path, chunk_rows, columns=columns):
+            kept = chunk[keep[offset:offset + len(chunk)]]
+            offset += len(chunk)
+            for c in columns:
+                values[c].append(kept[c].dropna())
+        medians = {c: pd.concat(v).median() for c, v in values.items()}
+
+    return keep, medians, dimension_values
+
 
-    # TOTAL_SALES gives the actual revenue per line (SALES in the CSV is sometimes rounded)
-    df["TOTAL_SALES"] = df["QUANTITYORDERED"] * df["PRICEEACH"]
+def _as_text(col: pd.Series) -> pd.Series:
+    # str() semantics, so missing values load as "nan" like the old per-row path
+    return col.astype(object).fillna("nan").astype(str)
 
-    df["ORDER_QUARTER"] = df["ORDERDATE"].dt.quarter.map(
-        {1: "Q1", 2: "Q2", 3: "Q3", 4: "Q4"}
+
+def to_record_frame(dataset_id: int, df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the transformed frame to the sales_records column layout."""
+    columns = {"dataset_id": pd.Series(dataset_id, index=df.index, dtype="int64")}
+    for field, source in RECORD_COLUMNS.items():
+        col = df[source]
+        if field in INTEGER_FIELDS:
+            col = col.astype("int64")
+        elif field in FLOAT_FIELDS:
+            col = col.astype("float64")
+        elif field in TEXT_FIELDS:
+            col = _as_text(col)
+        columns[field] = col
+    return pd.DataFrame(columns)
+
+
+def _copy_records(db: Session, table: str, frame: pd.DataFrame) -> None:
+    # FORCE_NOT_NULL keeps empty strings as '' instead of NULL in the text columns
+    text_columns = ", ".join(c for c in frame.columns if c in TEXT_FIELDS)
+    sql = (
+        f"COPY {table} ({', '.join(frame.columns)}) "
+        f"FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text_columns}))"
     )
+    cursor = db.connection().connection.cursor()
+    try:
+        for start in range(0, len(frame), COPY_BATCH_ROWS):
+            buf = io.StringIO()
+            frame.iloc[start:start + COPY_BATCH_ROWS].to_csv(buf, header=False, index=False)
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+    finally:
+        cursor.close()
+
+
+def _insert_records(db: Session, frame: pd.DataFrame) -> None:
+    stmt = insert(SalesRecord.__table__)
+    for start in range(0, len(frame), INSERT_BATCH_ROWS):
+        db.execute(stmt, frame.iloc[start:start + INSERT_BATCH_ROWS].to_dict("records"))
+
+
+def load_records(db: Session, frame: pd.DataFrame, codes: DimensionCodes | None = None) -> None:
+    """Bulk load a record frame into the dataset's sales_records partition inside the session's transaction.
+
+    The partition is created if needed. Dimension values are coded through
+    `codes` (the dataset's stored ones by default), adding any it does not
+    know yet. Uses COPY on PostgreSQL and batched executemany inserts on
+    other dialects.
+    """
+    if frame.empty:
+        return
+    dataset_id = int(frame["dataset_id"].iat[0])
+    create_partition(db, dataset_id)
+    if codes is None:
+        codes = DimensionCodes.load(db, dataset_id)
+    codes.extend(db, frame)
+    frame = codes.encode(frame)
+    if db.get_bind().dialect.name == "postgresql":
+        # straight into the partition, skipping per-row routing through the parent
+        _copy_records(db, partition_name(dataset_id), frame)
+    else:
+        _insert_records(db, frame)
+
+
+def _copy_new_records(db: Session, dataset_id: int, frame: pd.DataFrame) -> set[tuple[int, int]]:
+    columns = ", ".join(frame.columns)
+    db.execute(text(
+        f"CREATE TEMP TABLE {APPEND_STAGING_TABLE} ON COMMIT DROP AS "
+        f"SELECT {columns} FROM {SalesRecord.__tablename__} WITH NO DATA"
+    ))
+    _copy_records(db, APPEND_STAGING_TABLE, frame)
+    inserted = db.execute(text(
+        f"INSERT INTO {partition_name(dataset_id)} ({columns}) SELECT {columns} FROM {APPEND_STAGING_TABLE} "
+        "ON CONFLICT (dataset_id, order_number, product_code_id) DO NOTHING "
+        "RETURNING order_number, product_code_id"
+    ))
+    return set(map(tuple, inserted))
+
+
+def _insert_new_records(db: Session, dataset_id: int, frame: pd.DataFrame) -> set[tuple[int, int]]:
+    stored = set(map(tuple, db.execute(
+        select(SalesRecord.order_number, SalesRecord.product_code_id).where(
+            SalesRecord.dataset_id == dataset_id,
+            SalesRecord.order_number.in_(frame["order_number"].unique().tolist()),
+        )
+    )))
+    keys = pd.MultiIndex.from_arrays([frame["order_number"], frame["product_code_id"]])
+    new = frame[~keys.isin(list(stored))]
+    _insert_records(db, new)
+    return set(zip(new["order_number"], new["product_code_id"]))
+
+
+def append_records(db: Session, frame: pd.DataFrame, codes: DimensionCodes | None = None) -> np.ndarray:
+    """Load the rows of a record frame whose order and product the dataset does not hold yet.
+
+    Returns a mask over `frame` of the rows inserted. On PostgreSQL the frame
+    is COPYed into a temporary table and moved into the partition with INSERT
+    ... ON CONFLICT DO NOTHING on uq_dataset_order_product, so the database
+    settles duplicates through the unique index, touching only the rows
+    appended.
+    """
+    if frame.empty:
+        return np.zeros(0, dtype=bool)
+    dataset_id = int(frame["dataset_id"].iat[0])
+    create_partition(db, dataset_id)
+    if codes is None:
+        codes = DimensionCodes.load(db, dataset_id)
+    codes.extend(db, frame)
+    encoded = codes.encode(frame)
+    if db.get_bind().dialect.name == "postgresql":
+        inserted = _copy_new_records(db, dataset_id, encoded)
+    else:
+        inserted = _insert_new_records(db, dataset_id, encoded)
+    keys = pd.MultiIndex.from_arrays([encoded["order_number"], encoded["product_code_id"]])
+    return keys.isin(list(inserted))
+
+
+def _stored_orders(db: Session, dataset_id: int, orders: pd.Series) -> set[int]:
+    """Those of `orders` the dataset already has at least one line of."""
+    return set(db.scalars(
+        select(SalesRecord.order_number).distinct().where(
+            SalesRecord.dataset_id == dataset_id,
+            SalesRecord.order_number.in_(orders.unique().tolist()),
+        )
+    ))
+
+
+def _set_date_range(dataset: Dataset, date_min, date_max) -> None:
+    dataset.date_min = date_min.to_pydatetime() if pd.notna(date_min) else None
+    dataset.date_max = date_max.to_pydatetime() if pd.notna(date_max) else None
+
+
+def _load_frame(db: Session, dataset: Dataset, df: pd.DataFrame) -> None:
+    df, rows_dropped = transform(df)
+
+    with stage("build_rows", rows=len(df)):
+        frame = to_record_frame(dataset.id, df)
+    with stage("load", rows=len(frame)):
+        load_records(db, frame)
+    aggregates = AggregateAccumulator()
+    with stage("aggregate", rows=len(frame)):
+        aggregates.update(frame)
+
+    dataset.row_count = len(df)
+    dataset.rows_dropped = rows_dropped
+    _set_date_range(dataset, df["ORDERDATE"].min(), df["ORDERDATE"].max())
+    dataset.total_sales = aggregates.total_sales
+    dataset.aggregates = aggregates.to_state()
+
+
+def _load_file(db: Session, dataset: Dataset, path: Path, chunk_rows: int | None) -> None:
+    chunk_rows = chunk_rows or _chunk_rows(path)
+    with stage("scan") as scanned:
+        keep, medians, dimension_values = _scan_file(path, chunk_rows)
+        scanned.count = len(keep)
+    # coded before the first row goes in, so each dimension is spaced in one go
+    with stage("dimensions"):
+        codes = DimensionCodes(dataset.id)
+        for field, values in dimension_values.items():
+            codes.add(db, field, values)
+
+    aggregates = AggregateAccumulator()
+    row_count = 0
+    date_min = date_max = pd.NaT
+    offset = 0
+    for chunk in staged_chunks("parse", _read_chunks(path, chunk_rows)):
+        mask = keep[offset:offset + len(chunk)]
+        offset += len(chunk)
+        with stage("fill_nulls", rows=len(chunk)):
+            chunk = fill_numeric_nulls(chunk[mask], medians)
+        chunk = derive_columns(chunk)
+
+        with stage("build_rows", rows=len(chunk)):
+            frame = to_record_frame(dataset.id, chunk)
+        with stage("load", rows=len(frame)):
+            load_records(db, frame, codes)
+        with stage("aggregate", rows=len(frame)):
+            aggregates.update(frame)
+
+        row_count += len(chunk)
+        date_min = pd.Series([date_min, chunk["ORDERDATE"].min()]).min()
+        date_max = pd.Series([date_max, chunk["ORDERDATE"].max()]).max()
 
-    return df, rows_dropped
+    dataset.row_count = row_count
+    dataset.rows_dropped = len(keep) - row_count
+    _set_date_range(dataset, date_min, date_max)
+    # summed exactly, so the chunking does not change the last digit
+    dataset.total_sales = aggregates.total_sales
+    dataset.aggregates = aggregates.to_state()
 
 
-def process_dataset(dataset_id: int, df: pd.DataFrame) -> None:
+def _etl_stats(dataset: Dataset, telemetry: EtlTelemetry) -> dict:
+    stats = telemetry.to_state()
+    logger.info("ETL stats for dataset %s: %s", dataset.id, json.dumps(stats))
+    return stats
+
+
+def _append_frame(db: Session, dataset: Dataset, df: pd.DataFrame) -> None:
+    """Add the rows of `df` the dataset does not hold yet, updating its totals from those rows alone.
+
+    Duplicates within `df` are dropped keeping the first, as for a new
+    dataset, and rows whose order and product are already stored are
+    skipped. Missing numbers are filled with the medians of `df`.
+    """
+    df, rows_dropped = transform(df)
+
+    with stage("build_rows", rows=len(df)):
+        frame = to_record_frame(dataset.id, df)
+    with stage("load", rows=len(frame)):
+        stored_orders = _stored_orders(db, dataset.id, frame["order_number"])
+        inserted = append_records(db, frame)
+    new = frame[inserted]
+
+    if dataset.aggregates is not None:
+        # datasets from before stored aggregates keep computing them live
+        with stage("aggregate", rows=len(new)):
+            aggregates = AggregateAccumulator(dataset.aggregates, stored_orders)
+            aggregates.update(new)
+            dataset.aggregates = aggregates.to_state()
+
+    dataset.row_count += len(new)
+    dataset.rows_dropped += rows_dropped + len(frame) - len(new)
+    dataset.total_sales = exact_sum(new["total_sales"], start=dataset.total_sales)
+    if not new.empty:
+        # in the database, which compares the stored range in its own time zone; NULL is ignored
+        dataset.date_min = func.least(Dataset.date_min, new["order_date"].min().to_pydatetime())
+        dataset.date_max = func.greatest(Dataset.date_max, new["order_date"].max().to_pydatetime())
+
+
+def _attach_partition(db: Session, dataset_id: int) -> None:
+    """create_partition in a transaction of its own, retried when its lock wait runs out.
+
+    The wait is bounded so that a drop or another attach queued behind this
+    one is not held up for long either.
+    """
+    for attempt in range(1, PARTITION_LOCK_ATTEMPTS + 1):
+        try:
+            create_partition(db, dataset_id, lock_timeout_ms=PARTITION_LOCK_TIMEOUT_MS)
+            db.commit()
+            return
+        except OperationalError as e:
+            db.rollback()
+            if not lock_not_available(e) or attempt == PARTITION_LOCK_ATTEMPTS:
+                raise
+            logger.info("Partition for dataset %s is waiting on sales_records, attempt %s", dataset_id, attempt)
+            time.sleep(PARTITION_LOCK_TIMEOUT_MS / 1000 * attempt)
+
+
+def _run_etl(
+    dataset_id: int, load: Callable[[Session, Dataset], None], failed_status: str = "failed"
+) -> str | None:
+    """Run `load` for the dataset and mark it ready; None once done, else the error it failed with.
+
+    A failure marks the dataset `failed_status`, except for RETRYABLE_ERRORS,
+    which are raised with the dataset left processing, for the job to run again.
+    """
     db = SessionLocal()
     try:
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset:
-            return
+        with collecting(ProgressReporter(dataset_id)) as telemetry:
+            dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+            if not dataset:
+                return None
+            # on its own, so the lock on sales_records is not held for the whole load
+            with stage("partition"):
+                _attach_partition(db, dataset_id)
 
-        df, rows_dropped = transform(df)
-
-        date_min = df["ORDERDATE"].min()
-        date_max = df["ORDERDATE"].max()
-
-        records: list[SalesRecord] = []
-        for _, row in df.iterrows():
-            records.append(SalesRecord(
-                dataset_id=dataset.id,
-                order_number=int(row["ORDERNUMBER"]),
-                quantity_ordered=int(row["QUANTITYORDERED"]),
-                price_each=float(row["PRICEEACH"]),
-                sales=float(row["SALES"]),
-                order_date=row["ORDERDATE"].to_pydatetime(),
-                status=str(row["STATUS"]),
-                month_id=int(row["MONTH_ID"]),
-                year_id=int(row["YEAR_ID"]),
-                product_line=str(row["PRODUCTLINE"]),
-                product_code=str(row["PRODUCTCODE"]),
-                customer_name=str(row["CUSTOMERNAME"]),
-                country=str(row["COUNTRY"]),
-                deal_size=str(row["DEALSIZE"]),
-                total_sales=float(row["TOTAL_SALES"]),
-                order_quarter=str(row["ORDER_QUARTER"]),
-            ))
-        db.add_all(records)
-
-        dataset.row_count = len(df)
-        dataset.rows_dropped = rows_dropped
-        dataset.date_min = date_min.to_pydatetime() if pd.notna(date_min) else None
-        dataset.date_max = date_max.to_pydatetime() if pd.notna(date_max) else None
-        dataset.total_sales = float(df["TOTAL_SALES"].sum())
-        dataset.status = "ready"
-        db.commit()
-    except Exception:
+            load(db, dataset)
+
+            with stage("commit"):
+                dataset.status = "ready"
+                db.commit()
+    except RETRYABLE_ERRORS:
+        logger.exception("Background ETL for dataset %s lost the database", dataset_id)
+        raise
+    except Exception as exc:
         logger.exception("Background ETL failed for dataset %s", dataset_id)
         db.rollback()
         dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
         if dataset:
-            dataset.status = "failed"
+            dataset.status = failed_status
+            dataset.progress = {**(dataset.progress or {}), "stage": "failed"}
+            dataset.etl_stats = _etl_stats(dataset, telemetry)
             db.commit()
+        return f"{type(exc).__name__}: {exc}"
     finally:
         db.close()
+
+    # a second, small commit, so the load's commit is timed too
+    try:
+        with SessionLocal() as db:
+            dataset = db.get(Dataset, dataset_id)
+            if dataset:
+                dataset.etl_stats = _etl_stats(dataset, telemetry)
+                db.commit()
+    except Exception:
+        logger.exception("Could not store ETL stats for dataset %s", dataset_id)
+    return None
+
+
+def process_dataset(dataset_id: int, df: pd.DataFrame) -> str | None:
+    return _run_etl(dataset_id, lambda db, dataset: _load_frame(db, dataset, df))
+
+
+def process_dataset_file(dataset_id: int, path: Path, chunk_rows: int | None = None) -> str | None:
+    """ETL over a spooled upload, streamed unless ETL_STREAMING is off; same rows as process_dataset.
+
+    The file is deleted once processing finishes, and kept when it raises,
+    so that the job can be retried.
+    """
+    if get_settings().ETL_STREAMING:
+        def load(db: Session, dataset: Dataset) -> None:
+            _load_file(db, dataset, path, chunk_rows)
+    else:
+        def load(db: Session, dataset: Dataset) -> None:
+            with stage("parse") as parsed:
+                df = read_upload(Path(path))
+                parsed.count = len(df)
+            _load_frame(db, dataset, df)
+
+    error = _run_etl(dataset_id, load)
+    Path(path).unlink(missing_ok=True)
+    return error
+
+
+def append_dataset_file(dataset_id: int, path: Path) -> str | None:
+    """Append a spooled upload to a ready dataset; see _append_frame.
+
+    The append is one transaction: if it fails, the dataset is left as it
+    was, back to ready, with its progress stage set to failed. The file is
+    deleted once processing finishes, as for process_dataset_file.
+    """
+    def load(db: Session, dataset: Dataset) -> None:
+        with stage("parse") as parsed:
+            df = read_upload(Path(path))
+            parsed.count = len(df)
+        _append_frame(db, dataset, df)
+
+    error = _run_etl(dataset_id, load, failed_status="ready")
+    Path(path).unlink(missing_ok=True)
+    return error
@@ -0,0 +1,135 @@
+import logging
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Dataset, EtlJob
+from app.services.etl import RETRYABLE_ERRORS, append_dataset_file, process_dataset_file
+
+logger = logging.getLogger(__name__)
+
+# EtlJob.kind -> what runs it; each returns None once done, else the error it failed with
+JOB_RUNNERS = {"load": process_dataset_file, "append": append_dataset_file}
+
+
+def enqueue_etl(db: Session, dataset: Dataset, path: Path, kind: str = "load") -> EtlJob:
+    """Add an ETL job for the dataset; committed together with the caller's transaction."""
+    job = EtlJob(dataset_id=dataset.id, path=str(path), kind=kind, status="queued", attempts=0)
+    db.add(job)
+    return job
+
+
+def claim_job(db: Session) -> EtlJob | None:
+    """Take the oldest queued job, or a running one whose worker stopped heartbeating.
+
+    SKIP LOCKED lets any number of workers poll the table without
+    blocking on, or double-claiming, the same row.
+    """
+    now = datetime.now(UTC)
+    stale = now - timedelta(seconds=get_settings().ETL_JOB_LEASE_SECONDS)
+    job = (
+        db.query(EtlJob)
+        .filter(or_(
+            EtlJob.status == "queued",
+            and_(EtlJob.status == "running", EtlJob.locked_at < stale),
+        ))
+        .order_by(EtlJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.locked_at = now
+    db.commit()
+    return job
+
+
+def _touch(job_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(EtlJob).where(EtlJob.id == job_id).values(locked_at=datetime.now(UTC))
+        )
+        db.commit()
+
+
+@contextmanager
+def _heartbeat(job_id: int) -> Iterator[None]:
+    interval = get_settings().ETL_JOB_LEASE_SECONDS / 3
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(interval):
+            try:
+                _touch(job_id)
+            except Exception:
+                logger.exception("Heartbeat failed for ETL job %s", job_id)
+
+    thread = threading.Thread(target=beat, name=f"etl-heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _finish(job_id: int, status: str, error: str | None = None) -> None:
+    with SessionLocal() as db:
+        job = db.get(EtlJob, job_id)
+        if job is None:
+            # the dataset was deleted once its ETL had finished
+            return
+        job.status = status
+        job.error = error
+        if status == "failed":
+            dataset = db.get(Dataset, job.dataset_id)
+            if dataset:
+                # an append that never committed left the dataset as it was
+                dataset.status = "ready" if job.kind == "append" else "failed"
+        db.commit()
+
+
+def _requeue(job_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(EtlJob).where(EtlJob.id == job_id).values(status="queued", locked_at=None)
+        )
+        db.commit()
+
+
+def run_once() -> bool:
+    """Claim and run one job; False when there was nothing to do."""
+    with SessionLocal() as db:
+        job = claim_job(db)
+        if job is None:
+            return False
+        job_id, dataset_id, path, attempts = job.id, job.dataset_id, Path(job.path), job.attempts
+        run = JOB_RUNNERS[job.kind]
+
+    if attempts > get_settings().ETL_MAX_ATTEMPTS:
+        logger.error("ETL job %s for dataset %s exhausted its retries", job_id, dataset_id)
+        _finish(job_id, "failed", f"Processing was interrupted {attempts - 1} times")
+        path.unlink(missing_ok=True)
+        return True
+
+    # data errors fail the job; a dead worker or a lost database retries it from the kept file
+    try:
+        with _heartbeat(job_id):
+            error = run(dataset_id, path)
+    except RETRYABLE_ERRORS:
+        logger.warning("ETL job %s for dataset %s lost the database; requeued", job_id, dataset_id)
+        # raises too while the database is still away; the lease expiring requeues the job then
+        _requeue(job_id)
+        return True
+    _finish(job_id, "failed" if error else "done", error)
+    return True
@@ -0,0 +1,88 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+
+@dataclass
+class Cursor:
+    """Position just past a row in a (sort column, id) ordering."""
+
+    sort_by: str
+    sort_dir: str
+    value: object
+    id: int
+    backward: bool = False
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    value = cursor.value.isoformat() if isinstance(cursor.value, datetime) else cursor.value
+    payload = {
+        "s": cursor.sort_by, "d": cursor.sort_dir, "v": value,
+        "i": cursor.id, "b": cursor.backward,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str, sort_dir: str) -> Cursor:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        cursor = Cursor(payload["s"], payload["d"], payload["v"], int(payload["i"]), bool(payload["b"]))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+
+    # a cursor is only meaningful for the ordering it was issued under
+    if (cursor.sort_by, cursor.sort_dir) != (sort_by, sort_dir):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Cursor does not match the requested sort")
+    return cursor
+
+
+def keyset_query(
+    q: Query,
+    col: InstrumentedAttribute,
+    id_col: InstrumentedAttribute,
+    descending: bool,
+    cursor: Cursor | None,
+    limit: int,
+    offset: int = 0,
+) -> Query:
+    """The page query: `limit` + 1 rows after (or before) the cursor.
+
+    The (col, id) row comparison lets the planner start from a matching
+    index instead of skipping an offset; `offset` is only for plain
+    page-number requests.
+    """
+    backward = cursor is not None and cursor.backward
+    # walking backwards is walking forwards in the opposite order, then flipping the page
+    reverse = descending != backward
+    if cursor is not None:
+        value = cursor.value
+        if isinstance(value, str) and col.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        key, bound = tuple_(col, id_col), tuple_(value, cursor.id)
+        q = q.filter(key < bound if reverse else key > bound)
+    q = q.order_by(*((col.desc(), id_col.desc()) if reverse else (col.asc(), id_col.asc())))
+    return q.offset(offset).limit(limit + 1)
+
+
+def keyset_page(
+    q: Query,
+    col: InstrumentedAttribute,
+    id_col: InstrumentedAttribute,
+    descending: bool,
+    cursor: Cursor | None,
+    limit: int,
+    offset: int = 0,
+) -> tuple[list, bool]:
+    """Rows of one page in the requested order, plus whether more exist in that direction."""
+    rows = keyset_query(q, col, id_col, descending, cursor, limit, offset).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if cursor is not None and cursor.backward:
+        rows.reverse()
+    return rows, has_more
@@ -0,0 +1,67 @@
+"""sales_records is LIST-partitioned on dataset_id, one partition per dataset.
+
+Queries filter on dataset_id, so the planner prunes to a single partition
+and its indexes, whose size depends only on that dataset. Removing a
+dataset's rows is a DROP TABLE instead of a DELETE of each row.
+
+There is no default partition: a row for a dataset whose partition was
+never created is rejected instead of landing in a shared table.
+"""
+from sqlalchemy import exc, text
+from sqlalchemy.orm import Session
+
+from app.models import SalesRecord
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def partition_name(dataset_id: int) -> str:
+    return f"{SalesRecord.__tablename__}_{int(dataset_id)}"
+
+
+def _partitioned(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def lock_not_available(e: exc.OperationalError) -> bool:
+    """Whether `e` is a lock_timeout running out."""
+    return getattr(e.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+
+def create_partition(db: Session, dataset_id: int, lock_timeout_ms: int | None = None) -> None:
+    """Create the dataset's partition if it does not exist yet.
+
+    The table is created on its own and then attached. CREATE TABLE ...
+    PARTITION OF would lock the whole of sales_records, queueing behind any
+    running query on it, with every later query queued behind it; ATTACH
+    PARTITION takes a lock that reads and writes do not conflict with, so
+    only another attach or a drop waits. Commit soon after all the same;
+    `lock_timeout_ms` bounds the wait, as for drop_partition. When the
+    partition exists this is a catalog lookup and takes no lock.
+    """
+    if not _partitioned(db):
+        return
+    name = partition_name(dataset_id)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return
+    if lock_timeout_ms is not None:
+        db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+    parent = SalesRecord.__tablename__
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} (LIKE {parent} INCLUDING ALL)"))
+    db.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES IN ({int(dataset_id)})"))
+
+
+def drop_partition(db: Session, dataset_id: int, lock_timeout_ms: int | None = None) -> None:
+    """Remove every record of a dataset at once.
+
+    Dropping a partition briefly locks the whole of sales_records, so it
+    queues behind any running query on it and every later query queues
+    behind the drop; `lock_timeout_ms` bounds that wait (lock_not_available
+    is raised once it runs out).
+    """
+    if _partitioned(db):
+        if lock_timeout_ms is not None:
+            db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+        db.execute(text(f"DROP TABLE IF EXISTS {partition_name(dataset_id)}"))
+    else:
+        db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset_id).delete(synchronize_session=False)
@@ -0,0 +1,138 @@
+"""Live ETL progress: written to Dataset.progress by the ETL, pushed to clients as Server-Sent Events.
+
+The ETL and the API usually run in different processes, so the dataset
+row is the channel. The ETL updates it at most every
+PROGRESS_INTERVAL_SECONDS; each event stream reads all of its user's
+in-flight datasets with one query per interval, and sends only what
+changed. A client therefore makes one request however many uploads it
+is watching, instead of a poll per dataset, each with its own auth.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable
+
+from sqlalchemy import or_, text, update
+from sqlalchemy.orm import Session, undefer
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.database import SessionLocal, release_session
+from app.models import Dataset
+from app.schemas import DatasetProgress
+from app.services.telemetry import EtlTelemetry
+
+logger = logging.getLogger(__name__)
+
+# a comment line now and then, so proxies do not time out an idle stream
+KEEPALIVE_SECONDS = 15
+LOCK_TIMEOUT_MS = 1000
+
+
+def progress_state(telemetry: EtlTelemetry, stage: str) -> dict:
+    """What the ETL has done so far, as stored in Dataset.progress.
+
+    rows_total is the input row count, known once the file has been
+    scanned (streaming) or read; duplicates are counted in it but never
+    loaded.
+    """
+    return {
+        "stage": stage,
+        "rows_total": telemetry.input_rows() or None,
+        "rows_parsed": telemetry.rows("parse") or telemetry.rows("dedup"),
+        "rows_loaded": telemetry.rows("load"),
+    }
+
+
+class ProgressReporter:
+    """Telemetry listener writing the run's progress to its dataset row.
+
+    A failed write is logged and skipped, like a missed heartbeat; the
+    ETL carries on.
+    """
+
+    def __init__(self, dataset_id: int):
+        self.dataset_id = dataset_id
+        self.interval = get_settings().PROGRESS_INTERVAL_SECONDS
+        self.last: float | None = None
+
+    def __call__(self, telemetry: EtlTelemetry, stage: str) -> None:
+        now = time.monotonic()
+        if self.last is not None and now - self.last < self.interval:
+            return
+        self.last = now
+        try:
+            # a bulk UPDATE: leaves the version, and so the cached responses, alone
+            with SessionLocal() as db:
+                if db.get_bind().dialect.name == "postgresql":
+                    # the ETL waits for this write: never on a lock its own transaction holds
+                    db.execute(text(f"SET LOCAL lock_timeout = {LOCK_TIMEOUT_MS}"))
+                db.execute(
+                    update(Dataset)
+                    .where(Dataset.id == self.dataset_id)
+                    .values(progress=progress_state(telemetry, stage))
+                )
+                db.commit()
+        except Exception:
+            logger.exception("Progress update failed for dataset %s", self.dataset_id)
+
+
+def _in_flight(db: Session, user_id: int, watched: set[int]) -> list[DatasetProgress]:
+    """The user's processing datasets, plus those in `watched` that have since finished."""
+    try:
+        datasets = (
+            db.query(Dataset)
+            .options(undefer(Dataset.progress))
+            .filter(
+                Dataset.user_id == user_id,
+                or_(Dataset.status == "processing", Dataset.id.in_(watched)),
+            )
+            .order_by(Dataset.id)
+            .all()
+        )
+        return [DatasetProgress.model_validate(d) for d in datasets]
+    finally:
+        # no connection is held between polls; the commit also expires what was read
+        release_session(db)
+
+
+def _event(name: str, data: str) -> str:
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+async def progress_events(db: Session, user_id: int, ids: Iterable[int] = ()) -> AsyncIterator[str]:
+    """SSE for every in-flight dataset of the user.
+
+    A `progress` event carries a dataset's summary and progress whenever
+    either changes, including the final one with status ready or failed.
+    The first poll also sends the user's datasets among `ids` whatever their
+    status, so a client that starts watching an upload after it finished
+    still sees it end. Once nothing is in flight the stream sends `done`
+    and ends. It also ends after PROGRESS_STREAM_SECONDS; EventSource then
+    reconnects.
+    """
+    settings = get_settings()
+    sent: dict[int, str] = {}
+    watched = set(ids)
+    start = last_send = time.monotonic()
+    while True:
+        datasets = await run_in_threadpool(_in_flight, db, user_id, watched)
+        for dataset in datasets:
+            data = dataset.model_dump_json()
+            if sent.get(dataset.id) != data:
+                yield _event("progress", data)
+                last_send = time.monotonic()
+            sent[dataset.id] = data
+        sent = {d.id: sent[d.id] for d in datasets if d.status == "processing"}
+        watched = set(sent)
+        if not sent:
+            yield _event("done", "{}")
+            return
+
+        now = time.monotonic()
+        if now - start >= settings.PROGRESS_STREAM_SECONDS:
+            return
+        if now - last_send >= KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_send = now
+        await asyncio.sleep(settings.PROGRESS_INTERVAL_SECONDS)
@@ -0,0 +1,48 @@
+from sqlalchemy.orm import InstrumentedAttribute, Query, Session
+
+from app.models import DIMENSIONS, SalesRecord
+from app.schemas import SalesRecordOut
+from app.services.dimensions import DimensionCodes, code_column, dimension_equals
+
+SORT_COLUMNS = (
+    "order_number", "order_date", "sales", "total_sales",
+    "customer_name", "product_line", "status", "deal_size",
+)
+DEFAULT_SORT = "order_number"
+
+# SalesRecordOut without the row id: the export layout
+RECORD_FIELDS = tuple(field for field in SalesRecordOut.model_fields if field != "id")
+
+
+def stored_column(name: str) -> InstrumentedAttribute:
+    """The sales_records column behind a SalesRecordOut field; dimension codes sort like their values."""
+    return code_column(name) if name in DIMENSIONS else getattr(SalesRecord, name)
+
+
+def record_values(record: SalesRecord, codes: DimensionCodes) -> dict:
+    """A loaded row with its dimension codes turned back into text, keyed like SalesRecordOut."""
+    return {
+        field: codes.decode(field, getattr(record, f"{field}_id")) if field in DIMENSIONS
+        else getattr(record, field)
+        for field in SalesRecordOut.model_fields
+    }
+
+
+def filter_records(
+    db: Session,
+    dataset_id: int,
+    status_filter: str | None = None,
+    product_line: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+) -> Query:
+    q = db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset_id)
+    if status_filter:
+        q = q.filter(dimension_equals(dataset_id, "status", status_filter))
+    if product_line:
+        q = q.filter(dimension_equals(dataset_id, "product_line", product_line))
+    if date_from:
+        q = q.filter(SalesRecord.order_date >= date_from)
+    if date_to:
+        q = q.filter(SalesRecord.order_date <= date_to)
+    return q
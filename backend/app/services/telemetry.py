@@ -0,0 +1,159 @@
+"""Per-stage ETL telemetry: wall time, CPU time, peak RSS and rows/sec.
+
+`_run_etl` puts an EtlTelemetry in a context variable for the length of a
+run; `stage()` blocks in the ETL add to it, and are no-ops outside a run,
+so transform() and friends can be called on their own as before. Stages
+are flat: peak RSS is reset when a stage starts, which a nested stage
+would do to its parent. A listener, if given, is told each time a stage
+starts; services.progress publishes from there.
+"""
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+def _peak_rss_bytes() -> int | None:
+    """The process's resident set high-water mark."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _reset_peak_rss() -> None:
+    # Linux only; elsewhere a stage reports the peak since the process started
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+@dataclass
+class StageStats:
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int | None = None
+    rows: int = 0
+
+    def to_state(self) -> dict:
+        return {
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "peak_rss_mb": round(self.peak_rss_bytes / 2**20, 1) if self.peak_rss_bytes is not None else None,
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / self.wall_seconds) if self.rows and self.wall_seconds else None,
+        }
+
+
+@dataclass
+class EtlTelemetry:
+    # stage -> stats, summed over every chunk the stage ran for, in first-run order
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+    # CPU time is process-wide: a worker process runs one job at a time
+    cpu_start: float = field(default_factory=time.process_time)
+    listener: Callable[["EtlTelemetry", str], None] | None = None
+
+    def rows(self, name: str) -> int:
+        stats = self.stages.get(name)
+        return stats.rows if stats else 0
+
+    def input_rows(self) -> int:
+        """Rows read from the upload so far, duplicates included."""
+        return self.rows("scan") or self.rows("parse") or self.rows("dedup")
+
+    def entered(self, name: str) -> None:
+        if self.listener is not None:
+            self.listener(self, name)
+
+    def add(self, name: str, wall: float, cpu: float, peak_rss: int | None, rows: int) -> None:
+        stats = self.stages.setdefault(name, StageStats())
+        stats.wall_seconds += wall
+        stats.cpu_seconds += cpu
+        stats.rows += rows
+        if peak_rss is not None:
+            stats.peak_rss_bytes = max(stats.peak_rss_bytes or 0, peak_rss)
+
+    def to_state(self) -> dict:
+        """JSON for Dataset.etl_stats; the total's rows/sec counts the input rows."""
+        peaks = [s.peak_rss_bytes for s in self.stages.values() if s.peak_rss_bytes is not None]
+        total = StageStats(
+            wall_seconds=time.perf_counter() - self.start,
+            cpu_seconds=time.process_time() - self.cpu_start,
+            peak_rss_bytes=max(peaks, default=None),
+            rows=self.input_rows(),
+        )
+        return {
+            "stages": [{"name": name, **stats.to_state()} for name, stats in self.stages.items()],
+            "total": total.to_state(),
+        }
+
+
+_current: ContextVar[EtlTelemetry | None] = ContextVar("etl_telemetry", default=None)
+
+
+@contextmanager
+def collecting(listener: Callable[[EtlTelemetry, str], None] | None = None) -> Iterator[EtlTelemetry]:
+    telemetry = EtlTelemetry(listener=listener)
+    token = _current.set(telemetry)
+    try:
+        yield telemetry
+    finally:
+        _current.reset(token)
+
+
+@dataclass
+class Rows:
+    count: int = 0
+
+
+@contextmanager
+def stage(name: str, rows: int = 0) -> Iterator[Rows]:
+    """Time the block as `name`; its rows/sec counts `rows`, or whatever the block sets on the yielded Rows."""
+    counted = Rows(rows)
+    telemetry = _current.get()
+    if telemetry is None:
+        yield counted
+        return
+    telemetry.entered(name)
+    _reset_peak_rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield counted
+    finally:
+        telemetry.add(name, time.perf_counter() - wall, time.process_time() - cpu, _peak_rss_bytes(), counted.count)
+
+
+def staged_chunks(name: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Yield from `chunks`, timing each read as `name` and counting its rows."""
+    telemetry = _current.get()
+    iterator = iter(chunks)
+    if telemetry is None:
+        yield from iterator
+        return
+    while True:
+        telemetry.entered(name)
+        _reset_peak_rss()
+        wall, cpu = time.perf_counter(), time.process_time()
+        chunk = next(iterator, None)
+        rows = 0 if chunk is None else len(chunk)
+        telemetry.add(name, time.perf_counter() - wall, time.process_time() - cpu, _peak_rss_bytes(), rows)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,133 @@
+"""Per-request timing: phase durations and SQL query accounting, sent as Server-Timing.
+
+The middleware puts a RequestTiming in a context variable for the length
+of the request; `phase()` blocks and the engine's cursor events add to it
+from whichever thread runs the work, since the threadpool copies the
+context. With REQUEST_TIMING off no RequestTiming exists, and each hook
+costs one context variable lookup.
+"""
+import json
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestTiming:
+    start: float = field(default_factory=time.perf_counter)
+    # phase -> seconds, summed over every time the phase ran
+    phases: dict[str, float] = field(default_factory=dict)
+    queries: int = 0
+    sql_seconds: float = 0.0
+    endpoint_end: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self, now: float) -> str:
+        metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        metrics.append(f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries"')
+        metrics.append(f"total;dur={(now - self.start) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
+
+
+def endpoint_returned() -> None:
+    """Mark the end of the endpoint; what follows until the response starts is serialisation."""
+    timing = _current.get()
+    if timing is not None:
+        timing.endpoint_end = time.perf_counter()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    starts = conn.info.get("query_start")
+    if timing is None or not starts:
+        return
+    timing.queries += 1
+    timing.sql_seconds += time.perf_counter() - starts.pop()
+
+
+class RequestTimingMiddleware:
+    """Adds Server-Timing to every response and logs one JSON line per request.
+
+    Requests slower than REQUEST_SLOW_MS are logged at WARNING, the rest at
+    DEBUG. The header covers the work done before the response starts; the
+    log line is written once the body is sent, so a streamed export's
+    queries count there in full.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        settings = get_settings()
+        if scope["type"] != "http" or not settings.REQUEST_TIMING:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timing.endpoint_end is not None:
+                    timing.add("serialize", now - timing.endpoint_end)
+                MutableHeaders(scope=message).append("Server-Timing", timing.server_timing(now))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total_ms = (time.perf_counter() - timing.start) * 1000
+            route = scope.get("route")
+            line = {
+                "method": scope["method"],
+                "path": getattr(route, "path", scope["path"]),
+                "status": status,
+                "total_ms": round(total_ms, 1),
+                "db_ms": round(timing.sql_seconds * 1000, 1),
+                "queries": timing.queries,
+                **{f"{name}_ms": round(seconds * 1000, 1) for name, seconds in timing.phases.items()},
+            }
+            level = logging.WARNING if total_ms >= settings.REQUEST_SLOW_MS else logging.DEBUG
+            logger.log(level, "request %s", json.dumps(line))
@@ -0,0 +1,75 @@
+"""ETL worker pool: python -m app.worker [--processes N]
+
+Runs alongside the API (same image, same settings). Start as many pools on
+as many hosts as needed; jobs are claimed from the etl_jobs table.
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import time
+
+from app.config import get_settings
+
+logger = logging.getLogger("app.worker")
+
+
+def work() -> None:
+    # imported here so each spawned process builds its own engine and pool
+    from app.services.jobs import run_once
+
+    # the parent owns shutdown; Ctrl-C reaches the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    poll = get_settings().ETL_POLL_SECONDS
+    while True:
+        try:
+            if run_once():
+                continue
+        except Exception:
+            logger.exception("ETL worker iteration failed")
+        time.sleep(poll)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=get_settings().ETL_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+    ctx = multiprocessing.get_context("spawn")
+
+    def spawn(i: int) -> multiprocessing.Process:
+        proc = ctx.Process(target=work, name=f"etl-worker-{i}")
+        proc.start()
+        return proc
+
+    procs = [spawn(i) for i in range(args.processes)]
+    logger.info("Started %d ETL worker processes", len(procs))
+
+    stopping = False
+
+    def shutdown(*_) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # a worker that dies is replaced; its job is retried once the lease expires
+    while not stopping:
+        for i, proc in enumerate(procs):
+            if not proc.is_alive():
+                logger.warning("%s exited with %s, restarting", proc.name, proc.exitcode)
+                procs[i] = spawn(i)
+        time.sleep(1)
+
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare the five-query aggregate build with the single GROUPING SETS statement.
+
+    python -m benchmarks.aggregates --rows 1000000
+"""
+import argparse
+import time
+
+from sqlalchemy import delete, event, func
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, SalesRecord, User
+from app.services.aggregates import compute_aggregates
+from app.services.etl import load_records, to_record_frame, transform
+from app.services.partitions import drop_partition
+from benchmarks.synthetic import synthetic_frame
+
+
+def five_query_aggregates(db, dataset_id: int) -> None:
+    """The previous implementation: one round trip and one scan per figure."""
+    r = SalesRecord
+    base = db.query(r).filter(r.dataset_id == dataset_id)
+    db.query(func.sum(r.total_sales)).filter(r.dataset_id == dataset_id).scalar()
+    db.query(func.count(func.distinct(r.order_number))).filter(r.dataset_id == dataset_id).scalar()
+    base.with_entities(r.year_id, r.order_quarter, func.sum(r.total_sales), func.count()) \
+        .group_by(r.year_id, r.order_quarter).order_by(r.year_id, r.order_quarter).all()
+    base.with_entities(r.country_id, func.sum(r.total_sales), func.count()) \
+        .group_by(r.country_id).order_by(func.sum(r.total_sales).desc()).limit(10).all()
+    base.with_entities(r.customer_name_id, func.sum(r.total_sales), func.count()) \
+        .group_by(r.customer_name_id).order_by(func.sum(r.total_sales).desc()).limit(10).all()
+
+
+def measure(fn, dataset_id: int, repeat: int) -> tuple[float, int]:
+    queries = 0
+
+    def count(*_):
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        timings = []
+        for _ in range(repeat):
+            with SessionLocal() as db:
+                start = time.perf_counter()
+                fn(db, dataset_id)
+                timings.append(time.perf_counter() - start)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return min(timings), queries // repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    df, _ = transform(synthetic_frame(args.rows))
+
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv", row_count=len(df), status="ready")
+        db.add(dataset)
+        db.flush()
+        load_records(db, to_record_frame(dataset.id, df))
+        db.commit()
+        user_id, dataset_id = user.id, dataset.id
+
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE sales_records")
+        for name, fn in [("five queries", five_query_aggregates), ("grouping sets", compute_aggregates)]:
+            best, queries = measure(fn, dataset_id, args.repeat)
+            print(f"{name:>14}: {queries} queries, best of {args.repeat} {best * 1000:9.1f} ms ({len(df):,} rows)")
+    finally:
+        with SessionLocal() as db:
+            drop_partition(db, dataset_id)
+            db.execute(delete(Dataset).where(Dataset.id == dataset_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Time appending a daily file to datasets of growing history against reloading everything.
+
+    python -m benchmarks.append --history 100000 1000000 5000000 --delta 10000
+
+For each history size, loads the history into one dataset and times
+append_dataset_file with --delta rows, a tenth of them lines the dataset
+already holds. Then times process_dataset over history and delta together,
+which is what a daily upload cost before appends.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, User
+from app.services.etl import append_dataset_file, process_dataset
+from app.services.partitions import drop_partition
+from benchmarks.synthetic import synthetic_frame
+
+OVERLAP = 0.1
+
+
+def new_dataset(user_id: int) -> int:
+    with SessionLocal() as db:
+        dataset = Dataset(user_id=user_id, filename="bench.csv", row_count=0, status="processing")
+        db.add(dataset)
+        db.commit()
+        return dataset.id
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--delta", type=int, default=10_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    dataset_ids: list[int] = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in args.history:
+                frame = synthetic_frame(rows + args.delta)
+                history = frame.head(rows)
+                repeated = int(args.delta * OVERLAP)
+                delta = pd.concat([frame.tail(args.delta - repeated), history.tail(repeated)])
+
+                dataset_id = new_dataset(user_id)
+                dataset_ids.append(dataset_id)
+                process_dataset(dataset_id, history.copy())
+                path = Path(tmp) / "day.csv"
+                delta.to_csv(path, index=False, encoding="latin-1")
+                append = timed(append_dataset_file, dataset_id, path)
+
+                reload_id = new_dataset(user_id)
+                dataset_ids.append(reload_id)
+                reload = timed(process_dataset, reload_id, pd.concat([history, delta], ignore_index=True))
+
+                print(
+                    f"history {rows:>11,}  append {len(delta):,} rows {append:8.2f}s"
+                    f"  full reload {reload:8.2f}s"
+                )
+    finally:
+        with SessionLocal() as db:
+            for dataset_id in dataset_ids:
+                drop_partition(db, dataset_id)
+                db.commit()
+            db.execute(delete(Dataset).where(Dataset.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Status polling with many requests in flight, sync routes vs DB_ASYNC.
+
+    python -m benchmarks.async_status --concurrency 1000 --seconds 10
+
+Starts uvicorn once per mode and keeps --concurrency clients polling
+GET /api/datasets/{id}/status over their own connections; reports req/s,
+latency percentiles and failed requests (timeouts, 5xx).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, User
+from app.services.auth import create_access_token
+from benchmarks.auth_status import PORT, serve
+
+
+async def drive(url: str, token: str, seconds: float, concurrency: int) -> tuple[list[float], Counter]:
+    latencies: list[float] = []
+    failures: Counter = Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(cookies={"access_token": token}, limits=limits, timeout=30) as http:
+        deadline = time.perf_counter() + seconds
+
+        async def client() -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    r = await http.get(url)
+                except httpx.HTTPError as exc:
+                    failures[type(exc).__name__] += 1
+                    continue
+                if r.status_code != 200:
+                    failures[r.status_code] += 1
+                else:
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv", row_count=0, status="processing")
+        db.add(dataset)
+        db.commit()
+        user_id, dataset_id = user.id, dataset.id
+
+    token = create_access_token(user_id)
+    url = f"http://127.0.0.1:{PORT}/api/datasets/{dataset_id}/status"
+    try:
+        for label, async_mode in [("sync", "false"), ("async", "true")]:
+            os.environ["DB_ASYNC"] = async_mode
+            proc = serve(cache_ttl=60)
+            try:
+                asyncio.run(drive(url, token, 1, 50))
+                latencies, failures = asyncio.run(drive(url, token, args.seconds, args.concurrency))
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    # a wedged server is still draining its queue of pool timeouts
+                    proc.kill()
+                    proc.wait()
+            # the sync run can wedge outright and answer almost nothing
+            q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [float("nan")] * 99
+            print(
+                f"{label:>5}: {len(latencies) / args.seconds:7.0f} req/s"
+                f" | p50 {q[49]:7.1f} ms p99 {q[98]:7.1f} ms | failures {dict(failures)}"
+            )
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Dataset).where(Dataset.id == dataset_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Requests/sec on GET /api/datasets/{id}/status with and without the auth cache.
+
+    python -m benchmarks.auth_status --seconds 10 --concurrency 8
+
+Starts uvicorn once with AUTH_CACHE_TTL_SECONDS=0 (every request decodes
+the JWT and loads the user) and once with the cache on, and drives each
+with the same number of client threads.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, User
+from app.services.auth import create_access_token
+
+PORT = 8765
+
+
+def serve(cache_ttl: int) -> subprocess.Popen:
+    env = {**os.environ, "AUTH_CACHE_TTL_SECONDS": str(cache_ttl)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/health")
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def drive(url: str, token: str, seconds: float, concurrency: int) -> float:
+    done = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client() -> None:
+        nonlocal done
+        count = 0
+        with httpx.Client(cookies={"access_token": token}) as http:
+            while time.perf_counter() < deadline:
+                http.get(url).raise_for_status()
+                count += 1
+        with lock:
+            done += count
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return done / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv", row_count=0, status="ready")
+        db.add(dataset)
+        db.commit()
+        user_id, dataset_id = user.id, dataset.id
+
+    token = create_access_token(user_id)
+    url = f"http://127.0.0.1:{PORT}/api/datasets/{dataset_id}/status"
+    try:
+        for label, ttl in [("no auth cache", 0), ("auth cache", 60)]:
+            proc = serve(ttl)
+            try:
+                drive(url, token, 1, args.concurrency)  # warm up pools and caches
+                rps = drive(url, token, args.seconds, args.concurrency)
+            finally:
+                proc.terminate()
+                proc.wait()
+            print(f"{label:>14}: {rps:8.0f} req/s")
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Dataset).where(Dataset.id == dataset_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
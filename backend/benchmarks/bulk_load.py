@@ -0,0 +1,108 @@
+"""Compare the per-row ORM insert path with the bulk loader in process_dataset.
+
+    python -m benchmarks.bulk_load --rows 1000000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import DIMENSIONS, Dataset, SalesRecord, User
+from app.services.dimensions import DimensionCodes
+from app.services.etl import load_records, to_record_frame, transform
+from app.services.partitions import create_partition, drop_partition
+from benchmarks.synthetic import write_synthetic_csv
+
+
+def orm_load(db, dataset_id: int, df: pd.DataFrame) -> None:
+    """The pre-COPY implementation: one ORM object per row via iterrows()."""
+    create_partition(db, dataset_id)
+    codes = DimensionCodes(dataset_id)
+    codes.extend(db, to_record_frame(dataset_id, df))
+
+    lookup = {field: dict(zip(codes.labels[field], codes.codes[field])) for field in DIMENSIONS}
+
+    def code(field: str, value) -> int:
+        return lookup[field][str(value)]
+
+    db.add_all([
+        SalesRecord(
+            dataset_id=dataset_id,
+            order_number=int(row["ORDERNUMBER"]),
+            quantity_ordered=int(row["QUANTITYORDERED"]),
+            price_each=float(row["PRICEEACH"]),
+            sales=float(row["SALES"]),
+            order_date=row["ORDERDATE"].to_pydatetime(),
+            status_id=code("status", row["STATUS"]),
+            month_id=int(row["MONTH_ID"]),
+            year_id=int(row["YEAR_ID"]),
+            product_line_id=code("product_line", row["PRODUCTLINE"]),
+            product_code_id=code("product_code", row["PRODUCTCODE"]),
+            customer_name_id=code("customer_name", row["CUSTOMERNAME"]),
+            country_id=code("country", row["COUNTRY"]),
+            deal_size_id=code("deal_size", row["DEALSIZE"]),
+            total_sales=float(row["TOTAL_SALES"]),
+            order_quarter=str(row["ORDER_QUARTER"]),
+        )
+        for _, row in df.iterrows()
+    ])
+    db.flush()
+
+
+def timed_load(loader, user_id: int, df: pd.DataFrame) -> float:
+    db = SessionLocal()
+    try:
+        dataset = Dataset(user_id=user_id, filename="bench.csv", row_count=0, status="processing")
+        db.add(dataset)
+        db.commit()
+        start = time.perf_counter()
+        loader(db, dataset.id, df)
+        db.commit()
+        elapsed = time.perf_counter() - start
+        drop_partition(db, dataset.id)
+        db.delete(dataset)
+        db.commit()
+        return elapsed
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-orm", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic_csv(Path(tmp) / "bench.csv", args.rows)
+        df, _ = transform(pd.read_csv(path, encoding="latin-1"))
+
+    db = SessionLocal()
+    user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    def bulk_load(db, dataset_id: int, df: pd.DataFrame) -> None:
+        load_records(db, to_record_frame(dataset_id, df))
+
+    loaders = [("bulk", bulk_load)] + ([] if args.skip_orm else [("orm", orm_load)])
+    try:
+        for name, loader in loaders:
+            elapsed = timed_load(loader, user_id, df)
+            print(f"{name:>5}: {len(df):>10,} rows in {elapsed:8.2f}s  {len(df) / elapsed:>12,.0f} rows/s")
+    finally:
+        db = SessionLocal()
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
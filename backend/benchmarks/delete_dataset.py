@@ -0,0 +1,71 @@
+"""Time DELETE /datasets/{id} against deleting the dataset row and cascading to its records.
+
+    python -m benchmarks.delete_dataset --rows 5000000
+
+delete_dataset drops the dataset's partition; the cascade path deletes the
+Dataset through the ORM and lets ON DELETE CASCADE remove each record,
+leaving them behind as dead rows for vacuum.
+"""
+import argparse
+import time
+
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, User
+from app.services.datasets import delete_dataset
+from app.services.etl import load_records, to_record_frame, transform
+from app.services.partitions import drop_partition
+from benchmarks.synthetic import synthetic_frame
+
+
+def cascade_delete(db, dataset: Dataset) -> None:
+    db.delete(dataset)
+    db.commit()
+
+
+def timed_delete(deleter, user_id: int, frame) -> float:
+    with SessionLocal() as db:
+        dataset = Dataset(user_id=user_id, filename="bench.csv", row_count=len(frame), status="ready")
+        db.add(dataset)
+        db.flush()
+        load_records(db, to_record_frame(dataset.id, frame))
+        db.commit()
+        dataset_id = dataset.id
+
+        start = time.perf_counter()
+        deleter(db, dataset)
+        elapsed = time.perf_counter() - start
+
+        # a cascaded delete leaves the now empty partition behind
+        drop_partition(db, dataset_id)
+        db.commit()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    df, _ = transform(synthetic_frame(args.rows))
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    try:
+        for name, deleter in [("drop partition", delete_dataset), ("cascade", cascade_delete)]:
+            elapsed = timed_delete(deleter, user_id, df)
+            print(f"{name:>14}: {len(df):>10,} rows in {elapsed:8.2f}s")
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Dataset).where(Dataset.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
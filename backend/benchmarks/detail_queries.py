@@ -0,0 +1,103 @@
+"""EXPLAIN ANALYZE the dataset detail queries for every sort/filter combination.
+
+    python -m benchmarks.detail_queries --rows 1000000 --noise-rows 1000000
+
+Seeds a dataset of --rows (plus a second, unrelated dataset so dataset_id is
+selective), then reports execution time in ms for the COUNT, the first page,
+a deep OFFSET page and the same deep page fetched by keyset cursor.
+"""
+import argparse
+import time
+
+from sqlalchemy import delete, func, select
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, SalesRecord, User
+from app.services.etl import load_records, to_record_frame, transform
+from app.services.pagination import Cursor, keyset_query
+from app.services.partitions import drop_partition
+from app.services.records import SORT_COLUMNS, filter_records, stored_column
+from benchmarks.synthetic import synthetic_frame
+
+PAGE_SIZE = 20
+
+FILTERS = {
+    "none": {},
+    "status=Shipped": {"status_filter": "Shipped"},
+    "status=Disputed": {"status_filter": "Disputed"},
+    "product_line": {"product_line": "Classic Cars"},
+    "date range": {"date_from": "2004-01-01", "date_to": "2004-03-31"},
+    "status+date": {"status_filter": "Shipped", "date_from": "2004-01-01", "date_to": "2004-03-31"},
+}
+
+
+def explain_ms(db, stmt) -> float:
+    compiled = stmt.compile(dialect=engine.dialect)
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN (ANALYZE, FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    return plan[0]["Execution Time"]
+
+
+def page_ms(db, q, col, cursor=None, offset=0) -> float:
+    page = keyset_query(q, col, SalesRecord.id, False, cursor, PAGE_SIZE, offset)
+    return explain_ms(db, page.statement)
+
+
+def seed(db, user_id: int, rows: int, label: str) -> int:
+    df, _ = transform(synthetic_frame(rows))
+    dataset = Dataset(user_id=user_id, filename=f"{label}.csv", row_count=len(df), status="ready")
+    db.add(dataset)
+    db.flush()
+    load_records(db, to_record_frame(dataset.id, df))
+    return dataset.id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--noise-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        noise_id = seed(db, user.id, args.noise_rows, "noise")
+        dataset_id = seed(db, user.id, args.rows, "bench")
+        db.commit()
+        user_id = user.id
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM ANALYZE sales_records")
+
+    print(f"{'filter':<16} {'sort':<14} {'count':>9} {'page 1':>9} {'offset':>9} {'keyset':>9}")
+    try:
+        with SessionLocal() as db:
+            for label, filters in FILTERS.items():
+                q = filter_records(db, dataset_id, **filters)
+                matching = q.count()
+                deep = max(0, int(matching * 0.9) // PAGE_SIZE * PAGE_SIZE)
+                count_ms = explain_ms(db, select(func.count()).select_from(q.subquery()))
+                for col_name in SORT_COLUMNS:
+                    col = stored_column(col_name)
+                    anchor = q.order_by(col, SalesRecord.id).offset(max(deep - 1, 0)).first()
+                    cursor = Cursor(col_name, "asc", getattr(anchor, col.key), anchor.id) if anchor else None
+                    print(
+                        f"{label:<16} {col_name:<14}"
+                        f" {count_ms:>9.2f}"
+                        f" {page_ms(db, q, col):>9.2f}"
+                        f" {page_ms(db, q, col, offset=deep):>9.2f}"
+                        f" {page_ms(db, q, col, cursor=cursor):>9.2f}"
+                    )
+    finally:
+        with SessionLocal() as db:
+            for i in (dataset_id, noise_id):
+                drop_partition(db, i)
+            db.execute(delete(Dataset).where(Dataset.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compare the DataFrame export with the streaming export_csv.
+
+    python -m benchmarks.export --rows 1000000
+
+Reports time to first byte and total time for each implementation on the
+same dataset; --memory adds a second, slower pass that records the peak
+Python heap with tracemalloc.
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, SalesRecord, User
+from app.services.etl import load_records, to_record_frame, transform
+from app.services.dimensions import DimensionCodes
+from app.services.export import export_csv
+from app.services.partitions import drop_partition
+from app.services.records import RECORD_FIELDS, record_values
+from benchmarks.synthetic import synthetic_frame
+
+
+def dataframe_export(db, dataset_id: int):
+    """The pre-streaming implementation: ORM objects -> dicts -> DataFrame -> BytesIO."""
+    records = (
+        db.query(SalesRecord)
+        .filter(SalesRecord.dataset_id == dataset_id)
+        .order_by(SalesRecord.order_number)
+        .all()
+    )
+    codes = DimensionCodes.load(db, dataset_id)
+    rows = [record_values(r, codes) for r in records]
+    buf = io.BytesIO()
+    pd.DataFrame(rows, columns=RECORD_FIELDS).to_csv(buf, index=False)
+    buf.seek(0)
+    return buf
+
+
+def timed_export(exporter, dataset_id: int) -> tuple[float, float, int]:
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        first_byte = None
+        size = 0
+        for chunk in exporter(db, dataset_id):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+        return first_byte, time.perf_counter() - start, size
+
+
+def peak_heap_mb(exporter, dataset_id: int) -> float:
+    with SessionLocal() as db:
+        tracemalloc.start()
+        try:
+            for _ in exporter(db, dataset_id):
+                pass
+            return tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    df, _ = transform(synthetic_frame(args.rows))
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv", row_count=len(df), status="ready")
+        db.add(dataset)
+        db.flush()
+        load_records(db, to_record_frame(dataset.id, df))
+        db.commit()
+        user_id, dataset_id = user.id, dataset.id
+    del df
+
+    try:
+        for name, exporter in [("streaming", export_csv), ("dataframe", dataframe_export)]:
+            first_byte, elapsed, size = timed_export(exporter, dataset_id)
+            line = (
+                f"{name:>9}: {args.rows:>10,} rows  first byte {first_byte:7.3f}s"
+                f"  total {elapsed:7.2f}s  ({size / 2**20:.0f} MiB of CSV)"
+            )
+            if args.memory:
+                line += f"  peak heap {peak_heap_mb(exporter, dataset_id):8.1f} MiB"
+            print(line)
+    finally:
+        with SessionLocal() as db:
+            drop_partition(db, dataset_id)
+            db.execute(delete(Dataset).where(Dataset.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare CSV with Parquet and Arrow for uploads and exports.
+
+    python -m benchmarks.formats --rows 1000000
+
+Upload: file size and time to read the file the way the ETL does, in
+chunks. Export: size and total time of each export format for the same
+loaded dataset.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, User
+from app.services.etl import _chunk_rows, _read_chunks, load_records, to_record_frame, transform
+from app.services.export import export_arrow, export_csv, export_parquet
+from app.services.partitions import drop_partition
+from benchmarks.synthetic import synthetic_frame
+
+WRITERS = {
+    ".csv": lambda df, path: df.to_csv(path, index=False, encoding="latin-1"),
+    ".parquet": lambda df, path: df.to_parquet(path, index=False),
+    ".arrow": lambda df, path: df.to_feather(path),
+}
+
+
+def upload_read(rows: int) -> None:
+    df = synthetic_frame(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix, write in WRITERS.items():
+            path = Path(tmp) / f"bench{suffix}"
+            write(df, path)
+            start = time.perf_counter()
+            read = sum(len(chunk) for chunk in _read_chunks(path, _chunk_rows(path)))
+            elapsed = time.perf_counter() - start
+            print(
+                f"upload {suffix:>8}: {read:>10,} rows  {path.stat().st_size / 2**20:8.1f} MiB"
+                f"  read {elapsed:7.2f}s"
+            )
+
+
+def export(rows: int) -> None:
+    df, _ = transform(synthetic_frame(rows))
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv", row_count=len(df), status="ready")
+        db.add(dataset)
+        db.flush()
+        load_records(db, to_record_frame(dataset.id, df))
+        db.commit()
+        user_id, dataset_id = user.id, dataset.id
+    del df
+
+    try:
+        for name, exporter in [("csv", export_csv), ("parquet", export_parquet), ("arrow", export_arrow)]:
+            with SessionLocal() as db:
+                start = time.perf_counter()
+                size = sum(len(chunk) for chunk in exporter(db, dataset_id))
+                elapsed = time.perf_counter() - start
+            print(f"export {name:>8}: {rows:>10,} rows  {size / 2**20:8.1f} MiB  total {elapsed:7.2f}s")
+    finally:
+        with SessionLocal() as db:
+            drop_partition(db, dataset_id)
+            db.execute(delete(Dataset).where(Dataset.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-export", action="store_true")
+    args = parser.parse_args()
+
+    upload_read(args.rows)
+    if not args.skip_export:
+        Base.metadata.create_all(bind=engine)
+        export(args.rows)
+
+
+if __name__ == "__main__":
+    main()
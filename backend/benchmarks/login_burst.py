@@ -0,0 +1,119 @@
+"""Dataset read latency while a burst of logins hits the same API process.
+
+    python -m benchmarks.login_burst --logins 40 --seconds 8
+
+Runs uvicorn with HASH_WORKERS=0 (bcrypt inline on the request threads)
+and again with the hashing pool, keeps a reader polling
+GET /api/datasets/{id}/status, and reports read p50/p99 before and during
+the burst plus how the logins were answered.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import delete
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, User
+from app.services.auth import create_access_token, hash_password
+from benchmarks.auth_status import PORT, serve
+
+PASSWORD = "bench-password"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(pct) - 1] if len(samples) > 1 else samples[0]
+
+
+def read_latencies(url: str, token: str, seconds: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(cookies={"access_token": token}, timeout=30) as http:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            http.get(url).raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+    return latencies
+
+
+def login_burst(email: str, clients: int, seconds: float) -> Counter:
+    outcomes = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client() -> None:
+        with httpx.Client(timeout=60) as http:
+            while time.perf_counter() < deadline:
+                r = http.post(
+                    f"http://127.0.0.1:{PORT}/api/login", json={"email": email, "password": PASSWORD}
+                )
+                with lock:
+                    outcomes[r.status_code] += 1
+                if r.status_code == 503:
+                    time.sleep(float(r.headers.get("retry-after", 1)))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40, help="concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--hash-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    os.environ["HASH_WORKERS"] = "0"  # seeding below hashes inline
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password=hash_password(PASSWORD))
+        db.add(user)
+        db.flush()
+        dataset = Dataset(user_id=user.id, filename="bench.csv", row_count=0, status="ready")
+        db.add(dataset)
+        db.commit()
+        user_id, email, dataset_id = user.id, user.email, dataset.id
+
+    token = create_access_token(user_id)
+    url = f"http://127.0.0.1:{PORT}/api/datasets/{dataset_id}/status"
+    try:
+        for label, workers in [("inline bcrypt", 0), ("hash pool", args.hash_workers)]:
+            os.environ["HASH_WORKERS"] = str(workers)
+            proc = serve(cache_ttl=60)
+            try:
+                read_latencies(url, token, 1)
+                idle = read_latencies(url, token, 3)
+                burst: dict = {}
+                reader = threading.Thread(
+                    target=lambda: burst.setdefault("reads", read_latencies(url, token, args.seconds))
+                )
+                reader.start()
+                outcomes = login_burst(email, args.logins, args.seconds)
+                reader.join()
+            finally:
+                proc.terminate()
+                proc.wait()
+            reads = burst["reads"]
+            print(
+                f"{label:>13}: reads idle p50 {percentile(idle, 50):7.1f} ms p99 {percentile(idle, 99):7.1f} ms"
+                f" | burst p50 {percentile(reads, 50):7.1f} ms p99 {percentile(reads, 99):7.1f} ms"
+                f" ({len(reads)} reads) | logins {dict(outcomes)}"
+            )
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Dataset).where(Dataset.id == dataset_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
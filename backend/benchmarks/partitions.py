@@ -0,0 +1,142 @@
+"""Show that dataset queries do not slow down as other datasets pile up in sales_records.
+
+    python -m benchmarks.partitions --rows 100000 --datasets 5000 --rows-per-dataset 2000
+
+Seeds one dataset of --rows, then adds --datasets other datasets in --steps
+batches. After each batch it reports planning and execution time in ms for
+the detail COUNT, the first page, a deep OFFSET page and the live
+aggregates of the first dataset; with one partition per dataset they should
+stay flat while the table grows. Finally it times dropping a partition
+against deleting the same number of rows from an unpartitioned table.
+"""
+import argparse
+import time
+
+from sqlalchemy import delete, func, select, text
+
+from app.database import Base, SessionLocal, engine
+from app.models import Dataset, SalesRecord, User
+from app.services.aggregates import compute_aggregates
+from app.services.etl import load_records, to_record_frame, transform
+from app.services.pagination import keyset_query
+from app.services.partitions import drop_partition, partition_name
+from app.services.records import filter_records, stored_column
+from benchmarks.synthetic import synthetic_frame
+
+PAGE_SIZE = 20
+
+
+def explain(db, stmt) -> tuple[float, float]:
+    compiled = stmt.compile(dialect=engine.dialect)
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN (ANALYZE, FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    return plan[0]["Planning Time"], plan[0]["Execution Time"]
+
+
+def new_dataset(db, user_id: int, frame_rows: int, label: str) -> Dataset:
+    dataset = Dataset(user_id=user_id, filename=f"{label}.csv", row_count=frame_rows, status="ready")
+    db.add(dataset)
+    db.flush()
+    return dataset
+
+
+def measure(dataset_id: int, rows: int) -> dict[str, tuple[float, float]]:
+    col = stored_column("order_date")
+    deep = max(0, int(rows * 0.9) // PAGE_SIZE * PAGE_SIZE)
+    with SessionLocal() as db:
+        q = filter_records(db, dataset_id)
+        timings = {
+            "count": explain(db, select(func.count()).select_from(q.subquery())),
+            "page 1": explain(db, keyset_query(q, col, SalesRecord.id, False, None, PAGE_SIZE, 0).statement),
+            "offset": explain(db, keyset_query(q, col, SalesRecord.id, False, None, PAGE_SIZE, deep).statement),
+        }
+        start = time.perf_counter()
+        compute_aggregates(db, dataset_id)
+        timings["aggregates"] = (0.0, (time.perf_counter() - start) * 1000)
+    return timings
+
+
+def timed_delete(user_id: int, frame, partitioned: bool) -> float:
+    """Remove one loaded dataset by dropping its partition, or by DELETE from a plain copy of the table."""
+    with SessionLocal() as db:
+        dataset = new_dataset(db, user_id, len(frame), "delete")
+        load_records(db, to_record_frame(dataset.id, frame))
+        db.commit()
+        if not partitioned:
+            db.execute(text(f"CREATE TABLE sales_records_unpartitioned AS TABLE {partition_name(dataset.id)}"))
+            db.execute(text("CREATE INDEX ON sales_records_unpartitioned (dataset_id)"))
+            db.commit()
+        start = time.perf_counter()
+        if partitioned:
+            drop_partition(db, dataset.id)
+        else:
+            db.execute(text("DELETE FROM sales_records_unpartitioned WHERE dataset_id = :id"), {"id": dataset.id})
+        db.commit()
+        elapsed = time.perf_counter() - start
+        if not partitioned:
+            db.execute(text("DROP TABLE sales_records_unpartitioned"))
+            drop_partition(db, dataset.id)
+        db.execute(delete(Dataset).where(Dataset.id == dataset.id))
+        db.commit()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--datasets", type=int, default=5_000)
+    parser.add_argument("--rows-per-dataset", type=int, default=2_000)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    df, _ = transform(synthetic_frame(args.rows))
+    noise, _ = transform(synthetic_frame(args.rows_per_dataset))
+
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        dataset = new_dataset(db, user.id, len(df), "bench")
+        load_records(db, to_record_frame(dataset.id, df))
+        db.commit()
+        user_id, dataset_id = user.id, dataset.id
+    dataset_ids = [dataset_id]
+
+    print(f"{'datasets':>9} {'total rows':>12}  query       {'plan ms':>9} {'exec ms':>9}")
+    try:
+        batches = [args.datasets * (i + 1) // args.steps for i in range(args.steps)]
+        added = 0
+        for target in [0, *batches]:
+            with SessionLocal() as db:
+                for _ in range(target - added):
+                    # one transaction per dataset: each new partition takes a lock until commit
+                    extra = new_dataset(db, user_id, len(noise), "noise")
+                    load_records(db, to_record_frame(extra.id, noise))
+                    db.commit()
+                    dataset_ids.append(extra.id)
+            added = target
+            with engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql(
+                    f"ANALYZE {partition_name(dataset_id)}"
+                )
+            total = len(df) + added * len(noise)
+            for name, (plan_ms, exec_ms) in measure(dataset_id, len(df)).items():
+                print(f"{added + 1:>9,} {total:>12,}  {name:<10} {plan_ms:>9.2f} {exec_ms:>9.2f}")
+
+        for label, partitioned in [("drop partition", True), ("DELETE", False)]:
+            elapsed = timed_delete(user_id, df, partitioned)
+            print(f"{label:>14}: {len(df):,} rows removed in {elapsed * 1000:9.1f} ms")
+    finally:
+        with SessionLocal() as db:
+            for i in dataset_ids:
+                drop_partition(db, i)
+                db.commit()
+            db.execute(delete(Dataset).where(Dataset.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
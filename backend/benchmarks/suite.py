@@ -0,0 +1,209 @@
+"""End-to-end benchmark of the ETL and the dataset reads, with machine-readable results.
+
+    python -m benchmarks.suite --rows 10000 100000 1000000 --output results.json
+    python -m benchmarks.suite --rows 100000 --compare results.json
+
+For each size, generates a deterministic sales file (benchmarks.synthetic.
+generate_sales) and times parse_csv, transform, process_dataset,
+process_dataset_file, GET /api/datasets/{id} over several pages and sorts,
+build_aggregates, compute_aggregates and export_csv against the configured
+Postgres. Query stages report the best of --repeat runs with the response
+cache off. Results go to --output as JSON, one entry per (stage, rows,
+params); --compare prints each stage's time against an earlier file.
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pandas as pd
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, text
+
+from app.config import get_settings
+from app.database import Base, SessionLocal, engine
+from app.dependencies import get_current_user
+from app.main import app
+from app.models import Dataset, User
+from app.services.aggregates import build_aggregates, compute_aggregates
+from app.services.auth import CurrentUser
+from app.services.cache import get_cache
+from app.services.etl import parse_csv, process_dataset, process_dataset_file, transform
+from app.services.export import export_csv
+from app.services.partitions import drop_partition
+from benchmarks.synthetic import write_sales_csv
+
+SORTS = ("order_number", "order_date", "sales", "customer_name")
+PAGE_SIZE = 20
+
+
+class Run:
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.results: list[dict] = []
+
+    def record(self, stage: str, seconds: float, **params) -> None:
+        self.results.append({
+            "stage": stage,
+            "rows": self.rows,
+            "params": params,
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(self.rows / seconds) if seconds else None,
+        })
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{self.rows:>10,}  {stage:<22} {label:<36} {seconds * 1000:12.1f} ms")
+
+
+def timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def best_of(repeat: int, fn, *args, **kwargs) -> float:
+    return min(timed(fn, *args, **kwargs) for _ in range(repeat))
+
+
+def new_dataset(user_id: int, label: str) -> int:
+    with SessionLocal() as db:
+        dataset = Dataset(user_id=user_id, filename=f"{label}.csv", row_count=0, status="processing")
+        db.add(dataset)
+        db.commit()
+        return dataset.id
+
+
+def run_size(rows: int, user_id: int, repeat: int, tmp: Path) -> tuple[list[dict], list[int]]:
+    run = Run(rows)
+    dataset_ids: list[int] = []
+    path = write_sales_csv(tmp / f"sales-{rows}.csv", rows)
+
+    with path.open("rb") as f:
+        start = time.perf_counter()
+        df = parse_csv(UploadFile(file=f, filename=path.name))
+        run.record("parse_csv", time.perf_counter() - start)
+    run.record("transform", timed(transform, df.copy()))
+
+    dataset_id = new_dataset(user_id, "in-memory")
+    dataset_ids.append(dataset_id)
+    run.record("process_dataset", timed(process_dataset, dataset_id, df))
+    del df
+
+    streamed_id = new_dataset(user_id, "streamed")
+    dataset_ids.append(streamed_id)
+    # process_dataset_file deletes the file it is given
+    spooled = Path(shutil.copy(path, tmp / f"spooled-{rows}.csv"))
+    run.record("process_dataset_file", timed(process_dataset_file, streamed_id, spooled))
+    path.unlink()
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("ANALYZE sales_records")
+
+    last_page = max(1, -(-rows // PAGE_SIZE))
+    with TestClient(app) as client:
+        for sort_by in SORTS:
+            for page in sorted({1, last_page // 2 or 1, last_page}):
+                params = {"page": page, "page_size": PAGE_SIZE, "sort_by": sort_by}
+                run.record("get_dataset", best_of(repeat, client.get, f"/api/datasets/{dataset_id}", params=params),
+                           sort_by=sort_by, page=page)
+
+    with SessionLocal() as db:
+        run.record("build_aggregates", best_of(repeat, build_aggregates, db, dataset_id))
+        run.record("compute_aggregates", best_of(repeat, compute_aggregates, db, dataset_id))
+
+        def export() -> None:
+            for _ in export_csv(db, dataset_id):
+                pass
+
+        run.record("export_csv", best_of(repeat, export))
+    return run.results, dataset_ids
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    with engine.connect() as conn:
+        server = conn.execute(text("SHOW server_version")).scalar()
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "postgres": server,
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: list[dict], baseline_path: Path) -> None:
+    def key(entry: dict) -> tuple:
+        return entry["stage"], entry["rows"], json.dumps(entry["params"], sort_keys=True)
+
+    baseline = {key(e): e["seconds"] for e in json.loads(baseline_path.read_text())["results"]}
+    print(f"\n{'rows':>10}  {'stage':<22} {'params':<36} {'before ms':>12} {'after ms':>12} {'change':>8}")
+    for entry in results:
+        before = baseline.get(key(entry))
+        if before is None:
+            continue
+        label = " ".join(f"{k}={v}" for k, v in entry["params"].items())
+        change = (entry["seconds"] - before) / before * 100 if before else 0.0
+        print(
+            f"{entry['rows']:>10,}  {entry['stage']:<22} {label:<36}"
+            f" {before * 1000:12.1f} {entry['seconds'] * 1000:12.1f} {change:+7.1f}%"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    # measure the database, not the response cache
+    get_settings().CACHE_BACKEND = "none"
+    get_cache.cache_clear()
+    Base.metadata.create_all(bind=engine)
+
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        current_user = CurrentUser(id=user.id, email=user.email)
+    app.dependency_overrides[get_current_user] = lambda: current_user
+
+    results: list[dict] = []
+    dataset_ids: list[int] = []
+    print(f"{'rows':>10}  {'stage':<22} {'params':<36} {'time':>15}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in args.rows:
+                size_results, ids = run_size(rows, current_user.id, args.repeat, Path(tmp))
+                results += size_results
+                dataset_ids += ids
+        args.output.write_text(json.dumps({"environment": environment(), "results": results}, indent=2))
+        print(f"\nwrote {args.output}")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        app.dependency_overrides.clear()
+        with SessionLocal() as db:
+            for dataset_id in dataset_ids:
+                drop_partition(db, dataset_id)
+                db.commit()
+            db.execute(delete(Dataset).where(Dataset.user_id == current_user.id))
+            db.execute(delete(User).where(User.id == current_user.id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_CSV = Path(__file__).resolve().parent.parent.parent / "sales_data_sample.csv"
+
+CUSTOMER_COLUMNS = [
+    "CUSTOMERNAME", "PHONE", "ADDRESSLINE1", "ADDRESSLINE2", "CITY", "STATE",
+    "POSTALCODE", "COUNTRY", "TERRITORY", "CONTACTLASTNAME", "CONTACTFIRSTNAME",
+]
+# taken together from one sample line of the same product, so price, quantity and deal size stay consistent
+LINE_COLUMNS = ["QUANTITYORDERED", "PRICEEACH", "SALES", "PRODUCTLINE", "MSRP", "DEALSIZE"]
+NULLABLE_COLUMNS = ["QUANTITYORDERED", "PRICEEACH", "SALES", "MONTH_ID", "YEAR_ID"]
+
+
+@lru_cache
+def _sample() -> pd.DataFrame:
+    return pd.read_csv(SAMPLE_CSV, encoding="latin-1")
+
+
+def synthetic_frame(rows: int) -> pd.DataFrame:
+    """Tile the Kaggle sample up to `rows`, shifting ORDERNUMBER per copy so keys stay unique."""
+    sample = _sample()
+    copies = -(-rows // len(sample))
+    span = int(sample["ORDERNUMBER"].max()) + 1
+    frames = []
+    for i in range(copies):
+        chunk = sample.copy()
+        chunk["ORDERNUMBER"] = chunk["ORDERNUMBER"] + i * span
+        frames.append(chunk)
+    return pd.concat(frames, ignore_index=True).head(rows)
+
+
+def write_synthetic_csv(path: Path, rows: int) -> Path:
+    synthetic_frame(rows).to_csv(path, index=False, encoding="latin-1")
+    return path
+
+
+def generate_sales(
+    rows: int, seed: int = 0, duplicate_rate: float = 0.01, null_rate: float = 0.001
+) -> pd.DataFrame:
+    """A sales file of `rows` rows drawn from the Kaggle sample's distributions; same seed, same file.
+
+    Orders have the sample's line counts, statuses and customers (weighted by
+    how often each orders), with distinct products per order and dates
+    spread over the sample's range in order-number order. The customer base
+    grows with `rows`, as numbered copies of the sample's customers. Each
+    line copies quantity, price, sales and deal size from a sample line of
+    its product. `duplicate_rate` of the rows repeat an earlier
+    ORDERNUMBER + PRODUCTCODE with another quantity, and `null_rate` of each
+    numeric column is blank.
+    """
+    rng = np.random.default_rng(seed)
+    sample = _sample()
+    unique_rows = rows - int(rows * duplicate_rate)
+    scale = max(1, round(rows / len(sample)))
+
+    # orders, sized like the sample's
+    order_sizes = sample.groupby("ORDERNUMBER").size().to_numpy()
+    sizes = rng.choice(order_sizes, size=unique_rows // order_sizes.min() + 1)
+    sizes = sizes[: np.searchsorted(np.cumsum(sizes), unique_rows) + 1]
+    n_orders = len(sizes)
+    order = np.repeat(np.arange(n_orders), sizes)[:unique_rows]
+    line = np.arange(unique_rows) - np.repeat(np.cumsum(sizes) - sizes, sizes)[:unique_rows]
+
+    first_lines = sample.drop_duplicates("ORDERNUMBER")
+    status = rng.choice(first_lines["STATUS"].to_numpy(), size=n_orders)
+    dates = pd.to_datetime(sample["ORDERDATE"], format="%m/%d/%Y %H:%M")
+    days = np.sort(rng.integers(0, (dates.max() - dates.min()).days + 1, size=n_orders))
+    order_dates = dates.min() + pd.to_timedelta(days, unit="D")
+
+    customers = sample.drop_duplicates("CUSTOMERNAME")[CUSTOMER_COLUMNS].reset_index(drop=True)
+    weights = first_lines["CUSTOMERNAME"].value_counts().reindex(customers["CUSTOMERNAME"]).to_numpy()
+    customer = rng.choice(len(customers), size=n_orders, p=weights / weights.sum())
+    customer_copy = rng.integers(0, scale, size=n_orders)
+
+    # products: consecutive codes from a random start are distinct within an order
+    by_product = sample.sort_values("PRODUCTCODE", kind="stable").reset_index(drop=True)
+    codes, starts, counts = np.unique(by_product["PRODUCTCODE"].to_numpy(), return_index=True, return_counts=True)
+    product = (rng.integers(0, len(codes), size=n_orders)[order] + line) % len(codes)
+    source = starts[product] + (rng.random(unique_rows) * counts[product]).astype(np.int64)
+
+    df = by_product.loc[source, LINE_COLUMNS].reset_index(drop=True)
+    df["ORDERNUMBER"] = 10100 + order
+    df["ORDERLINENUMBER"] = line + 1
+    df["PRODUCTCODE"] = codes[product]
+    df["STATUS"] = status[order]
+    line_dates = order_dates[order]
+    df["ORDERDATE"] = (
+        pd.Series(line_dates.month).astype(str) + "/" + pd.Series(line_dates.day).astype(str)
+        + "/" + pd.Series(line_dates.year).astype(str) + " 0:00"
+    )
+    df["QTR_ID"] = line_dates.quarter
+    df["MONTH_ID"] = line_dates.month
+    df["YEAR_ID"] = line_dates.year
+    buyers = customers.loc[customer[order]].reset_index(drop=True)
+    copy = pd.Series(customer_copy[order])
+    buyers["CUSTOMERNAME"] = buyers["CUSTOMERNAME"].where(copy == 0, buyers["CUSTOMERNAME"] + " " + copy.astype(str))
+    df = pd.concat([df, buyers], axis=1)
+
+    # repeats of earlier lines go last, so keep-first keeps the original
+    repeats = df.loc[rng.integers(0, unique_rows, size=rows - unique_rows)].copy()
+    repeats["QUANTITYORDERED"] = rng.integers(1, 100, size=len(repeats))
+    df = pd.concat([df, repeats], ignore_index=True)
+
+    for col in NULLABLE_COLUMNS:
+        blank = rng.random(rows) < null_rate
+        if blank.any():
+            df[col] = df[col].mask(blank)
+    return df[list(sample.columns)]
+
+
+def write_sales_csv(path: Path, rows: int, seed: int = 0, **kwargs) -> Path:
+    generate_sales(rows, seed, **kwargs).to_csv(path, index=False, encoding="latin-1")
+    return path
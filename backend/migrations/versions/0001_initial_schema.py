@@ -0,0 +1,76 @@
+"""initial schema
+
+The tables as Base.metadata.create_all() built them before migrations
+existed. Databases created that way should be marked with
+`alembic stamp 0001` and then upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "datasets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("rows_dropped", sa.Integer(), nullable=False),
+        sa.Column("date_min", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("date_max", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("total_sales", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_datasets_user_id", "datasets", ["user_id"])
+
+    op.create_table(
+        "sales_records",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id"), nullable=False),
+        sa.Column("order_number", sa.Integer(), nullable=False),
+        sa.Column("quantity_ordered", sa.Integer(), nullable=False),
+        sa.Column("price_each", sa.Float(), nullable=False),
+        sa.Column("sales", sa.Float(), nullable=False),
+        sa.Column("order_date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("month_id", sa.Integer(), nullable=False),
+        sa.Column("year_id", sa.Integer(), nullable=False),
+        sa.Column("product_line", sa.String(100), nullable=False),
+        sa.Column("product_code", sa.String(50), nullable=False),
+        sa.Column("customer_name", sa.String(255), nullable=False),
+        sa.Column("country", sa.String(100), nullable=False),
+        sa.Column("deal_size", sa.String(20), nullable=False),
+        sa.Column("total_sales", sa.Float(), nullable=False),
+        sa.Column("order_quarter", sa.String(2), nullable=False),
+        sa.UniqueConstraint(
+            "dataset_id", "order_number", "product_code", name="uq_dataset_order_product"
+        ),
+    )
+    op.create_index("ix_sales_records_dataset_id", "sales_records", ["dataset_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("sales_records")
+    op.drop_table("datasets")
+    op.drop_table("users")
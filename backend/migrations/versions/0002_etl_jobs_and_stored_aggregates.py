@@ -0,0 +1,46 @@
+"""etl jobs and stored aggregates
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "datasets",
+        sa.Column(
+            "aggregates",
+            sa.JSON().with_variant(postgresql.JSONB(), "postgresql"),
+            nullable=True,
+        ),
+    )
+
+    op.create_table(
+        "etl_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id"), nullable=False),
+        sa.Column("path", sa.String(1024), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_etl_jobs_dataset_id", "etl_jobs", ["dataset_id"])
+    op.create_index("ix_etl_jobs_status", "etl_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_table("etl_jobs")
+    op.drop_column("datasets", "aggregates")
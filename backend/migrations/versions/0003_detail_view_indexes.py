@@ -0,0 +1,43 @@
+"""detail view indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+SORT_INDEX_COLUMNS = (
+    "order_date", "sales", "total_sales",
+    "customer_name", "product_line", "status", "deal_size",
+)
+
+
+def upgrade() -> None:
+    for col in SORT_INDEX_COLUMNS:
+        op.create_index(f"ix_sales_records_dataset_{col}", "sales_records", ["dataset_id", col, "id"])
+    op.create_index(
+        "ix_sales_records_dataset_status_date", "sales_records", ["dataset_id", "status", "order_date"]
+    )
+    op.create_index(
+        "ix_sales_records_dataset_product_line_date",
+        "sales_records",
+        ["dataset_id", "product_line", "order_date"],
+    )
+    op.create_index(
+        "ix_sales_records_order_date_brin", "sales_records", ["order_date"], postgresql_using="brin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sales_records_order_date_brin", table_name="sales_records")
+    op.drop_index("ix_sales_records_dataset_product_line_date", table_name="sales_records")
+    op.drop_index("ix_sales_records_dataset_status_date", table_name="sales_records")
+    for col in reversed(SORT_INDEX_COLUMNS):
+        op.drop_index(f"ix_sales_records_dataset_{col}", table_name="sales_records")
@@ -0,0 +1,25 @@
+"""dataset version
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "datasets", sa.Column("version", sa.Integer(), server_default="1", nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("datasets", "version")
@@ -0,0 +1,110 @@
+"""dimension tables
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: str | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# column -> (old VARCHAR length, code type)
+DIMENSIONS = {
+    "status": (50, sa.SmallInteger()),
+    "product_line": (100, sa.SmallInteger()),
+    "product_code": (50, sa.Integer()),
+    "customer_name": (255, sa.Integer()),
+    "country": (100, sa.SmallInteger()),
+    "deal_size": (20, sa.SmallInteger()),
+}
+SORT_INDEX_COLUMNS = ("customer_name", "product_line", "status", "deal_size")
+
+
+def _drop_text_indexes() -> None:
+    op.drop_constraint("uq_dataset_order_product", "sales_records", type_="unique")
+    op.drop_index("ix_sales_records_dataset_product_line_date", table_name="sales_records")
+    op.drop_index("ix_sales_records_dataset_status_date", table_name="sales_records")
+    for col in SORT_INDEX_COLUMNS:
+        op.drop_index(f"ix_sales_records_dataset_{col}", table_name="sales_records")
+
+
+def _create_indexes(suffix: str) -> None:
+    for col in SORT_INDEX_COLUMNS:
+        op.create_index(
+            f"ix_sales_records_dataset_{col}{suffix}", "sales_records", ["dataset_id", f"{col}{suffix}", "id"]
+        )
+    op.create_index(
+        "ix_sales_records_dataset_status_date", "sales_records", ["dataset_id", f"status{suffix}", "order_date"]
+    )
+    op.create_index(
+        "ix_sales_records_dataset_product_line_date",
+        "sales_records",
+        ["dataset_id", f"product_line{suffix}", "order_date"],
+    )
+    op.create_unique_constraint(
+        "uq_dataset_order_product", "sales_records", ["dataset_id", "order_number", f"product_code{suffix}"]
+    )
+
+
+def upgrade() -> None:
+    for col, (_, code_type) in DIMENSIONS.items():
+        op.create_table(
+            f"dim_{col}",
+            sa.Column(
+                "dataset_id", sa.Integer(), sa.ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("code", sa.Integer(), primary_key=True),
+            sa.Column("value", sa.String(255), nullable=False),
+            sa.UniqueConstraint("dataset_id", "value", name=f"uq_dim_{col}_value"),
+        )
+        # codes follow the database's ordering of the values, per dataset
+        op.execute(
+            f"INSERT INTO dim_{col} (dataset_id, code, value) "
+            f"SELECT dataset_id, row_number() OVER (PARTITION BY dataset_id ORDER BY value) - 1, value "
+            f"FROM (SELECT DISTINCT dataset_id, {col} AS value FROM sales_records) AS v"
+        )
+        op.add_column("sales_records", sa.Column(f"{col}_id", code_type, nullable=True))
+
+    # one rewrite of every row rather than one per column
+    op.execute(
+        "UPDATE sales_records AS r SET "
+        + ", ".join(f"{col}_id = d_{col}.code" for col in DIMENSIONS)
+        + " FROM " + ", ".join(f"dim_{col} AS d_{col}" for col in DIMENSIONS)
+        + " WHERE "
+        + " AND ".join(f"d_{col}.dataset_id = r.dataset_id AND d_{col}.value = r.{col}" for col in DIMENSIONS)
+    )
+
+    _drop_text_indexes()
+    for col in DIMENSIONS:
+        op.alter_column("sales_records", f"{col}_id", nullable=False)
+        op.drop_column("sales_records", col)
+    _create_indexes("_id")
+
+
+def downgrade() -> None:
+    for col, (length, _) in DIMENSIONS.items():
+        op.add_column("sales_records", sa.Column(col, sa.String(length), nullable=True))
+    op.execute(
+        "UPDATE sales_records AS r SET "
+        + ", ".join(f"{col} = d_{col}.value" for col in DIMENSIONS)
+        + " FROM " + ", ".join(f"dim_{col} AS d_{col}" for col in DIMENSIONS)
+        + " WHERE "
+        + " AND ".join(f"d_{col}.dataset_id = r.dataset_id AND d_{col}.code = r.{col}_id" for col in DIMENSIONS)
+    )
+
+    op.drop_constraint("uq_dataset_order_product", "sales_records", type_="unique")
+    op.drop_index("ix_sales_records_dataset_product_line_date", table_name="sales_records")
+    op.drop_index("ix_sales_records_dataset_status_date", table_name="sales_records")
+    for col in SORT_INDEX_COLUMNS:
+        op.drop_index(f"ix_sales_records_dataset_{col}_id", table_name="sales_records")
+    for col in DIMENSIONS:
+        op.alter_column("sales_records", col, nullable=False)
+        op.drop_column("sales_records", f"{col}_id")
+        op.drop_table(f"dim_{col}")
+    _create_indexes("")
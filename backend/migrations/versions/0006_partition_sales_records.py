@@ -0,0 +1,91 @@
+"""partition sales_records by dataset
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: str | None = "0005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+COLUMNS = (
+    ("order_number", sa.Integer()),
+    ("quantity_ordered", sa.Integer()),
+    ("price_each", sa.Float()),
+    ("sales", sa.Float()),
+    ("order_date", sa.DateTime(timezone=True)),
+    ("month_id", sa.Integer()),
+    ("year_id", sa.Integer()),
+    ("total_sales", sa.Float()),
+    ("order_quarter", sa.String(2)),
+    ("status_id", sa.SmallInteger()),
+    ("product_line_id", sa.SmallInteger()),
+    ("product_code_id", sa.Integer()),
+    ("customer_name_id", sa.Integer()),
+    ("country_id", sa.SmallInteger()),
+    ("deal_size_id", sa.SmallInteger()),
+)
+SORT_INDEX_COLUMNS = (
+    "order_date", "sales", "total_sales",
+    "customer_name_id", "product_line_id", "status_id", "deal_size_id",
+)
+COLUMN_LIST = ", ".join(["id", "dataset_id", *(name for name, _ in COLUMNS)])
+FK_NAME = "sales_records_dataset_id_fkey"
+
+
+def _create_table(partitioned: bool) -> None:
+    primary_key = ("id", "dataset_id") if partitioned else ("id",)
+    op.create_table(
+        "sales_records",
+        # keeps numbering from the sequence the original serial column created
+        sa.Column("id", sa.Integer(), server_default=sa.text("nextval('sales_records_id_seq')"), nullable=False),
+        sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id", name=FK_NAME), nullable=False),
+        *(sa.Column(name, type_, nullable=False) for name, type_ in COLUMNS),
+        sa.PrimaryKeyConstraint(*primary_key, name="sales_records_pkey"),
+        **({"postgresql_partition_by": "LIST (dataset_id)"} if partitioned else {}),
+    )
+
+
+def _create_indexes() -> None:
+    op.create_unique_constraint(
+        "uq_dataset_order_product", "sales_records", ["dataset_id", "order_number", "product_code_id"]
+    )
+    for col in SORT_INDEX_COLUMNS:
+        op.create_index(f"ix_sales_records_dataset_{col}", "sales_records", ["dataset_id", col, "id"])
+    op.create_index("ix_sales_records_dataset_status_date", "sales_records", ["dataset_id", "status_id", "order_date"])
+    op.create_index(
+        "ix_sales_records_dataset_product_line_date", "sales_records", ["dataset_id", "product_line_id", "order_date"]
+    )
+    op.create_index("ix_sales_records_order_date_brin", "sales_records", ["order_date"], postgresql_using="brin")
+
+
+def _replace_table(partitioned: bool) -> None:
+    """Copy sales_records into a new table of the other layout; indexes are built after the copy."""
+    op.rename_table("sales_records", "sales_records_old")
+    op.execute("ALTER INDEX sales_records_pkey RENAME TO sales_records_old_pkey")
+    # constraint names stay with the renamed table; this one is taken by the new table's
+    op.drop_constraint(FK_NAME, "sales_records_old", type_="foreignkey")
+    _create_table(partitioned)
+    if partitioned:
+        for (dataset_id,) in op.get_bind().execute(sa.text("SELECT id FROM datasets ORDER BY id")):
+            op.execute(f"CREATE TABLE sales_records_{dataset_id} PARTITION OF sales_records FOR VALUES IN ({dataset_id})")
+    op.execute(f"INSERT INTO sales_records ({COLUMN_LIST}) SELECT {COLUMN_LIST} FROM sales_records_old")
+    op.execute("ALTER SEQUENCE sales_records_id_seq OWNED BY sales_records.id")
+    op.drop_table("sales_records_old")
+    _create_indexes()
+
+
+def upgrade() -> None:
+    # every row of a partition has the same dataset_id, so ix_sales_records_dataset_id is not recreated
+    _replace_table(partitioned=True)
+
+
+def downgrade() -> None:
+    _replace_table(partitioned=False)
+    op.create_index("ix_sales_records_dataset_id", "sales_records", ["dataset_id"])
@@ -0,0 +1,38 @@
+"""delete sales_records with their dataset
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0007"
+down_revision: str | None = "0006"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+FK_NAME = "sales_records_dataset_id_fkey"
+
+
+def _dataset_foreign_key() -> str:
+    # an earlier 0006 created it while the old table still held FK_NAME, as FK_NAME + "1"
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys("sales_records"):
+        if fk["constrained_columns"] == ["dataset_id"]:
+            return fk["name"]
+    raise RuntimeError("sales_records has no foreign key on dataset_id")
+
+
+def _replace_foreign_key(ondelete: str | None) -> None:
+    op.drop_constraint(_dataset_foreign_key(), "sales_records", type_="foreignkey")
+    op.create_foreign_key(FK_NAME, "sales_records", "datasets", ["dataset_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _replace_foreign_key("CASCADE")
+
+
+def downgrade() -> None:
+    _replace_foreign_key(None)
@@ -0,0 +1,23 @@
+"""append jobs
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0010"
+down_revision: str | None = "0009"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("etl_jobs", sa.Column("kind", sa.String(20), nullable=False, server_default="load"))
+
+
+def downgrade() -> None:
+    op.drop_column("etl_jobs", "kind")
@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session, sessionmaker
 from app.config import get_settings
 from app.database import Base, get_db
 from app.main import app
+from app.services.auth import clear_auth_caches
+from app.services.cache import get_cache
 
 engine = create_engine(get_settings().database_url)
 TestSession = sessionmaker(bind=engine)
@@ -15,6 +17,9 @@ TestSession = sessionmaker(bind=engine)
 
 @pytest.fixture(autouse=True)
 def setup_db():
+    # ids and versions restart with every fresh schema
+    get_cache.cache_clear()
+    clear_auth_caches()
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
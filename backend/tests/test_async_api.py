@@ -0,0 +1,76 @@
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.config import get_settings
+from app.database import get_async_db
+from app.models import Dataset, User
+from app.routers import async_api, auth, datasets
+from app.services.auth import hash_password
+
+
+@pytest.fixture()
+def async_client(setup_db: None):
+    # NullPool: TestClient runs the app on its own event loop, and asyncpg
+    # connections must not outlive the loop that opened them
+    engine = create_async_engine(get_settings().async_database_url, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def _override():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_api.router)
+    app.include_router(auth.router)
+    app.include_router(datasets.router)
+    app.dependency_overrides[get_async_db] = _override
+    with TestClient(app) as c:
+        yield c
+
+
+def _seed_dataset(db: Session) -> Dataset:
+    # committed: the async routes read through their own connections
+    user = User(email="user@test.com", hashed_password=hash_password("secret123"))
+    db.add(user)
+    db.flush()
+    dataset = Dataset(user_id=user.id, filename="test.csv", row_count=3, status="ready")
+    db.add(dataset)
+    db.commit()
+    return dataset
+
+
+def test_register_login_me(async_client: TestClient):
+    credentials = {"email": "user@test.com", "password": "secret123"}
+    r = async_client.post("/api/register", json=credentials)
+    assert r.status_code == status.HTTP_201_CREATED
+    assert async_client.post("/api/register", json=credentials).status_code == status.HTTP_409_CONFLICT
+
+    async_client.cookies.clear()
+    r = async_client.post("/api/login", json={**credentials, "password": "wrong"})
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+    r = async_client.post("/api/login", json=credentials)
+    assert r.status_code == status.HTTP_200_OK
+
+    r = async_client.get("/api/me")
+    assert r.json() == {"email": "user@test.com"}
+
+
+def test_status_and_list(async_client: TestClient, db: Session):
+    dataset = _seed_dataset(db)
+    async_client.post("/api/login", json={"email": "user@test.com", "password": "secret123"})
+
+    r = async_client.get(f"/api/datasets/{dataset.id}/status")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["status"] == "ready"
+    assert async_client.get("/api/datasets/9999/status").status_code == status.HTTP_404_NOT_FOUND
+
+    r = async_client.get("/api/datasets")
+    assert [d["id"] for d in r.json()["datasets"]] == [dataset.id]
+
+
+def test_requires_auth(async_client: TestClient):
+    assert async_client.get("/api/datasets").status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,5 +1,12 @@
+import threading
+
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import User
 
 
 def register(client: TestClient, email: str = "user@test.com", password: str = "secret123"):
@@ -44,3 +51,78 @@ def test_login_wrong_password(client: TestClient):
 def test_login_nonexistent_user(client: TestClient):
     r = login(client, email="nobody@test.com")
     assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_me(client: TestClient):
+    register(client)
+    r = client.get("/api/me")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json() == {"email": "user@test.com"}
+
+
+def test_authenticated_request_skips_db_once_cached(client: TestClient):
+    register(client)
+    assert client.get("/api/me").status_code == status.HTTP_200_OK
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/api/me").status_code == status.HTTP_200_OK
+        assert client.get("/api/datasets").status_code == status.HTTP_200_OK
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert not any("FROM users" in s for s in statements)
+
+
+def test_deleted_user_is_rejected_despite_cache(client: TestClient, db: Session):
+    register(client)
+    assert client.get("/api/me").status_code == status.HTTP_200_OK
+
+    db.delete(db.query(User).filter(User.email == "user@test.com").one())
+    db.commit()
+    assert client.get("/api/me").status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_updated_user_is_reloaded(client: TestClient, db: Session):
+    register(client)
+    client.get("/api/me")
+
+    db.query(User).filter(User.email == "user@test.com").one().email = "renamed@test.com"
+    db.commit()
+    assert client.get("/api/me").json() == {"email": "renamed@test.com"}
+
+
+def test_login_rejected_with_503_when_hash_queue_is_full(client: TestClient, monkeypatch):
+    from app.services import auth
+
+    register(client)
+    pool, _ = auth._hash_pool()
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(auth, "_hash_pool", lambda: (pool, slots))
+
+    r = login(client)
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert r.headers["retry-after"] == "1"
+
+    slots.release()
+    assert login(client).status_code == status.HTTP_200_OK
+
+
+def test_login_recovers_when_a_hash_worker_dies(client: TestClient):
+    from app.services import auth
+
+    register(client)
+    pool, _ = auth._hash_pool()
+    for process in list(pool._processes.values()):
+        process.kill()
+        process.join()
+
+    r = login(client)
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert auth._hash_pool()[0] is not pool
+    assert login(client).status_code == status.HTTP_200_OK
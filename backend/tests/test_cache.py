@@ -0,0 +1,166 @@
+import socketserver
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.services import cache as cache_module
+from app.services.cache import MemoryCache, RedisCache, TTLCache, cache_key, get_cache
+from tests.test_datasets import _login, _register, _seed_dataset
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for RedisCache: GET, SET [PX], AUTH, SELECT."""
+
+    def handle(self):
+        store = self.server.store
+        while line := self.rfile.readline():
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+            command = args[0].upper()
+            if command == b"GET":
+                value, expires = store.get(args[1], (None, None))
+                if value is None or (expires and expires <= time.monotonic()):
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif command == b"SET":
+                expires = None
+                if len(args) == 5 and args[3].upper() == b"PX":
+                    expires = time.monotonic() + int(args[4]) / 1000
+                store[args[1]] = (args[2], expires)
+                self.wfile.write(b"+OK\r\n")
+            elif command in (b"AUTH", b"SELECT"):
+                self.wfile.write(b"+OK\r\n")
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture()
+def resp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RespHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_key_ignores_param_order():
+    a = cache_key("detail", 1, 2, {"page": 1, "sort_by": "sales"})
+    b = cache_key("detail", 1, 2, {"sort_by": "sales", "page": 1})
+    assert a == b
+    assert a != cache_key("detail", 1, 3, {"page": 1, "sort_by": "sales"})
+
+
+def test_memory_cache_evicts_least_recently_used_over_budget():
+    cache = MemoryCache(ttl=60, max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    stats = cache.stats()
+    assert stats["bytes"] == 8
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_memory_cache_skips_values_over_budget():
+    cache = MemoryCache(ttl=60, max_bytes=4)
+    cache.set("a", b"too large")
+    assert cache.get("a") is None
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    cache = MemoryCache(ttl=5, max_bytes=100)
+    cache.set("a", b"value")
+    assert cache.get("a") == b"value"
+
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 6)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_ttl_cache_bounds_entries_and_lifetime(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 5)
+    assert cache.get("a") == 1
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_disabled_with_zero_ttl():
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_redis_cache_round_trip(resp_server):
+    host, port = resp_server.server_address
+    cache = RedisCache(ttl=60, url=f"redis://:secret@{host}:{port}/2")
+    cache.set("a", b"\x00binary\r\nvalue")
+
+    assert cache.get("a") == b"\x00binary\r\nvalue"
+    assert cache.get("missing") is None
+    assert b"task:a" in resp_server.store
+    assert cache.stats() == {"backend": "redis", "hits": 1, "misses": 1, "errors": 0}
+
+
+def test_redis_cache_unreachable_is_a_miss():
+    cache = RedisCache(ttl=60, url="redis://127.0.0.1:1/0")
+    cache.set("a", b"value")
+    assert cache.get("a") is None
+    assert cache.stats()["errors"] == 2
+
+
+def test_dataset_detail_is_cached_until_dataset_changes(client: TestClient, db: Session, monkeypatch):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    url = f"/api/datasets/{dataset.id}"
+
+    first = client.get(url, params={"sort_by": "sales"})
+    second = client.get(url, params={"sort_by": "sales"})
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert get_cache().stats()["hits"] == 1
+
+    # any ORM update bumps the version, so the next read misses
+    dataset.status = "failed"
+    db.commit()
+    third = client.get(url, params={"sort_by": "sales"})
+    assert third.json()["status"] == "failed"
+
+    monkeypatch.setattr(get_settings(), "METRICS_ENABLED", True)
+    assert client.get("/metrics").json()["cache"]["hits"] == 1
+
+
+def test_dataset_detail_cache_is_per_user(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    assert client.get(f"/api/datasets/{dataset.id}").status_code == 200
+
+    client.post("/api/logout")
+    _register(client, email="other@test.com")
+    assert client.get(f"/api/datasets/{dataset.id}").status_code == 404
@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import Session
+
+from app import database
+from app.config import get_settings
+from app.database import MeteredQueuePool
+from app.models import Dataset, User
+
+
+def test_metered_pool_counts_checkouts_and_timeouts():
+    engine = create_engine(
+        get_settings().database_url, poolclass=MeteredQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    try:
+        with engine.connect():
+            stats = engine.pool.stats()
+            assert stats["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        # the timed-out checkout waited the full 100 ms
+        assert stats["wait_ms_le"]["25"] == 1
+        assert stats["wait_ms_le"]["inf"] == 2
+    finally:
+        engine.dispose()
+
+
+def test_route_releases_connection_before_response(client: TestClient, db: Session):
+    client.post("/api/register", json={"email": "user@test.com", "password": "secret123"})
+    user = db.query(User).one()
+    dataset = Dataset(user_id=user.id, filename="test.csv", row_count=0, status="ready")
+    db.add(dataset)
+    db.flush()
+
+    assert client.get(f"/api/datasets/{dataset.id}/status").status_code == 200
+    assert not db.in_transaction()
+
+
+def test_metrics_is_off_by_default(client: TestClient):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_reports_pool(client: TestClient, monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_ENABLED", True)
+    pool = client.get("/metrics").json()["db_pool"]
+    assert set(pool["sync"]) >= {"checked_out", "overflow", "timeouts", "wait_ms_le"}
+
+
+def test_connection_budget_warning(monkeypatch, caplog):
+    monkeypatch.setattr(get_settings(), "WEB_CONCURRENCY", 10_000)
+    with caplog.at_level(logging.WARNING, logger="app.database"):
+        database.check_connection_budget()
+    assert "10000 API processes" in caplog.text
@@ -1,12 +1,23 @@
+import asyncio
+import gzip
 import io
+import json
 from datetime import UTC, datetime
 
 import pandas as pd
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
 
+from app.config import get_settings
 from app.models import Dataset, SalesRecord, User
+from app.services.aggregates import compute_aggregates
+from app.services.compression import INFLATE_CHUNK_BYTES, DecompressRequestMiddleware
+from app.services.dimensions import DimensionCodes, dimension_equals
+from app.services.etl import load_records
+from app.services.records import RECORD_FIELDS, record_values
 from app.services.auth import hash_password
 
 
@@ -74,8 +85,8 @@ def _seed_dataset(db: Session) -> tuple[User, Dataset]:
     db.add(dataset)
     db.flush()
 
-    records = [
-        SalesRecord(
+    records = pd.DataFrame([
+        dict(
             dataset_id=dataset.id,
             order_number=1001,
             quantity_ordered=30,
@@ -93,7 +104,7 @@ def _seed_dataset(db: Session) -> tuple[User, Dataset]:
             total_sales=3000.0,
             order_quarter="Q1",
         ),
-        SalesRecord(
+        dict(
             dataset_id=dataset.id,
             order_number=1002,
             quantity_ordered=20,
@@ -111,7 +122,7 @@ def _seed_dataset(db: Session) -> tuple[User, Dataset]:
             total_sales=2000.0,
             order_quarter="Q1",
         ),
-        SalesRecord(
+        dict(
             dataset_id=dataset.id,
             order_number=1003,
             quantity_ordered=10,
@@ -129,8 +140,8 @@ def _seed_dataset(db: Session) -> tuple[User, Dataset]:
             total_sales=1000.0,
             order_quarter="Q1",
         ),
-    ]
-    db.add_all(records)
+    ])
+    load_records(db, records)
     db.commit()
     db.refresh(user)
     db.refresh(dataset)
@@ -157,6 +168,75 @@ def test_upload_rejects_non_csv(client: TestClient):
     assert r.status_code == status.HTTP_400_BAD_REQUEST
 
 
+
+def test_upload_with_content_encoding(client: TestClient):
+    _register(client)
+    boundary = "upload-boundary"
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="data.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + _csv_bytes([_base_row()]) + f"\r\n--{boundary}--\r\n".encode()
+    r = client.post(
+        "/api/upload",
+        content=gzip.compress(body),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}", "Content-Encoding": "gzip"},
+    )
+    assert r.status_code == status.HTTP_201_CREATED
+
+    r = client.post("/api/upload", content=b"x", headers={"Content-Encoding": "br"})
+    assert r.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    r = client.post(
+        "/api/upload",
+        content=gzip.compress(body)[:-4],
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}", "Content-Encoding": "gzip"},
+    )
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def _compress(data: bytes, coding: str) -> bytes:
+    if coding == "gzip":
+        return gzip.compress(data)
+    import zstandard
+
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def _inflate_body(body: bytes, coding: str) -> list[bytes]:
+    """The body chunks a route behind DecompressRequestMiddleware receives for `body`."""
+    received: list[bytes] = []
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            received.append(message["body"])
+            if not message["more_body"]:
+                return
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "headers": [(b"content-encoding", coding.encode())]}
+    asyncio.run(DecompressRequestMiddleware(app)(scope, receive, None))
+    return received
+
+
+@pytest.mark.parametrize("coding", ["gzip", "zstd"])
+def test_request_body_inflates_in_bounded_pieces(coding):
+    plain = b"\0" * (20 * 1024 * 1024)
+    pieces = _inflate_body(_compress(plain, coding), coding)
+    assert max(map(len, pieces)) <= INFLATE_CHUNK_BYTES
+    assert b"".join(pieces) == plain
+
+
+@pytest.mark.parametrize("coding", ["gzip", "zstd"])
+@pytest.mark.parametrize("mangle", [lambda body: body[:-3], lambda body: body + b"more"], ids=["truncated", "trailing"])
+def test_request_body_must_end_with_its_stream(coding, mangle):
+    with pytest.raises(HTTPException) as exc_info:
+        _inflate_body(mangle(_compress(b"a,b\n" * 1000, coding)), coding)
+    assert exc_info.value.status_code == 400
+
+
 def test_upload_requires_auth(client: TestClient):
     csv = _csv_bytes([_base_row()])
     r = client.post("/api/upload", files={"file": ("data.csv", io.BytesIO(csv), "text/csv")})
@@ -256,6 +336,99 @@ def test_get_dataset_detail_filter_product_line(client: TestClient, db: Session)
     assert all(rec["product_line"] == "Motorcycles" for rec in records)
 
 
+def test_get_dataset_detail_cursor_pagination(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    url = f"/api/datasets/{dataset.id}"
+    params = {"page_size": 2, "sort_by": "total_sales", "sort_dir": "desc"}
+
+    first = client.get(url, params=params).json()
+    assert [r["total_sales"] for r in first["records"]] == [3000.0, 2000.0]
+    assert first["prev_cursor"] is None
+
+    second = client.get(url, params={**params, "cursor": first["next_cursor"], "include_total": False}).json()
+    assert [r["total_sales"] for r in second["records"]] == [1000.0]
+    assert second["next_cursor"] is None
+    assert second["total_records"] is None
+
+    back = client.get(url, params={**params, "cursor": second["prev_cursor"]}).json()
+    assert [r["id"] for r in back["records"]] == [r["id"] for r in first["records"]]
+    assert back["prev_cursor"] is None
+    assert back["next_cursor"] is not None
+
+
+def test_get_dataset_detail_cursor_breaks_ties_by_id(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    url = f"/api/datasets/{dataset.id}"
+    params = {"page_size": 1, "sort_by": "product_line"}
+
+    seen, cursor = [], None
+    while True:
+        body = client.get(url, params={**params, "cursor": cursor} if cursor else params).json()
+        seen += [(r["product_line"], r["id"]) for r in body["records"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(seen)
+    assert len(seen) == 3
+
+
+def test_get_dataset_detail_rejects_bad_cursor(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    url = f"/api/datasets/{dataset.id}"
+    r = client.get(url, params={"cursor": "not-a-cursor"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+    cursor = client.get(url, params={"page_size": 1}).json()["next_cursor"]
+    r = client.get(url, params={"cursor": cursor, "sort_by": "sales"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_dataset_detail_include(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    url = f"/api/datasets/{dataset.id}"
+
+    body = client.get(url, params={"include": "records"}).json()
+    assert len(body["records"]) == 3
+    assert body["aggregates"] is None
+    assert body["total_records"] is None
+    assert body["row_count"] == 3
+
+    body = client.get(url, params={"include": "aggregates,counts"}).json()
+    assert body["records"] is None
+    assert body["aggregates"]["total_orders"] == 3
+    assert body["total_records"] == 3
+
+    r = client.get(url, params={"include": "records,charts"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_dataset_records(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    url = f"/api/datasets/{dataset.id}/records"
+    r = client.get(url, params={"page_size": 2, "status_filter": "Shipped"})
+    assert r.status_code == 200
+    body = r.json()
+    assert "aggregates" not in body
+    assert body["total_records"] == 2
+    assert [rec["status"] for rec in body["records"]] == ["Shipped", "Shipped"]
+    assert body["next_cursor"] is None
+
+
+def test_get_dataset_aggregates(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    r = client.get(f"/api/datasets/{dataset.id}/aggregates")
+    assert r.status_code == 200
+    assert r.json() == client.get(f"/api/datasets/{dataset.id}").json()["aggregates"]
+
+    assert client.get("/api/datasets/9999/aggregates").status_code == status.HTTP_404_NOT_FOUND
+
+
 def test_get_dataset_not_found(client: TestClient):
     _register(client)
     r = client.get("/api/datasets/9999")
@@ -263,6 +436,22 @@ def test_get_dataset_not_found(client: TestClient):
 
 
 
+def test_compute_aggregates_single_statement(db: Session):
+    _, dataset = _seed_dataset(db)
+    agg = compute_aggregates(db, dataset.id)
+    assert agg.total_sales == 6000.0
+    assert agg.total_orders == 3
+    assert agg.avg_order_value == 2000.0
+    assert [(q.year, q.quarter, q.order_count) for q in agg.sales_by_quarter] == [(2003, "Q1", 3)]
+    assert [(c.country, c.total_sales) for c in agg.sales_by_country] == [("USA", 4000.0), ("France", 2000.0)]
+    assert agg.sales_by_customer[0].customer_name == "Land of Toys Inc."
+
+    shipped = compute_aggregates(db, dataset.id, dimension_equals(dataset.id, "status", "Shipped"))
+    assert shipped.total_sales == 5000.0
+    assert shipped.total_orders == 2
+
+
+
 def test_get_dataset_status(client: TestClient, db: Session):
     _, dataset = _seed_dataset(db)
     _login(client)
@@ -271,6 +460,8 @@ def test_get_dataset_status(client: TestClient, db: Session):
     body = r.json()
     assert body["id"] == dataset.id
     assert body["status"] == "ready"
+    # seeded directly, not by the ETL
+    assert body["etl_stats"] is None
 
 
 def test_get_dataset_status_not_found(client: TestClient):
@@ -279,6 +470,88 @@ def test_get_dataset_status_not_found(client: TestClient):
     assert r.status_code == status.HTTP_404_NOT_FOUND
 
 
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_dataset_events_end_when_nothing_is_in_flight(client: TestClient, db: Session):
+    _seed_dataset(db)
+    _login(client)
+    r = client.get("/api/datasets/events")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert _events(r.text) == [("done", {})]
+
+
+def test_dataset_events_report_watched_dataset_that_already_finished(client: TestClient, db: Session):
+    user, dataset = _seed_dataset(db)
+    other = User(email="other@test.com", hashed_password="x")
+    db.add(other)
+    db.flush()
+    foreign = Dataset(user_id=other.id, filename="theirs.csv", row_count=0, status="ready")
+    db.add(foreign)
+    db.commit()
+    _login(client)
+
+    # e.g. a small upload whose ETL finished before the dashboard opened the stream
+    r = client.get("/api/datasets/events", params={"ids": [dataset.id, foreign.id]})
+    events = _events(r.text)
+    assert [(name, data.get("id")) for name, data in events] == [("progress", dataset.id), ("done", None)]
+    assert events[0][1]["status"] == "ready"
+
+
+def test_dataset_events_push_progress(client: TestClient, db: Session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "PROGRESS_STREAM_SECONDS", 0)
+    user, _ = _seed_dataset(db)
+    processing = Dataset(
+        user_id=user.id, filename="big.csv", row_count=0, status="processing",
+        progress={"stage": "load", "rows_total": 1000, "rows_parsed": 400, "rows_loaded": 300},
+    )
+    db.add(processing)
+    db.commit()
+    _login(client)
+
+    events = _events(client.get("/api/datasets/events").text)
+    # only the in-flight dataset; the stream ends at PROGRESS_STREAM_SECONDS without `done`
+    assert [(name, data["id"]) for name, data in events] == [("progress", processing.id)]
+    assert events[0][1]["status"] == "processing"
+    assert events[0][1]["progress"]["rows_loaded"] == 300
+
+
+
+def test_delete_dataset(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    dataset_id = dataset.id
+    _login(client)
+    r = client.delete(f"/api/datasets/{dataset_id}")
+    assert r.status_code == status.HTTP_204_NO_CONTENT
+
+    db.expire_all()
+    assert db.query(Dataset).filter(Dataset.id == dataset_id).count() == 0
+    assert db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset_id).count() == 0
+    assert DimensionCodes.load(db, dataset_id).labels["country"] == []
+    assert client.get(f"/api/datasets/{dataset_id}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_dataset_still_processing(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    dataset.status = "processing"
+    db.commit()
+    _login(client)
+    r = client.delete(f"/api/datasets/{dataset.id}")
+    assert r.status_code == status.HTTP_409_CONFLICT
+
+
+def test_delete_dataset_user_isolation(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _register(client, email="other@test.com")
+    r = client.delete(f"/api/datasets/{dataset.id}")
+    assert r.status_code == status.HTTP_404_NOT_FOUND
+
 
 def test_export_csv(client: TestClient, db: Session):
     _, dataset = _seed_dataset(db)
@@ -294,6 +567,74 @@ def test_export_csv(client: TestClient, db: Session):
     assert "total_sales" in df.columns
 
 
+def test_export_filename_drops_the_whole_upload_suffix(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    dataset.filename = "sales.csv.gz"
+    db.commit()
+    _login(client)
+    r = client.get(f"/api/datasets/{dataset.id}/export")
+    assert r.headers["content-disposition"] == 'attachment; filename="sales.csv"'
+
+
+def test_export_csv_matches_dataframe_output(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    r = client.get(f"/api/datasets/{dataset.id}/export")
+
+    # the layout the old DataFrame.to_csv export produced
+    records = db.query(SalesRecord).order_by(SalesRecord.order_number).all()
+    codes = DimensionCodes.load(db, dataset.id)
+    expected = pd.DataFrame(
+        [record_values(rec, codes) for rec in records], columns=RECORD_FIELDS
+    ).to_csv(index=False)
+    assert r.content.decode() == expected
+
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export_columnar_matches_csv(client: TestClient, db: Session, format: str):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    r = client.get(f"/api/datasets/{dataset.id}/export", params={"format": format})
+    assert r.status_code == 200
+    assert r.headers["content-disposition"].endswith(f'test.{format}"')
+
+    content = io.BytesIO(r.content)
+    df = pd.read_parquet(content) if format == "parquet" else pd.read_feather(content)
+    expected = pd.read_csv(io.BytesIO(client.get(f"/api/datasets/{dataset.id}/export").content))
+    assert list(df.columns) == list(expected.columns)
+    assert df["customer_name"].astype(str).tolist() == expected["customer_name"].tolist()
+    assert df["total_sales"].tolist() == expected["total_sales"].tolist()
+
+
+def test_export_negotiates_compression(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    plain = client.get(f"/api/datasets/{dataset.id}/export", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    r = client.get(f"/api/datasets/{dataset.id}/export", headers={"Accept-Encoding": "gzip;q=1, zstd;q=0.5"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.content == plain.content
+
+    r = client.get(
+        f"/api/datasets/{dataset.id}/export", params={"format": "parquet"}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert "content-encoding" not in r.headers
+
+
+def test_export_csv_streams_in_batches(db: Session, monkeypatch):
+    from app.services import export
+
+    _, dataset = _seed_dataset(db)
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 1)
+
+    chunks = list(export.export_csv(db, dataset.id))
+    assert len(chunks) == 3
+    assert chunks[0].decode().startswith("order_number,")
+    assert b"".join(chunks).decode().count("\n") == 4
+
+
 def test_export_not_found(client: TestClient):
     _register(client)
     r = client.get("/api/datasets/9999/export")
@@ -1,10 +1,30 @@
 import io
 
+import numpy as np
 import pandas as pd
 import pytest
 from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
 
-from app.services.etl import REQUIRED_COLUMNS, parse_csv, transform
+from app.config import get_settings
+from app.models import Dataset, SalesRecord, User
+from app.services.aggregates import build_aggregates, compute_aggregates
+from app.services.dimensions import DimensionCodes, place_codes
+from app.services.etl import (
+    REQUIRED_COLUMNS,
+    append_dataset_file,
+    parse_csv,
+    process_dataset,
+    process_dataset_file,
+    load_records,
+    parse_order_dates,
+    spool_upload,
+    to_record_frame,
+    transform,
+)
+from app.services.partitions import create_partition, drop_partition, partition_name
+from app.services.records import RECORD_FIELDS, record_values
 
 
 def _make_upload(content: str, filename: str = "test.csv") -> UploadFile:
@@ -118,3 +138,396 @@ def test_transform_full_pipeline():
     assert pd.api.types.is_datetime64_any_dtype(result["ORDERDATE"])
     assert list(result["TOTAL_SALES"]) == [500.0, 500.0, 1500.0]
     assert list(result["ORDER_QUARTER"]) == ["Q1", "Q2", "Q2"]
+
+
+
+def test_parse_order_dates_matches_mixed_parser():
+    dates = pd.Series(
+        ["1/6/2003 0:00", "12/31/2004 23:59", "2/24/2003", "2004-05-07", "May 7, 2004", None, "11/2/2004 0:00"]
+    )
+    expected = pd.to_datetime(dates, format="mixed", dayfirst=False)
+    pd.testing.assert_series_equal(parse_order_dates(dates), expected)
+
+    with pytest.raises(ValueError):
+        parse_order_dates(pd.Series(["1/6/2003 0:00", "not a date"]))
+
+
+def _new_dataset(db: Session) -> Dataset:
+    user = db.query(User).filter(User.email == "etl@test.com").first()
+    if user is None:
+        user = User(email="etl@test.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+    dataset = Dataset(user_id=user.id, filename="data.csv", row_count=0, status="processing")
+    db.add(dataset)
+    db.commit()
+    return dataset
+
+
+def _loaded_rows(db: Session, dataset_id: int) -> list[tuple]:
+    records = (
+        db.query(SalesRecord)
+        .filter(SalesRecord.dataset_id == dataset_id)
+        .order_by(SalesRecord.id)
+        .all()
+    )
+    codes = DimensionCodes.load(db, dataset_id)
+    return [tuple(record_values(r, codes)[field] for field in RECORD_FIELDS) for r in records]
+
+
+def test_process_dataset_bulk_loads_records(db: Session):
+    dataset = _new_dataset(db)
+
+    rows = [
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=10, PRICEEACH=50.0),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=99),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B", CUSTOMERNAME='Quote "Co", Ltd', ORDERDATE="5/20/2004 0:00"),
+    ]
+    process_dataset(dataset.id, pd.DataFrame(rows))
+
+    db.refresh(dataset)
+    assert dataset.status == "ready"
+    assert dataset.row_count == 2
+    assert dataset.rows_dropped == 1
+    assert dataset.total_sales == 500.0 + 30 * 95.70
+
+    records = db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset.id).order_by(SalesRecord.order_number).all()
+    codes = DimensionCodes.load(db, dataset.id)
+    records = [record_values(r, codes) for r in records]
+    assert [r["order_number"] for r in records] == [1001, 1002]
+    assert records[0]["total_sales"] == 500.0
+    assert records[1]["customer_name"] == 'Quote "Co", Ltd'
+    assert records[1]["order_quarter"] == "Q2"
+
+
+def test_dimension_codes_follow_value_order(db: Session):
+    dataset = _new_dataset(db)
+    first, _ = transform(pd.DataFrame([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", COUNTRY="USA"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B", COUNTRY="Austria"),
+    ]))
+    load_records(db, to_record_frame(dataset.id, first))
+    before = dict(
+        db.query(SalesRecord.order_number, SalesRecord.country_id).filter(SalesRecord.dataset_id == dataset.id)
+    )
+    # France sorts between the existing codes and takes one from the gap between them
+    second, _ = transform(pd.DataFrame([_base_row(ORDERNUMBER=1003, PRODUCTCODE="C", COUNTRY="France")]))
+    load_records(db, to_record_frame(dataset.id, second))
+
+    codes = DimensionCodes.load(db, dataset.id)
+    assert codes.labels["country"] == ["Austria", "France", "USA"]
+    assert codes.codes["country"] == sorted(codes.codes["country"])
+    by_order = dict(
+        db.query(SalesRecord.order_number, SalesRecord.country_id).filter(SalesRecord.dataset_id == dataset.id)
+    )
+    assert {order: by_order[order] for order in before} == before
+    assert by_order[1002] < by_order[1003] < by_order[1001]
+
+
+def test_dimension_is_respaced_when_a_gap_runs_out(db: Session):
+    dataset = _new_dataset(db)
+    df, _ = transform(pd.DataFrame([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", STATUS="A"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B", STATUS="B"),
+    ]))
+    load_records(db, to_record_frame(dataset.id, df))
+    codes = DimensionCodes.load(db, dataset.id)
+    # each value sorts just below "B", halving the gap every time until it is gone
+    for n in range(1, 20):
+        codes.add(db, "status", ["A" + "0" * n])
+
+    codes = DimensionCodes.load(db, dataset.id)
+    assert codes.labels["status"] == ["A"] + ["A" + "0" * n for n in range(1, 20)] + ["B"]
+    assert codes.codes["status"] == sorted(set(codes.codes["status"]))
+    assert [row[RECORD_FIELDS.index("status")] for row in _loaded_rows(db, dataset.id)] == ["A", "B"]
+
+
+def test_place_codes_keeps_stored_codes():
+    assert place_codes("status", ["a", "b", "c"], {"a": 10, "c": 20}) == [10, 15, 20]
+    assert place_codes("status", ["a", "b", "c"], {"a": 10, "c": 11}) is None
+    first, *_, last = place_codes("status", ["a", "b", "c"], {})
+    assert 0 <= first and last <= 2**15 - 1
+
+
+def test_records_load_into_the_dataset_partition(db: Session):
+    first, second = _new_dataset(db), _new_dataset(db)
+    df, _ = transform(pd.DataFrame([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B"),
+    ]))
+    load_records(db, to_record_frame(first.id, df))
+    load_records(db, to_record_frame(second.id, df))
+
+    in_partition = db.execute(text(f"SELECT count(*) FROM {partition_name(first.id)}")).scalar()
+    assert in_partition == 2
+
+    drop_partition(db, first.id)
+    counts = dict(
+        db.query(SalesRecord.dataset_id, func.count()).group_by(SalesRecord.dataset_id)
+    )
+    assert counts == {second.id: 2}
+
+
+def test_partition_is_created_while_sales_records_is_read(db: Session):
+    reading, creating = _new_dataset(db), _new_dataset(db)
+    with Session(db.get_bind()) as reader:
+        # a long read, such as an export, holds its lock on sales_records until it commits
+        reader.query(SalesRecord).filter(SalesRecord.dataset_id == reading.id).all()
+
+        create_partition(db, creating.id, lock_timeout_ms=500)
+        db.commit()
+    assert db.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(creating.id)}).scalar()
+
+
+def test_spool_upload_validates_header():
+    row = _base_row()
+    del row["COUNTRY"]
+    with pytest.raises(HTTPException) as exc_info:
+        spool_upload(_make_upload(_csv([row])))
+    assert exc_info.value.status_code == 400
+    assert "COUNTRY" in str(exc_info.value.detail)
+
+
+def test_process_dataset_file_matches_in_memory(db: Session, tmp_path):
+    rows = [
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=10),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="A", QUANTITYORDERED=None),
+        _base_row(ORDERNUMBER=1003, PRODUCTCODE="B", QUANTITYORDERED=40, ORDERDATE="11/2/2004 0:00"),
+        # duplicates of rows that live in an earlier chunk
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=99),
+        _base_row(ORDERNUMBER=1003, PRODUCTCODE="B", QUANTITYORDERED=1),
+        _base_row(ORDERNUMBER=1004, PRODUCTCODE="C", PRICEEACH=None, ORDERDATE="2/1/2005 0:00"),
+    ]
+    content = _csv(rows)
+
+    in_memory = _new_dataset(db)
+    process_dataset(in_memory.id, parse_csv(_make_upload(content)))
+
+    path = tmp_path / "upload.csv"
+    path.write_text(content, encoding="latin-1")
+    streamed = _new_dataset(db)
+    process_dataset_file(streamed.id, path, chunk_rows=2)
+
+    db.refresh(in_memory)
+    db.refresh(streamed)
+    assert streamed.status == "ready"
+    assert not path.exists()
+    assert _loaded_rows(db, streamed.id) == _loaded_rows(db, in_memory.id)
+    for attr in ("row_count", "rows_dropped", "date_min", "date_max", "total_sales"):
+        assert getattr(streamed, attr) == getattr(in_memory, attr)
+
+
+def test_process_dataset_file_sums_match_in_memory(db: Session, tmp_path):
+    rng = np.random.default_rng(7)
+    rows = [
+        _base_row(
+            ORDERNUMBER=10000 + i // 4,
+            PRODUCTCODE=f"S{i % 4}",
+            QUANTITYORDERED=int(rng.integers(1, 100)),
+            PRICEEACH=round(float(rng.uniform(20, 250)), 2),
+            CUSTOMERNAME=f"Customer {i % 37}",
+            COUNTRY=["USA", "France", "Spain", "Japan"][i % 4],
+        )
+        for i in range(3000)
+    ]
+    content = _csv(rows)
+
+    in_memory = _new_dataset(db)
+    process_dataset(in_memory.id, parse_csv(_make_upload(content)))
+    path = tmp_path / "upload.csv"
+    path.write_text(content, encoding="latin-1")
+    streamed = _new_dataset(db)
+    # chunk sums added up as floats round differently from one sum over the file
+    process_dataset_file(streamed.id, path, chunk_rows=97)
+
+    db.refresh(in_memory)
+    db.refresh(streamed)
+    assert streamed.total_sales == in_memory.total_sales
+    assert streamed.aggregates == in_memory.aggregates
+
+
+def test_etl_records_stage_stats(db: Session, tmp_path):
+    rows = [
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B"),
+    ]
+    path = tmp_path / "upload.csv"
+    path.write_text(_csv(rows), encoding="latin-1")
+    dataset = _new_dataset(db)
+    process_dataset_file(dataset.id, path, chunk_rows=2)
+
+    db.refresh(dataset)
+    stats = dataset.etl_stats
+    stages = {stage["name"]: stage for stage in stats["stages"]}
+    assert {"scan", "parse", "parse_dates", "build_rows", "load", "commit"} <= stages.keys()
+    assert stages["parse"]["rows"] == 3
+    assert stages["load"]["rows"] == 2
+    assert stats["total"]["rows"] == 3
+    assert stats["total"]["wall_seconds"] >= stages["load"]["wall_seconds"]
+    assert all(stage["cpu_seconds"] >= 0 for stage in stats["stages"])
+
+
+def test_etl_publishes_progress(db: Session, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "PROGRESS_INTERVAL_SECONDS", 0)
+    rows = [
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B"),
+    ]
+    path = tmp_path / "upload.csv"
+    path.write_text(_csv(rows), encoding="latin-1")
+    dataset = _new_dataset(db)
+    process_dataset_file(dataset.id, path, chunk_rows=2)
+
+    db.refresh(dataset)
+    # the last update, made as the load was committed
+    assert dataset.progress == {"stage": "commit", "rows_total": 3, "rows_parsed": 3, "rows_loaded": 2}
+
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_process_dataset_file_reads_columnar_uploads(db: Session, tmp_path, suffix):
+    df = pd.DataFrame([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=10),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B", QUANTITYORDERED=None, ORDERDATE="11/2/2004 0:00"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=99),
+    ])
+    in_memory = _new_dataset(db)
+    process_dataset(in_memory.id, df.copy())
+
+    path = tmp_path / f"upload{suffix}"
+    if suffix == ".parquet":
+        df.to_parquet(path)
+    else:
+        # several record batches, read one at a time
+        df.to_feather(path, chunksize=2)
+    spooled = spool_upload(UploadFile(file=io.BytesIO(path.read_bytes()), filename=f"sales{suffix}"))
+    assert spooled.suffix == suffix
+    streamed = _new_dataset(db)
+    process_dataset_file(streamed.id, spooled, chunk_rows=2)
+
+    db.refresh(in_memory)
+    db.refresh(streamed)
+    assert streamed.status == "ready"
+    assert _loaded_rows(db, streamed.id) == _loaded_rows(db, in_memory.id)
+    assert streamed.rows_dropped == 1
+
+
+@pytest.mark.parametrize("suffix", [".csv.gz", ".csv.zst"])
+def test_compressed_csv_upload(db: Session, suffix):
+    rows = [
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=10),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B", ORDERDATE="11/2/2004 0:00"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", QUANTITYORDERED=99),
+    ]
+    compression = "gzip" if suffix.endswith(".gz") else "zstd"
+    buf = io.BytesIO()
+    pd.DataFrame(rows).to_csv(buf, index=False, encoding="latin-1", compression=compression)
+    content = buf.getvalue()
+
+    parsed = parse_csv(UploadFile(file=io.BytesIO(content), filename=f"sales{suffix}"))
+    assert len(parsed) == 3
+
+    in_memory = _new_dataset(db)
+    process_dataset(in_memory.id, parsed)
+    spooled = spool_upload(UploadFile(file=io.BytesIO(content), filename=f"sales{suffix}"))
+    # stays compressed on disk
+    assert spooled.read_bytes() == content
+    streamed = _new_dataset(db)
+    process_dataset_file(streamed.id, spooled, chunk_rows=2)
+
+    db.refresh(streamed)
+    assert streamed.status == "ready"
+    assert _loaded_rows(db, streamed.id) == _loaded_rows(db, in_memory.id)
+
+
+def test_append_loads_only_new_rows(db: Session, tmp_path):
+    dataset = _new_dataset(db)
+    process_dataset(dataset.id, pd.DataFrame([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", ORDERDATE="1/6/2003 0:00"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="C", ORDERDATE="1/6/2003 0:00"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="D", ORDERDATE="1/6/2003 0:00"),
+    ]))
+    path = tmp_path / "day.csv"
+    path.write_text(_csv([
+        # "B" sorts between stored codes of order 1001 and takes a code between them
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="B", ORDERDATE="2/1/2003 0:00"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="C", QUANTITYORDERED=99),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="E", CUSTOMERNAME="Atelier graphique", ORDERDATE="8/1/2004 0:00"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="E", QUANTITYORDERED=1),
+    ]), encoding="latin-1")
+    append_dataset_file(dataset.id, path)
+
+    db.refresh(dataset)
+    assert dataset.status == "ready"
+    assert not path.exists()
+    assert dataset.row_count == 5
+    assert dataset.rows_dropped == 2
+    assert dataset.date_max.year == 2004
+    rows = {(r["order_number"], r["product_code"], r["quantity_ordered"]) for r in (
+        dict(zip(RECORD_FIELDS, row)) for row in _loaded_rows(db, dataset.id)
+    )}
+    assert (1001, "C", 30) in rows and (1001, "B", 30) in rows
+
+    stored = build_aggregates(db, dataset.id)
+    live = compute_aggregates(db, dataset.id)
+    assert stored.total_orders == live.total_orders == 2
+    assert stored.total_sales == pytest.approx(live.total_sales) == pytest.approx(dataset.total_sales)
+    assert [(q.year, q.quarter, q.order_count) for q in stored.sales_by_quarter] == [
+        (q.year, q.quarter, q.order_count) for q in live.sales_by_quarter
+    ]
+    assert [c.customer_name for c in stored.sales_by_customer] == [
+        c.customer_name for c in live.sales_by_customer
+    ]
+
+
+def test_append_leaves_stored_rows_untouched(db: Session, tmp_path):
+    dataset = _new_dataset(db)
+    process_dataset(dataset.id, pd.DataFrame([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="S10", CUSTOMERNAME="Alpha", COUNTRY="USA"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="S30", CUSTOMERNAME="Gamma", COUNTRY="France"),
+    ]))
+    # an UPDATE writes a new row version with a new xmin
+    versions = f"SELECT order_number, xmin::text FROM {partition_name(dataset.id)}"
+    before = dict(db.execute(text(versions)).all())
+    db.commit()
+
+    path = tmp_path / "day.csv"
+    # every new value sorts before or between the stored ones
+    path.write_text(_csv([
+        _base_row(ORDERNUMBER=1003, PRODUCTCODE="S00", CUSTOMERNAME="Beta", COUNTRY="Austria"),
+        _base_row(ORDERNUMBER=1004, PRODUCTCODE="S20", CUSTOMERNAME="Aardvark", COUNTRY="Germany"),
+    ]), encoding="latin-1")
+    append_dataset_file(dataset.id, path)
+
+    after = dict(db.execute(text(versions)).all())
+    assert {order: after[order] for order in before} == before
+    names = [r[RECORD_FIELDS.index("customer_name")] for r in _loaded_rows(db, dataset.id)]
+    assert names == ["Alpha", "Gamma", "Beta", "Aardvark"]
+
+
+def test_process_dataset_stores_aggregates(db: Session):
+    dataset = _new_dataset(db)
+    rows = [
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A", COUNTRY="USA", ORDERDATE="1/6/2003 0:00"),
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="B", COUNTRY="France", ORDERDATE="1/6/2003 0:00", YEAR_ID=2003),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="A", COUNTRY="USA", ORDERDATE="8/1/2004 0:00", YEAR_ID=2004),
+        _base_row(ORDERNUMBER=1003, PRODUCTCODE="C", CUSTOMERNAME="Atelier graphique", QUANTITYORDERED=5),
+    ]
+    process_dataset(dataset.id, pd.DataFrame(rows))
+
+    db.refresh(dataset)
+    assert dataset.aggregates is not None
+    stored = build_aggregates(db, dataset.id)
+    live = compute_aggregates(db, dataset.id)
+    assert stored.total_orders == live.total_orders == 3
+    assert stored.total_sales == pytest.approx(live.total_sales)
+    assert stored.avg_order_value == live.avg_order_value
+    assert [(q.year, q.quarter, q.order_count) for q in stored.sales_by_quarter] == [
+        (q.year, q.quarter, q.order_count) for q in live.sales_by_quarter
+    ]
+    assert [c.country for c in stored.sales_by_country] == [c.country for c in live.sales_by_country]
+    assert [c.customer_name for c in stored.sales_by_customer] == [
+        c.customer_name for c in live.sales_by_customer
+    ]
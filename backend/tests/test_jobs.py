@@ -0,0 +1,202 @@
+import io
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models import Dataset, EtlJob, SalesRecord, User
+from app.services import jobs
+from app.services.datasets import append_to_dataset, delete_dataset
+from app.services.jobs import claim_job, run_once
+from tests.test_datasets import _base_row, _csv_bytes, _register
+
+
+def _upload(client: TestClient) -> int:
+    _register(client)
+    csv = _csv_bytes([
+        _base_row(ORDERNUMBER=1001, PRODUCTCODE="A"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B"),
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B"),
+    ])
+    r = client.post("/api/upload", files={"file": ("data.csv", io.BytesIO(csv), "text/csv")})
+    return r.json()["dataset_id"]
+
+
+def _stuck_job(db: Session, attempts: int, tmp_path, **row) -> EtlJob:
+    user = User(email="worker@test.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    dataset = Dataset(user_id=user.id, filename="data.csv", row_count=0, status="processing")
+    db.add(dataset)
+    db.flush()
+    path = tmp_path / "upload.csv"
+    path.write_bytes(_csv_bytes([_base_row(**row)]))
+    job = EtlJob(
+        dataset_id=dataset.id,
+        path=str(path),
+        status="running",
+        attempts=attempts,
+        locked_at=datetime.now(UTC) - timedelta(hours=1),
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_upload_enqueues_job(client: TestClient, db: Session):
+    dataset_id = _upload(client)
+    job = db.query(EtlJob).filter(EtlJob.dataset_id == dataset_id).one()
+    assert job.status == "queued"
+    assert db.get(Dataset, dataset_id).status == "processing"
+
+
+def test_worker_processes_queued_job(client: TestClient, db: Session):
+    dataset_id = _upload(client)
+
+    assert run_once() is True
+    assert run_once() is False
+
+    db.expire_all()
+    dataset = db.get(Dataset, dataset_id)
+    assert dataset.status == "ready"
+    assert dataset.row_count == 2
+    assert dataset.rows_dropped == 1
+    assert db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset_id).count() == 2
+    job = db.query(EtlJob).filter(EtlJob.dataset_id == dataset_id).one()
+    assert job.status == "done"
+    assert job.attempts == 1
+
+
+def test_worker_appends_to_dataset(client: TestClient, db: Session):
+    dataset_id = _upload(client)
+    csv = _csv_bytes([_base_row(ORDERNUMBER=1003, PRODUCTCODE="C")])
+    r = client.post(f"/api/datasets/{dataset_id}/append", files={"file": ("day.csv", io.BytesIO(csv), "text/csv")})
+    # the first load has not run yet
+    assert r.status_code == 409
+
+    run_once()
+    csv = _csv_bytes([
+        _base_row(ORDERNUMBER=1002, PRODUCTCODE="B"),
+        _base_row(ORDERNUMBER=1003, PRODUCTCODE="C"),
+    ])
+    r = client.post(f"/api/datasets/{dataset_id}/append", files={"file": ("day.csv", io.BytesIO(csv), "text/csv")})
+    assert r.status_code == 202
+    assert r.json()["status"] == "processing"
+    assert run_once() is True
+
+    db.expire_all()
+    dataset = db.get(Dataset, dataset_id)
+    assert dataset.status == "ready"
+    assert dataset.row_count == 3
+    # one duplicate within the first file, one row already stored
+    assert dataset.rows_dropped == 2
+    assert db.query(SalesRecord).filter(SalesRecord.dataset_id == dataset_id).count() == 3
+    kinds = [job.kind for job in db.query(EtlJob).filter(EtlJob.dataset_id == dataset_id).order_by(EtlJob.id)]
+    assert kinds == ["load", "append"]
+
+
+def test_second_append_while_first_is_queued_conflicts(client: TestClient, db: Session, tmp_path):
+    dataset_id = _upload(client)
+    run_once()
+    with Session(db.get_bind()) as other:
+        # read as ready before the first append is queued
+        stale = other.get(Dataset, dataset_id)
+        csv = _csv_bytes([_base_row(ORDERNUMBER=1003, PRODUCTCODE="C")])
+        r = client.post(f"/api/datasets/{dataset_id}/append", files={"file": ("day.csv", io.BytesIO(csv), "text/csv")})
+        assert r.status_code == 202
+
+        path = tmp_path / "second.csv"
+        path.write_bytes(csv)
+        with pytest.raises(HTTPException) as exc_info:
+            append_to_dataset(other, stale, path)
+    assert exc_info.value.status_code == 409
+    assert not path.exists()
+    db.expire_all()
+    kinds = [job.kind for job in db.query(EtlJob).filter(EtlJob.dataset_id == dataset_id).order_by(EtlJob.id)]
+    assert kinds == ["load", "append"]
+
+
+def test_delete_during_append_conflicts(client: TestClient, db: Session):
+    dataset_id = _upload(client)
+    run_once()
+    with Session(db.get_bind()) as other:
+        stale = other.get(Dataset, dataset_id)
+        csv = _csv_bytes([_base_row(ORDERNUMBER=1003, PRODUCTCODE="C")])
+        r = client.post(f"/api/datasets/{dataset_id}/append", files={"file": ("day.csv", io.BytesIO(csv), "text/csv")})
+        assert r.status_code == 202
+
+        with pytest.raises(HTTPException) as exc_info:
+            delete_dataset(other, stale)
+    assert exc_info.value.status_code == 409
+    db.expire_all()
+    job = db.query(EtlJob).filter(EtlJob.dataset_id == dataset_id, EtlJob.kind == "append").one()
+    assert Path(job.path).exists()
+    assert run_once() is True
+    assert db.get(Dataset, dataset_id).row_count == 3
+
+
+def test_claim_skips_running_job_with_live_lease(client: TestClient, db: Session):
+    _upload(client)
+    job = claim_job(db)
+    assert job is not None
+    assert claim_job(db) is None
+
+
+def test_worker_retries_job_with_expired_lease(db: Session, tmp_path):
+    job = _stuck_job(db, attempts=1, tmp_path=tmp_path)
+
+    assert run_once() is True
+
+    db.expire_all()
+    assert db.get(EtlJob, job.id).status == "done"
+    assert db.get(EtlJob, job.id).attempts == 2
+    assert db.get(Dataset, job.dataset_id).status == "ready"
+
+
+def test_worker_gives_up_after_max_attempts(db: Session, tmp_path):
+    job = _stuck_job(db, attempts=3, tmp_path=tmp_path)
+
+    assert run_once() is True
+
+    db.expire_all()
+    assert db.get(EtlJob, job.id).status == "failed"
+    assert db.get(Dataset, job.dataset_id).status == "failed"
+
+
+def test_worker_records_failed_job(db: Session, tmp_path):
+    job = _stuck_job(db, attempts=0, tmp_path=tmp_path, ORDERDATE="not a date")
+
+    assert run_once() is True
+
+    db.expire_all()
+    failed = db.get(EtlJob, job.id)
+    assert failed.status == "failed"
+    assert "not a date" in failed.error
+    assert db.get(Dataset, job.dataset_id).status == "failed"
+    assert not (tmp_path / "upload.csv").exists()
+
+
+def test_worker_requeues_job_when_database_is_lost(db: Session, tmp_path, monkeypatch):
+    job = _stuck_job(db, attempts=0, tmp_path=tmp_path)
+
+    def lost(dataset_id, path):
+        raise OperationalError("SELECT 1", {}, Exception("server closed the connection unexpectedly"))
+
+    monkeypatch.setitem(jobs.JOB_RUNNERS, "load", lost)
+    assert run_once() is True
+
+    db.expire_all()
+    requeued = db.get(EtlJob, job.id)
+    assert requeued.status == "queued"
+    assert requeued.attempts == 1
+    assert (tmp_path / "upload.csv").exists()
+
+    monkeypatch.undo()
+    assert run_once() is True
+    db.expire_all()
+    assert db.get(EtlJob, job.id).status == "done"
+    assert db.get(Dataset, job.dataset_id).status == "ready"
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from app.config import get_settings
+from app.database import Base
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def _alembic_config() -> Config:
+    # no alembic.ini, so env.py leaves the test run's logging configuration alone
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS))
+    return config
+
+
+def test_migrations_upgrade_to_head_and_downgrade_to_base():
+    engine = create_engine(get_settings().database_url)
+    Base.metadata.drop_all(bind=engine)
+    config = _alembic_config()
+    try:
+        command.upgrade(config, "head")
+        inspector = inspect(engine)
+        assert set(inspector.get_table_names()) >= set(Base.metadata.tables)
+        foreign_keys = [
+            (fk["name"], fk["options"].get("ondelete"))
+            for fk in inspector.get_foreign_keys("sales_records")
+        ]
+        assert foreign_keys == [("sales_records_dataset_id_fkey", "CASCADE")]
+
+        command.downgrade(config, "base")
+        assert set(inspect(engine).get_table_names()) == {"alembic_version"}
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        engine.dispose()
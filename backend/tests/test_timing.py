@@ -0,0 +1,41 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from tests.test_datasets import _login, _seed_dataset
+
+
+def _metrics(header: str) -> dict[str, str]:
+    return {metric.split(";")[0].strip(): metric for metric in header.split(",")}
+
+
+def test_no_server_timing_when_disabled(client: TestClient, db: Session):
+    _, dataset = _seed_dataset(db)
+    _login(client)
+    r = client.get(f"/api/datasets/{dataset.id}")
+    assert "server-timing" not in r.headers
+
+
+def test_server_timing_reports_phases_and_queries(
+    client: TestClient, db: Session, monkeypatch, caplog
+):
+    monkeypatch.setattr(get_settings(), "REQUEST_TIMING", True)
+    monkeypatch.setattr(get_settings(), "REQUEST_SLOW_MS", 0)
+    _, dataset = _seed_dataset(db)
+    _login(client)
+
+    with caplog.at_level(logging.WARNING, logger="app.services.timing"):
+        r = client.get(f"/api/datasets/{dataset.id}")
+    assert r.status_code == 200
+    metrics = _metrics(r.headers["server-timing"])
+    assert {"auth", "count", "records", "aggregates", "serialize", "db", "total"} <= metrics.keys()
+    queries = int(metrics["db"].split('desc="')[1].split(" ")[0])
+    assert queries > 0
+
+    line = json.loads(caplog.records[-1].getMessage().removeprefix("request "))
+    assert line["path"] == "/api/datasets/{dataset_id}"
+    assert line["status"] == 200
+    assert line["queries"] == queries
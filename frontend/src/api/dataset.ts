@@ -1,5 +1,12 @@
-import type { DatasetDetailResponse, DatasetQueryParams, DatasetSummary, UploadStats } from "../types/dataset";
-import { request } from "./client";
+import type {
+  DatasetDetailResponse,
+  DatasetProgress,
+  DatasetQueryParams,
+  DatasetRecordsResponse,
+  DatasetSummary,
+  UploadStats,
+} from "../types/dataset";
+import { API_URL, request } from "./client";
 
 export async function uploadCSV(file: File): Promise<UploadStats> {
   const formData = new FormData();
@@ -16,10 +23,7 @@ export async function listDatasets(): Promise<{ datasets: DatasetSummary[] }> {
   return res.json();
 }
 
-export async function getDataset(
-  id: number,
-  params: DatasetQueryParams = {},
-): Promise<DatasetDetailResponse> {
+function withQuery(path: string, params: DatasetQueryParams): string {
   const searchParams = new URLSearchParams();
   for (const [key, value] of Object.entries(params)) {
     if (value !== undefined && value !== null && value !== "") {
@@ -27,8 +31,22 @@ export async function getDataset(
     }
   }
   const qs = searchParams.toString();
-  const path = qs ? `/datasets/${id}?${qs}` : `/datasets/${id}`;
-  const res = await request(path);
+  return qs ? `${path}?${qs}` : path;
+}
+
+export async function getDataset(
+  id: number,
+  params: DatasetQueryParams = {},
+): Promise<DatasetDetailResponse> {
+  const res = await request(withQuery(`/datasets/${id}`, params));
+  return res.json();
+}
+
+export async function getDatasetRecords(
+  id: number,
+  params: DatasetQueryParams = {},
+): Promise<DatasetRecordsResponse> {
+  const res = await request(withQuery(`/datasets/${id}/records`, params));
   return res.json();
 }
 
@@ -37,6 +55,33 @@ export async function getDatasetStatus(id: number): Promise<DatasetSummary> {
   return res.json();
 }
 
+/**
+ * Follow the current user's in-flight datasets over Server-Sent Events.
+ * `onProgress` receives every change, the final ready or failed one included.
+ * The current state of each of `ids` is always sent first, so an upload that
+ * finished before the stream opened is still reported.
+ * `onError` is called if the browser gives up on the stream.
+ * Returns a function that closes the stream.
+ */
+export function watchDatasets(
+  ids: number[],
+  onProgress: (dataset: DatasetProgress) => void,
+  onError: () => void,
+): () => void {
+  const query = new URLSearchParams(ids.map((id) => ["ids", String(id)])).toString();
+  const source = new EventSource(`${API_URL}/datasets/events${query ? `?${query}` : ""}`, {
+    withCredentials: true,
+  });
+  source.addEventListener("progress", (event) => onProgress(JSON.parse((event as MessageEvent).data)));
+  // nothing left in flight; without this the browser would reconnect
+  source.addEventListener("done", () => source.close());
+  source.onerror = () => {
+    // dropped streams are retried by the browser; CLOSED means it gave up
+    if (source.readyState === EventSource.CLOSED) onError();
+  };
+  return () => source.close();
+}
+
 export async function exportDataset(id: number): Promise<void> {
   const res = await request(`/datasets/${id}/export`);
 
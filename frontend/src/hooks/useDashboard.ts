@@ -1,46 +1,86 @@
 import { useCallback, useEffect, useRef, useState, useTransition } from "react";
-import { uploadCSV, listDatasets, getDatasetStatus } from "../api/dataset";
+import { uploadCSV, listDatasets, getDatasetStatus, watchDatasets } from "../api/dataset";
 import { usePolling } from "./usePolling";
 import { getErrorMessage } from "../utils/error";
-import type { DatasetSummary, UploadStats } from "../types/dataset";
+import type { DatasetSummary, EtlProgress, UploadStats } from "../types/dataset";
 
+// only used when the progress stream cannot be opened
 const POLL_INTERVAL = 500;
 
 export function useDashboard() {
   const [datasets, setDatasets] = useState<DatasetSummary[]>([]);
   const [uploadResult, setUploadResult] = useState<UploadStats | null>(null);
+  const [progress, setProgress] = useState<EtlProgress | null>(null);
   const [isUploading, startUpload] = useTransition();
   const [error, setError] = useState("");
-  const pollingIdRef = useRef<number | null>(null);
+  const processingIdRef = useRef<number | null>(null);
+  const stopWatchingRef = useRef<(() => void) | null>(null);
 
   const refreshDatasets = useCallback(async () => {
     const res = await listDatasets();
     setDatasets(res.datasets);
   }, []);
 
+  // true once the dataset has finished processing
+  const applyStatus = useCallback(
+    async (status: DatasetSummary) => {
+      if (status.status === "ready") {
+        processingIdRef.current = null;
+        setUploadResult((prev) =>
+          prev ? { ...prev, status: "ready", row_count: status.row_count, rows_dropped: status.rows_dropped } : prev,
+        );
+        await refreshDatasets();
+        return true;
+      }
+      if (status.status === "failed") {
+        processingIdRef.current = null;
+        setError("Processing failed");
+        setUploadResult(null);
+        return true;
+      }
+      return false;
+    },
+    [refreshDatasets],
+  );
+
   const handlePoll = useCallback(async () => {
-    const id = pollingIdRef.current;
+    const id = processingIdRef.current;
     if (!id) return true;
-    const status = await getDatasetStatus(id);
-    if (status.status === "ready") {
-      pollingIdRef.current = null;
-      setUploadResult((prev) =>
-        prev ? { ...prev, status: "ready", row_count: status.row_count, rows_dropped: status.rows_dropped } : prev,
-      );
-      await refreshDatasets();
-      return true;
-    }
-    if (status.status === "failed") {
-      pollingIdRef.current = null;
-      setError("Processing failed");
-      setUploadResult(null);
-      return true;
-    }
-    return false;
-  }, [refreshDatasets]);
+    return applyStatus(await getDatasetStatus(id));
+  }, [applyStatus]);
 
   const { start: startPolling } = usePolling(handlePoll, POLL_INTERVAL);
 
+  const stopWatching = useCallback(() => {
+    stopWatchingRef.current?.();
+    stopWatchingRef.current = null;
+  }, []);
+
+  const watchUpload = useCallback(
+    (id: number) => {
+      stopWatching();
+      stopWatchingRef.current = watchDatasets(
+        [id],
+        (update) => {
+          if (update.id !== processingIdRef.current) return;
+          setProgress(update.progress);
+          applyStatus(update)
+            .then((done) => {
+              if (done) stopWatching();
+            })
+            .catch(() => setError("Failed to load datasets"));
+        },
+        () => {
+          stopWatching();
+          startPolling();
+        },
+      );
+    },
+    [applyStatus, startPolling, stopWatching],
+  );
+
+  useEffect(() => stopWatching, [stopWatching]);
+
   useEffect(() => {
     listDatasets()
       .then((res) => setDatasets(res.datasets))
@@ -50,14 +90,15 @@ export function useDashboard() {
   const handleUpload = (file: File) => {
     setError("");
     setUploadResult(null);
+    setProgress(null);
     startUpload(async () => {
       try {
         const stats = await uploadCSV(file);
         setUploadResult(stats);
         await refreshDatasets();
         if (stats.status === "processing") {
-          pollingIdRef.current = stats.dataset_id;
-          startPolling();
+          processingIdRef.current = stats.dataset_id;
+          watchUpload(stats.dataset_id);
         }
       } catch (err) {
         setError(getErrorMessage(err, "Upload failed"));
@@ -68,6 +109,7 @@ export function useDashboard() {
   return {
     datasets,
     uploadResult,
+    progress,
     isUploading,
     error,
     isProcessing: uploadResult?.status === "processing",
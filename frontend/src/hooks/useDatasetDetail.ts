@@ -1,7 +1,13 @@
 import { useCallback, useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
-import { getDataset } from "../api/dataset";
-import type { DatasetDetailResponse, DatasetQueryParams } from "../types/dataset";
+import { getDataset, getDatasetRecords } from "../api/dataset";
+import type {
+  DatasetAggregates,
+  DatasetDetailResponse,
+  DatasetQueryParams,
+  DatasetRecordsResponse,
+  SalesRecord,
+} from "../types/dataset";
 import { getErrorMessage } from "../utils/error";
 
 const PAGE_SIZE = 20;
@@ -13,6 +19,11 @@ export interface Filters {
   dateTo: string;
 }
 
+export interface DatasetDetailData extends Omit<DatasetDetailResponse, "aggregates" | "records"> {
+  aggregates: DatasetAggregates;
+  records: SalesRecord[];
+}
+
 const INITIAL_FILTERS: Filters = {
   status: "",
   productLine: "",
@@ -22,7 +33,8 @@ const INITIAL_FILTERS: Filters = {
 
 export function useDatasetDetail() {
   const { id } = useParams<{ id: string }>();
-  const [data, setData] = useState<DatasetDetailResponse | null>(null);
+  const [detail, setDetail] = useState<DatasetDetailResponse | null>(null);
+  const [recordsPage, setRecordsPage] = useState<DatasetRecordsResponse | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
 
@@ -31,7 +43,17 @@ export function useDatasetDetail() {
   const [sortDir, setSortDir] = useState<"asc" | "desc">("asc");
   const [filters, setFilters] = useState<Filters>(INITIAL_FILTERS);
 
-  const fetchData = useCallback(async () => {
+  // the header and charts do not change with the table's page, sort or filters
+  const fetchDetail = useCallback(async () => {
+    if (!id) return;
+    try {
+      setDetail(await getDataset(Number(id), { include: "aggregates" }));
+    } catch (err) {
+      setError(getErrorMessage(err, "Failed to load dataset"));
+    }
+  }, [id]);
+
+  const fetchRecords = useCallback(async () => {
     if (!id) return;
     setLoading(true);
     setError("");
@@ -47,8 +69,7 @@ export function useDatasetDetail() {
       if (filters.dateFrom) params.date_from = filters.dateFrom;
       if (filters.dateTo) params.date_to = filters.dateTo;
 
-      const result = await getDataset(Number(id), params);
-      setData(result);
+      setRecordsPage(await getDatasetRecords(Number(id), params));
     } catch (err) {
       setError(getErrorMessage(err, "Failed to load dataset"));
     } finally {
@@ -57,8 +78,17 @@ export function useDatasetDetail() {
   }, [id, page, sortBy, sortDir, filters]);
 
   useEffect(() => {
-    fetchData();
-  }, [fetchData]);
+    fetchDetail();
+  }, [fetchDetail]);
+
+  useEffect(() => {
+    fetchRecords();
+  }, [fetchRecords]);
+
+  const data: DatasetDetailData | null =
+    detail?.aggregates && recordsPage?.records
+      ? { ...detail, ...recordsPage, aggregates: detail.aggregates, records: recordsPage.records }
+      : null;
 
   const handleSort = (column: string) => {
     if (column === sortBy) {
@@ -75,7 +105,7 @@ export function useDatasetDetail() {
     setPage(1);
   };
 
-  const totalPages = data ? Math.ceil(data.total_records / PAGE_SIZE) : 0;
+  const totalPages = data ? Math.ceil((data.total_records ?? 0) / PAGE_SIZE) : 0;
 
   return {
     id,
@@ -7,7 +7,7 @@ import styles from "./Dashboard.module.css";
 
 export default function Dashboard() {
   const navigate = useNavigate();
-  const { datasets, uploadResult, isUploading, error, isProcessing, handleUpload } = useDashboard();
+  const { datasets, uploadResult, progress, isUploading, error, isProcessing, handleUpload } = useDashboard();
 
   const handleLogout = async () => {
     await logout();
@@ -33,6 +33,12 @@ export default function Dashboard() {
           {isProcessing ? (
             <span className={styles.banner_stat}>
               <span className={`${styles.status_badge} ${styles.status_processing}`}>Processing...</span>
+              {progress?.rows_total != null && (
+                <span className={styles.banner_label}>
+                  {" "}
+                  {progress.rows_loaded.toLocaleString()} of {progress.rows_total.toLocaleString()} rows loaded
+                </span>
+              )}
             </span>
           ) : (
             <>
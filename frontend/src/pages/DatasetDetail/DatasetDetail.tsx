@@ -65,7 +65,7 @@ export default function DatasetDetail() {
             </div>
             <div className={styles.stat_card}>
               <div className={styles.stat_label}>Record Count</div>
-              <div className={styles.stat_value}>{data.total_records.toLocaleString()}</div>
+              <div className={styles.stat_value}>{(data.total_records ?? data.row_count).toLocaleString()}</div>
             </div>
           </div>
 
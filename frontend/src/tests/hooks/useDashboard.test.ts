@@ -1,6 +1,6 @@
 import { renderHook, act, waitFor } from '@testing-library/react'
 import { useDashboard } from '../../hooks/useDashboard'
-import { READY_DATASET } from '../fixtures'
+import { PROCESSING_DATASET, READY_DATASET } from '../fixtures'
 
 // ---------------------------------------------------------------------------
 // Mock the dataset API
@@ -9,12 +9,14 @@ vi.mock('../../api/dataset', () => ({
   uploadCSV: vi.fn(),
   listDatasets: vi.fn(),
   getDatasetStatus: vi.fn(),
+  watchDatasets: vi.fn(),
 }))
 
-import { uploadCSV, listDatasets } from '../../api/dataset'
+import { uploadCSV, listDatasets, watchDatasets } from '../../api/dataset'
 
 const mockListDatasets = vi.mocked(listDatasets)
 const mockUploadCSV = vi.mocked(uploadCSV)
+const mockWatchDatasets = vi.mocked(watchDatasets)
 
 describe('useDashboard', () => {
   beforeEach(() => {
@@ -74,6 +76,52 @@ describe('useDashboard', () => {
     expect(result.current.uploadResult!.row_count).toBe(500)
   })
 
+  it('follows a processing upload over the progress stream', async () => {
+    const stop = vi.fn()
+    mockWatchDatasets.mockReturnValue(stop)
+    mockUploadCSV.mockResolvedValue({
+      dataset_id: 2,
+      status: 'processing',
+      row_count: 0,
+      rows_dropped: 0,
+      date_min: null,
+      date_max: null,
+      total_sales: 0,
+    })
+
+    const { result } = renderHook(() => useDashboard())
+
+    await waitFor(() => expect(mockListDatasets).toHaveBeenCalled())
+
+    await act(async () => {
+      result.current.handleUpload(new File(['data'], 'test.csv', { type: 'text/csv' }))
+    })
+
+    await waitFor(() => expect(mockWatchDatasets).toHaveBeenCalledOnce())
+    // asked for by id, so a load that finishes before the stream opens is still reported
+    expect(mockWatchDatasets.mock.calls[0][0]).toEqual([2])
+    const onProgress = mockWatchDatasets.mock.calls[0][1]
+
+    act(() => {
+      onProgress({
+        ...PROCESSING_DATASET,
+        progress: { stage: 'load', rows_total: 1000, rows_parsed: 400, rows_loaded: 300 },
+      })
+    })
+    expect(result.current.isProcessing).toBe(true)
+    expect(result.current.progress!.rows_loaded).toBe(300)
+
+    act(() => {
+      onProgress({ ...PROCESSING_DATASET, status: 'ready', row_count: 990, rows_dropped: 10, progress: null })
+    })
+
+    await waitFor(() => {
+      expect(result.current.uploadResult!.status).toBe('ready')
+    })
+    expect(result.current.uploadResult!.row_count).toBe(990)
+    expect(stop).toHaveBeenCalled()
+  })
+
   it('sets error message when upload fails', async () => {
     mockUploadCSV.mockRejectedValue(new Error('File too large'))
 
@@ -20,6 +20,18 @@ export interface DatasetSummary {
   created_at: string;
 }
 
+export interface EtlProgress {
+  stage: string;
+  // input rows, duplicates included; null until the file has been read
+  rows_total: number | null;
+  rows_parsed: number;
+  rows_loaded: number;
+}
+
+export interface DatasetProgress extends DatasetSummary {
+  progress: EtlProgress | null;
+}
+
 export interface SalesRecord {
   id: number;
   order_number: number;
@@ -86,11 +98,22 @@ export interface DatasetDetailResponse {
   date_max: string | null;
   created_at: string;
   status: string;
-  aggregates: DatasetAggregates;
-  records: SalesRecord[];
+  aggregates: DatasetAggregates | null;
+  records: SalesRecord[] | null;
+  page: number;
+  page_size: number;
+  total_records: number | null;
+  next_cursor: string | null;
+  prev_cursor: string | null;
+}
+
+export interface DatasetRecordsResponse {
+  records: SalesRecord[] | null;
   page: number;
   page_size: number;
-  total_records: number;
+  total_records: number | null;
+  next_cursor: string | null;
+  prev_cursor: string | null;
 }
 
 export interface DatasetQueryParams {
@@ -102,4 +125,7 @@ export interface DatasetQueryParams {
   product_line?: string;
   date_from?: string;
   date_to?: string;
+  cursor?: string;
+  include_total?: boolean;
+  include?: string;
 }